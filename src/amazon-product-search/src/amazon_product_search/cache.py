@@ -1,24 +1,171 @@
+import sys
+import threading
+import time
 import weakref
 from collections import OrderedDict
 from functools import lru_cache, wraps
-from typing import Any, Callable, Generic, TypeVar
+from typing import Any, Callable, Generic, NamedTuple, TypeVar
 
 K = TypeVar("K")
 V = TypeVar("V")
+T = TypeVar("T")
+
+_MISSING = object()
+
+
+def size_of(value: Any) -> int:
+    """Return the size of a value in bytes, using `nbytes` for arrays and `sys.getsizeof` otherwise.
+
+    `sys.getsizeof` does not follow references, so pass a custom function to `LRUCache` for nested objects.
+    """
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    return sys.getsizeof(value)
+
+
+class _Entry(NamedTuple):
+    value: Any
+    expires_at: float | None
+    num_bytes: int
 
 
 class LRUCache(Generic[K, V]):
-    def __init__(self, max_size: int = 128) -> None:
+    """A thread-safe LRU cache bounded by the number of entries and/or bytes, with an optional TTL.
+
+    Args:
+        max_size (int | None, optional): The maximum number of entries. Defaults to 128.
+        max_bytes (int | None, optional): The maximum total size of values in bytes. Defaults to None.
+        ttl (float | None, optional): Seconds after which an entry expires. Defaults to None.
+        size_of (Callable[[V], int], optional): A function returning the size of a value in bytes.
+            Only used when `max_bytes` is given. Defaults to `size_of`.
+    """
+
+    def __init__(
+        self,
+        max_size: int | None = 128,
+        max_bytes: int | None = None,
+        ttl: float | None = None,
+        size_of: Callable[[V], int] = size_of,
+    ) -> None:
         self.max_size = max_size
-        self.cache: OrderedDict[K, V] = OrderedDict()
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size_of = size_of
+        self.cache: OrderedDict[K, _Entry] = OrderedDict()
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def __contains__(self, key: K) -> bool:
+        with self._lock:
+            entry = self.cache.get(key)
+            return entry is not None and not self._is_expired(entry)
+
+    def _is_expired(self, entry: _Entry) -> bool:
+        return entry.expires_at is not None and entry.expires_at <= time.monotonic()
 
-    def get(self, key: K) -> V | None:
-        return self.cache.get(key)
+    def _pop(self, key: K) -> None:
+        self.num_bytes -= self.cache.pop(key).num_bytes
+
+    def get(self, key: K, default: Any = None) -> Any:
+        """Return the value of the key and mark it as most recently used, or `default` if absent or expired."""
+        with self._lock:
+            entry = self.cache.get(key)
+            if entry is not None and self._is_expired(entry):
+                self._pop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return entry.value
 
     def set(self, key: K, value: V) -> None:
-        if len(self.cache) >= self.max_size:
-            self.cache.popitem(last=False)
-        self.cache[key] = value
+        num_bytes = self.size_of(value) if self.max_bytes is not None else 0
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self.cache:
+                self._pop(key)
+            self.cache[key] = _Entry(value, expires_at, num_bytes)
+            self.num_bytes += num_bytes
+            while self.cache and (
+                (self.max_size is not None and len(self.cache) > self.max_size)
+                or (self.max_bytes is not None and self.num_bytes > self.max_bytes)
+            ):
+                _, evicted = self.cache.popitem(last=False)
+                self.num_bytes -= evicted.num_bytes
+                self.evictions += 1
+
+    def delete(self, key: K) -> bool:
+        """Remove the key and return True if it was cached."""
+        with self._lock:
+            if key not in self.cache:
+                return False
+            self._pop(key)
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self.cache.clear()
+            self.num_bytes = 0
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            num_requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / num_requests if num_requests else 0.0,
+                "size": len(self.cache),
+                "bytes": self.num_bytes,
+            }
+
+
+def lru_cache_method(
+    max_size: int | None = 128,
+    max_bytes: int | None = None,
+    ttl: float | None = None,
+    size_of: Callable[[Any], int] = size_of,
+) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Cache the results of a method in an `LRUCache` per instance.
+
+    Unlike `functools.lru_cache`, the cache is stored on the instance, so it does not keep the instance alive.
+    The cache of an instance can be obtained by `get_method_cache(instance, "method_name")`.
+    """
+
+    def wrapper(func: Callable[..., T]) -> Callable[..., T]:
+        attr_name = f"_{func.__name__}_lru_cache"
+        lock = threading.Lock()
+
+        @wraps(func)
+        def inner(self: Any, *args: Any, **kwargs: Any) -> T:
+            cache = self.__dict__.get(attr_name)
+            if cache is None:
+                with lock:
+                    cache = self.__dict__.setdefault(attr_name, LRUCache(max_size, max_bytes, ttl, size_of))
+            key = (args, tuple(sorted(kwargs.items()))) if kwargs else args
+            value = cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = func(self, *args, **kwargs)
+                cache.set(key, value)
+            return value
+
+        return inner
+
+    return wrapper
+
+
+def get_method_cache(instance: Any, method_name: str) -> LRUCache | None:
+    """Return the cache created by `lru_cache_method` for the given instance and method, if any."""
+    return instance.__dict__.get(f"_{method_name}_lru_cache")
 
 
 def weak_lru_cache(maxsize: int = 128, typed: bool = False) -> Callable:
@@ -1,9 +1,13 @@
+import asyncio
 import json
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Callable, Iterator, Optional
+from typing import Any, Callable, Collection, Iterator, Optional
 
-from elasticsearch import Elasticsearch, helpers
+from elasticsearch import AsyncElasticsearch, Elasticsearch, helpers
+from more_itertools import chunked
 
+from amazon_product_search.parallel import limit_concurrency
 from amazon_product_search.retrieval.response import Response, Result
 from amazon_product_search.source import Locale
 
@@ -27,6 +31,22 @@ def get_schema_filepath(locale: Locale) -> Path:
     return get_package_root() / f"elasticsearch/schemas/products_{locale}.json"
 
 
+@dataclass
+class SearchRequest:
+    """A search request to be sent in a batch via the Multi search API.
+
+    The attributes correspond to the arguments of `EsClient.search`.
+    """
+
+    index_name: str
+    query: dict[str, Any] | None = None
+    knn_query: dict[str, Any] | None = None
+    rescore: dict[str, Any] | None = None
+    rank: dict[str, Any] | None = None
+    size: int = 20
+    explain: bool = False
+
+
 class EsClient:
     """A wrapper class of https://elasticsearch-py.readthedocs.io/"""
 
@@ -105,11 +125,41 @@ class EsClient:
         index_name: str,
         docs: list[dict[str, Any]],
         id_fn: Optional[Callable[[dict[str, Any]], str]] = None,
+        stats_only: bool = True,
     ) -> tuple[int, int | list[dict[str, Any]]]:
+        """Index docs in bulk. Docs that fail to be indexed do not raise.
+
+        Returns:
+            tuple[int, int | list[dict[str, Any]]]: The number of indexed docs, and the number of failed docs
+                if `stats_only` is True or the failed bulk items (e.g., `{"index": {"_id": "1", "status": 400}}`).
+        """
         return helpers.bulk(
             client=self.es,
             actions=self._generate_actions(index_name, docs, id_fn),
-            stats_only=True,
+            stats_only=stats_only,
+            raise_on_error=False,
+        )
+
+    @staticmethod
+    def _generate_delete_actions(index_name: str, doc_ids: list[str]) -> Iterator[dict[str, Any]]:
+        for doc_id in doc_ids:
+            yield {
+                "_op_type": "delete",
+                "_index": index_name,
+                "_id": doc_id,
+            }
+
+    def delete_docs(
+        self, index_name: str, doc_ids: list[str], stats_only: bool = True
+    ) -> tuple[int, int | list[dict[str, Any]]]:
+        """Delete docs by ID in bulk. Docs that do not exist are counted as errors (status 404) but do not raise.
+
+        See `index_docs` for the return value.
+        """
+        return helpers.bulk(
+            client=self.es,
+            actions=self._generate_delete_actions(index_name, doc_ids),
+            stats_only=stats_only,
             raise_on_error=False,
         )
 
@@ -135,6 +185,62 @@ class EsClient:
             total_hits=es_response["hits"]["total"]["value"],
         )
 
+    @staticmethod
+    def _build_msearch_body(requests: list[SearchRequest]) -> list[dict[str, Any]]:
+        """Convert search requests to the body of the Multi search API.
+
+        See: https://www.elastic.co/guide/en/elasticsearch/reference/current/search-multi-search.html
+
+        ```
+        [SearchRequest(index_name="products", query={"match_all": {}}, size=10)]
+        # The above requests will be as follows:
+        [
+            {"index": "products"},
+            {"query": {"match_all": {}}, "size": 10, "explain": False},
+        ]
+        ```
+
+        Args:
+            requests (list[SearchRequest]): Search requests to convert.
+
+        Returns:
+            list[dict[str, Any]]: Pairs of a header and a body, flattened.
+        """
+        body: list[dict[str, Any]] = []
+        for request in requests:
+            body.append({"index": request.index_name})
+            search_body: dict[str, Any] = {
+                "query": request.query,
+                "knn": request.knn_query,
+                "rescore": request.rescore,
+                "rank": request.rank,
+            }
+            search_body = {key: value for key, value in search_body.items() if value is not None}
+            search_body["size"] = request.size
+            search_body["explain"] = request.explain
+            body.append(search_body)
+        return body
+
+    @staticmethod
+    def _convert_msearch_response_to_responses(es_response: Any) -> list[Response]:
+        """Map a raw Multi search response to a list of Response in the same order as the requests.
+
+        Args:
+            es_response (Any): A Multi search response to convert.
+
+        Raises:
+            RuntimeError: If any of the searches failed.
+
+        Returns:
+            list[Response]: Our Response objects.
+        """
+        responses = []
+        for i, item in enumerate(es_response["responses"]):
+            if "error" in item:
+                raise RuntimeError(f"Search request #{i} in msearch failed: {item['error']}")
+            responses.append(EsClient._convert_es_response_to_response(item))
+        return responses
+
     def analyze(self, text: str) -> dict[str, Any]:
         return self.es.indices.analyze(text=text).body
 
@@ -199,6 +305,7 @@ class EsClient:
         size: int = 20,
         explain: bool = False,
         request_cache: bool | None = None,
+        request_timeout: float | None = None,
     ) -> Response:
         """Perform a search and return a Response object.
 
@@ -211,11 +318,14 @@ class EsClient:
             explain (bool, optional): If True, returns detailed information about score computation
                 as part of a hit if True. Defaults to False.
             request_cache (bool | None, optional): If True, the request is cached. Defaults to None.
+            request_timeout (float | None, optional): The client-side timeout of the request in seconds.
+                `elasticsearch.ConnectionTimeout` is raised if exceeded. Defaults to None (the client default).
 
         Returns:
             Response: A Response object.
         """
-        es_response = self.es.search(
+        es = self.es.options(request_timeout=request_timeout) if request_timeout is not None else self.es
+        es_response = es.search(
             index=index_name,
             query=query,
             knn=knn_query,
@@ -227,5 +337,141 @@ class EsClient:
         )
         return self._convert_es_response_to_response(es_response)
 
+    def search_many(self, requests: list[SearchRequest], batch_size: int = 100) -> list[Response]:
+        """Perform searches in batches via the Multi search API.
+
+        Args:
+            requests (list[SearchRequest]): Search requests to perform.
+            batch_size (int, optional): The number of searches per msearch request. Defaults to 100.
+
+        Returns:
+            list[Response]: Responses in the same order as the requests.
+        """
+        responses: list[Response] = []
+        for batch in chunked(requests, batch_size):
+            es_response = self.es.msearch(body=self._build_msearch_body(list(batch)))
+            responses.extend(self._convert_msearch_response_to_responses(es_response))
+        return responses
+
     def close(self) -> None:
         self.es.close()
+
+
+class AsyncEsClient:
+    """An asyncio counterpart of `EsClient` built on `AsyncElasticsearch`.
+
+    A client holds a pool of keep-alive connections per node (`connections_per_node`),
+    so it is meant to be created once and shared across coroutines.
+
+    ```
+    async with AsyncEsClient(connections_per_node=32) as es_client:
+        responses = await es_client.search_many(requests)
+    ```
+    """
+
+    def __init__(
+        self,
+        es_host: str = "http://localhost:9200",
+        connections_per_node: int = 10,
+        request_timeout: float = 10.0,
+        max_retries: int = 3,
+        retry_on_timeout: bool = True,
+        retry_on_status: Collection[int] = (429, 502, 503, 504),
+    ) -> None:
+        """Initialize the client.
+
+        Args:
+            es_host (str, optional): The Elasticsearch host. Defaults to "http://localhost:9200".
+            connections_per_node (int, optional): The maximum number of pooled connections per node. Defaults to 10.
+            request_timeout (float, optional): The timeout of each request in seconds. Defaults to 10.0.
+            max_retries (int, optional): The maximum number of retries per request. Defaults to 3.
+            retry_on_timeout (bool, optional): Whether to retry requests that timed out. Defaults to True.
+            retry_on_status (Collection[int], optional): HTTP statuses to retry on.
+                Defaults to (429, 502, 503, 504).
+        """
+        self.es = AsyncElasticsearch(
+            es_host,
+            connections_per_node=connections_per_node,
+            request_timeout=request_timeout,
+            max_retries=max_retries,
+            retry_on_timeout=retry_on_timeout,
+            retry_on_status=retry_on_status,
+        )
+
+    async def __aenter__(self) -> "AsyncEsClient":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    async def index_docs(
+        self,
+        index_name: str,
+        docs: list[dict[str, Any]],
+        id_fn: Optional[Callable[[dict[str, Any]], str]] = None,
+        chunk_size: int = 500,
+    ) -> tuple[int, int | list[dict[str, Any]]]:
+        return await helpers.async_bulk(
+            client=self.es,
+            actions=EsClient._generate_actions(index_name, docs, id_fn),
+            chunk_size=chunk_size,
+            stats_only=True,
+            raise_on_error=False,
+        )
+
+    async def search(
+        self,
+        index_name: str,
+        query: dict[str, Any] | None = None,
+        knn_query: dict[str, Any] | None = None,
+        rescore: dict[str, Any] | None = None,
+        rank: dict[str, Any] | None = None,
+        size: int = 20,
+        explain: bool = False,
+        request_cache: bool | None = None,
+    ) -> Response:
+        """Perform a search and return a Response object.
+
+        See `EsClient.search` for the arguments.
+        """
+        es_response = await self.es.search(
+            index=index_name,
+            query=query,
+            knn=knn_query,
+            rescore=rescore,
+            rank=rank,
+            size=size,
+            explain=explain,
+            request_cache=request_cache,
+        )
+        return EsClient._convert_es_response_to_response(es_response)
+
+    async def search_many(
+        self,
+        requests: list[SearchRequest],
+        batch_size: int = 100,
+        max_concurrency: int = 4,
+    ) -> list[Response]:
+        """Perform searches in batches via the Multi search API.
+
+        Requests are split into batches of `batch_size`, and up to `max_concurrency` batches are in flight at a time.
+
+        Args:
+            requests (list[SearchRequest]): Search requests to perform.
+            batch_size (int, optional): The number of searches per msearch request. Defaults to 100.
+            max_concurrency (int, optional): The maximum number of concurrent msearch requests. Defaults to 4.
+
+        Returns:
+            list[Response]: Responses in the same order as the requests.
+        """
+
+        async def _msearch(batch: list[SearchRequest]) -> list[Response]:
+            es_response = await self.es.msearch(body=EsClient._build_msearch_body(batch))
+            return EsClient._convert_msearch_response_to_responses(es_response)
+
+        coroutines = [_msearch(list(batch)) for batch in chunked(requests, batch_size)]
+        batches = await asyncio.gather(*limit_concurrency(coroutines, max_concurrency))
+        return [response for batch in batches for response in batch]
+
+    async def close(self) -> None:
+        await self.es.close()
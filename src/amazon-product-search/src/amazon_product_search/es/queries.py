@@ -0,0 +1,105 @@
+"""Functions to build ES query dicts.
+
+Each function corresponds to a template in `templates/` and returns the same dict as rendering the template and
+parsing it with `json.loads`, without the round trip through text. The templates are kept as the reference.
+"""
+
+from typing import Any
+
+
+def build_match_all_query() -> dict[str, Any]:
+    """Build the query equivalent to `match_all.j2`."""
+    return {"match_all": {}}
+
+
+def build_lexical_query(
+    queries: list[str],
+    fields: list[str],
+    operator: str = "and",
+    enable_phrase_match_boost: bool = False,
+) -> dict[str, Any]:
+    """Build the query equivalent to `lexical.j2`.
+
+    Args:
+        queries (list[str]): Queries to search. The first one is boosted over the others (e.g., synonym expansions).
+        fields (list[str]): Fields to search.
+        operator (str, optional): The operator of `multi_match`. Defaults to "and".
+        enable_phrase_match_boost (bool, optional): Boost phrase matches of the first query if True.
+            Defaults to False.
+
+    Returns:
+        dict[str, Any]: The constructed ES query.
+    """
+    functions: list[dict[str, Any]] = []
+    if enable_phrase_match_boost:
+        functions.append(
+            {
+                "filter": {"match_phrase": {"product_title": {"query": queries[0]}}},
+                "weight": 2,
+            }
+        )
+    return {
+        "function_score": {
+            "query": {
+                "dis_max": {
+                    "queries": [
+                        {
+                            "multi_match": {
+                                "query": query,
+                                "type": "cross_fields",
+                                "fields": list(fields),
+                                "operator": operator,
+                                "boost": 1.0 if i == 0 else 0.5,
+                            },
+                        }
+                        for i, query in enumerate(queries)
+                    ],
+                },
+            },
+            "functions": functions,
+        },
+    }
+
+
+def build_knn_query(
+    query_vector: list[float],
+    field: str,
+    k: int,
+    num_candidates: int,
+    product_ids: list[str] | None = None,
+) -> dict[str, Any]:
+    """Build the query equivalent to `semantic.j2`.
+
+    `query_vector` is embedded as it is (not copied), so do not modify it while the query is in use.
+    """
+    knn_query: dict[str, Any] = {}
+    if product_ids:
+        knn_query["filter"] = {"terms": {"product_id": list(product_ids)}}
+    knn_query |= {
+        "query_vector": query_vector,
+        "field": field,
+        "k": k,
+        "num_candidates": num_candidates,
+        "boost": 1.0,
+    }
+    return knn_query
+
+
+def build_rescore_query(query_vector: list[float], window_size: int) -> dict[str, Any]:
+    """Build the query equivalent to `rescore.j2`."""
+    return {
+        "window_size": window_size,
+        "query": {
+            "score_mode": "multiply",
+            "rescore_query": {
+                "function_score": {
+                    "script_score": {
+                        "script": {
+                            "params": {"query_vector": query_vector},
+                            "source": "Math.max(cosineSimilarity(params.query_vector, 'product_vector'), 0)",
+                        }
+                    }
+                }
+            },
+        },
+    }
@@ -1,14 +1,29 @@
-import json
+from functools import cached_property
+from itertools import islice
 from typing import Any, cast
 
-from amazon_product_search.cache import weak_lru_cache
 from amazon_product_search.constants import DATA_DIR, HF, PROJECT_DIR
-from amazon_product_search.es.templates.template_loader import TemplateLoader
+from amazon_product_search.es.queries import (
+    build_knn_query,
+    build_lexical_query,
+    build_match_all_query,
+    build_rescore_query,
+)
 from amazon_product_search.nlp.tokenizers import Tokenizer, locale_to_tokenizer
-from amazon_product_search.retrieval.query_vector_cache import QueryVectorCache
+from amazon_product_search.retrieval.query_encoder import (
+    DEFAULT_ONNX_MODEL_FILEPATH,
+    EncoderBackend,
+    QueryEncoder,
+    load_query_encoder,
+)
+from amazon_product_search.retrieval.query_vector_cache import (
+    QueryEmbeddingCache,
+    QueryVector,
+    QueryVectorCache,
+    to_list,
+)
 from amazon_product_search.source import Locale
-from amazon_product_search.synonyms.synonym_dict import SynonymDict, expand_synonyms
-from dense_retrieval.encoders import SBERTEncoder
+from amazon_product_search.synonyms.synonym_dict import SynonymDict, iter_expansions
 
 
 class QueryBuilder:
@@ -20,19 +35,47 @@ class QueryBuilder:
         hf_model_name: str = HF.JP_SLUKE_MEAN,
         synonym_dict: SynonymDict | None = None,
         vector_cache: QueryVectorCache | None = None,
+        embedding_cache: QueryEmbeddingCache | None = None,
+        max_expansions: int = 10,
+        encoder_backend: EncoderBackend = "sbert",
+        onnx_model_filepath: str = DEFAULT_ONNX_MODEL_FILEPATH,
+        intra_op_num_threads: int = 0,
+        inter_op_num_threads: int = 0,
+        encoder: QueryEncoder | None = None,
     ) -> None:
         self.synonym_dict = synonym_dict
+        # The number of queries (including the original one) to search when synonym expansion is enabled.
+        self.max_expansions = max_expansions
         self.locale = locale
         self.tokenizer: Tokenizer = locale_to_tokenizer(locale)
-        self.encoder: SBERTEncoder = SBERTEncoder(hf_model_name)
-        self.template_loader = TemplateLoader(project_dir)
+        self.hf_model_name = hf_model_name
+        self.encoder_backend = encoder_backend
+        self.onnx_model_filepath = onnx_model_filepath
+        # ONNX Runtime thread counts for the "onnx" backend, where 0 lets ONNX Runtime decide.
+        self.intra_op_num_threads = intra_op_num_threads
+        self.inter_op_num_threads = inter_op_num_threads
+        if encoder is not None:
+            self.encoder = encoder
         if vector_cache is None:
             vector_cache = QueryVectorCache()
         self.vector_cache = vector_cache
+        if embedding_cache is None:
+            embedding_cache = QueryEmbeddingCache()
+        self.embedding_cache = embedding_cache
+
+    @cached_property
+    def encoder(self) -> QueryEncoder:
+        """The query encoder, loaded on first use so that lexical search does not import or load the model."""
+        return load_query_encoder(
+            self.hf_model_name,
+            backend=self.encoder_backend,
+            onnx_model_filepath=self.onnx_model_filepath,
+            intra_op_num_threads=self.intra_op_num_threads,
+            inter_op_num_threads=self.inter_op_num_threads,
+        )
 
     def match_all(self) -> dict[str, Any]:
-        es_query_str = self.template_loader.load("match_all.j2").render()
-        return json.loads(es_query_str)
+        return build_match_all_query()
 
     def build_lexical_search_query(
         self,
@@ -60,30 +103,25 @@ class QueryBuilder:
         if not query:
             return self.match_all()
 
-        tokens = cast(list, self.tokenizer.tokenize(query))
+        tokens = cast(list, self.tokenizer.tokenize_query(query))
 
         if enable_synonym_expansion and self.synonym_dict:
             token_chain = self.synonym_dict.look_up(tokens)
-            expanded_tokens: list[list[tuple[str, float | None]]] = []
-            expand_synonyms(
-                [((token, None), synonym_score_tuples) for token, synonym_score_tuples in token_chain],
-                [],
-                expanded_tokens,
-            )
-            queries = [" ".join([token for token, _ in token_scores]) for token_scores in expanded_tokens]
+            queries = [
+                " ".join([token for token, _ in token_scores])
+                for token_scores in islice(iter_expansions(token_chain), self.max_expansions)
+            ]
         else:
             queries = [" ".join(tokens)]
 
         if weight_dict:
             fields = [f"{field}^{weight_dict.get(field, 1)}" for field in fields]
 
-        query_match = json.loads(
-            self.template_loader.load("lexical.j2").render(
-                queries=queries[:10],
-                fields=fields,
-                operator=operator,
-                enable_phrase_match_boost=enable_phrase_match_boost,
-            )
+        query_match = build_lexical_query(
+            queries=queries,
+            fields=fields,
+            operator=operator,
+            enable_phrase_match_boost=enable_phrase_match_boost,
         )
         if not product_ids:
             return query_match
@@ -102,12 +140,43 @@ class QueryBuilder:
             },
         }
 
-    @weak_lru_cache(maxsize=128)
-    def encode(self, query: str) -> list[float]:
+    def _get_cached_vector(self, query: str) -> QueryVector | None:
         query_vector = self.vector_cache[query]
         if query_vector is not None:
             return query_vector
-        return self.encoder.encode(query).tolist()
+        return self.embedding_cache.get(query)
+
+    def encode(self, query: str) -> list[float]:
+        query_vector = self._get_cached_vector(query)
+        if query_vector is None:
+            query_vector = self.encoder.encode(query)
+            self.embedding_cache.set(query, query_vector)
+        return to_list(query_vector)
+
+    def encode_many(self, queries: list[str]) -> list[list[float]]:
+        """Encode queries, running a single batched forward pass over those not in the caches.
+
+        Args:
+            queries (list[str]): Queries to encode.
+
+        Returns:
+            list[list[float]]: Query vectors in the same order as the queries.
+        """
+        query_vectors: list[QueryVector | None] = [self._get_cached_vector(query) for query in queries]
+        uncached_queries = list(
+            dict.fromkeys(
+                query for query, query_vector in zip(queries, query_vectors, strict=True) if query_vector is None
+            )
+        )
+        if uncached_queries:
+            encoded = dict(zip(uncached_queries, self.encoder.encode(uncached_queries), strict=True))
+            for query, query_vector in encoded.items():
+                self.embedding_cache.set(query, query_vector)
+            query_vectors = [
+                query_vector if query_vector is not None else encoded[query]
+                for query, query_vector in zip(queries, query_vectors, strict=True)
+            ]
+        return [to_list(cast(QueryVector, query_vector)) for query_vector in query_vectors]
 
     def build_semantic_search_query(
         self,
@@ -115,6 +184,7 @@ class QueryBuilder:
         field: str,
         top_k: int,
         product_ids: list[str] | None = None,
+        query_vector: list[float] | None = None,
     ) -> dict[str, Any]:
         """Build a KNN ES query from given conditions.
 
@@ -123,19 +193,20 @@ class QueryBuilder:
             field (str): A field to examine.
             top_k (int): A number specifying how many results to return.
             product_ids (list[str], Optional): A list of product IDs to filter.
+            query_vector (list[float], Optional): A precomputed query vector. If not given, `query` is encoded.
 
         Returns:
             dict[str, Any]: The constructed ES query.
         """
-        query_vector = self.encode(query)
-        es_query_str = self.template_loader.load("semantic.j2").render(
+        if query_vector is None:
+            query_vector = self.encode(query)
+        return build_knn_query(
             query_vector=query_vector,
             field=field,
             k=top_k,
             num_candidates=top_k,
             product_ids=product_ids,
         )
-        return json.loads(es_query_str)
 
     def build_rescore_query(
         self,
@@ -143,9 +214,4 @@ class QueryBuilder:
         window_size: int = 1000,
     ) -> dict[str, Any]:
         query_vector = self.encode(query)
-        return json.loads(
-            self.template_loader.load("rescore.j2").render(
-                query_vector=query_vector,
-                window_size=window_size,
-            )
-        )
+        return build_rescore_query(query_vector=query_vector, window_size=window_size)
@@ -0,0 +1,53 @@
+import fcntl
+import logging
+import os
+from contextlib import contextmanager
+from typing import Iterator
+from uuid import uuid4
+
+
+@contextmanager
+def lock_file(filepath: str, shared: bool = False) -> Iterator[None]:
+    """Hold an advisory lock on `filepath` (created if missing) across processes on the same host.
+
+    Readers take a shared lock and writers an exclusive one. If the lock file cannot be created,
+    e.g., in a read-only directory that no one can write to either, no lock is taken.
+
+    ```
+    with lock_file(f"{data_dir}/cache.lock"):
+        ...  # Build and publish files.
+    ```
+    """
+    try:
+        file = open(filepath, "a")  # noqa: SIM115 (closed by the `with` below)
+    except OSError as e:
+        logging.warning(f"Proceeding without a lock because {filepath} cannot be opened: {e}")
+        yield
+        return
+    with file:
+        fcntl.flock(file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def atomic_write(filepath: str) -> Iterator[str]:
+    """Yield a temporary path to write to, which replaces `filepath` atomically once the block exits successfully.
+
+    The temporary path is `{filepath}.tmp-{random}`, so globs matching the final name do not match it.
+    Readers see either the old file or the complete new one, and the temporary file is removed on failure.
+
+    ```
+    with atomic_write(filepath) as tmp_filepath:
+        df.to_parquet(tmp_filepath)
+    ```
+    """
+    tmp_filepath = f"{filepath}.tmp-{uuid4().hex[:8]}"
+    try:
+        yield tmp_filepath
+        os.replace(tmp_filepath, filepath)
+    finally:
+        if os.path.exists(tmp_filepath):
+            os.remove(tmp_filepath)
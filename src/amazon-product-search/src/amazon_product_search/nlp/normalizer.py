@@ -1,10 +1,19 @@
 import logging
 import re
 import unicodedata
+from functools import lru_cache, partial
+
+import polars as pl
 
 TAG_PATTERN = re.compile(r"<[/a-z0-1 ]*?>")
 WHITESPACE_PATTERN = re.compile(r"\s+")
 ESCAPE_JSON_PATTERN = re.compile(r"['\\\"/\b\f\n\r\t]")
+SURROGATE_PATTERN = re.compile("[\U00010000-\U0010ffff]")
+# Single-pass equivalents of `remove_punctuations` and `escape_json` followed by `remove_extra_spaces`.
+# They are also used by the Polars expressions below. `\x1c-\x1f` are whitespace in Python but not in Polars (Rust),
+# so the query pattern lists them explicitly to give the same results in both.
+DOC_SEPARATOR_PATTERN = re.compile(r"[^#+.°\w]+")
+QUERY_SEPARATOR_PATTERN = re.compile(r"""[\s\x1c-\x1f'\\"/\x08]+""")
 
 
 def remove_html_tags(s: str) -> str:
@@ -27,11 +36,8 @@ def remove_surrogates(s: str) -> str:
     """Remove surrogate pairs.
 
     This function intends to remove unusual special characters such as emojis.
-    In Python, we can identify surrogate pairs by measuring the length.
-    We remove characters whose length is not 2 bytes excluding BOM (Byte Order Mark) in UTF-16.
-
-    "-be" and `-le` stand for big-endian and little-endian, respectively.
-    The suffix is needed to skip BOM when measuring the length of characters.
+    Characters outside the Basic Multilingual Plane (U+10000 and above) are encoded as surrogate pairs
+    in UTF-16, so we remove them with a single regex substitution.
 
     Args:
         s (str): A string to process.
@@ -39,7 +45,7 @@ def remove_surrogates(s: str) -> str:
     Returns:
         str: The processed string.
     """
-    return "".join([c for c in s if len(c.encode("utf-16-be")) == 2])
+    return SURROGATE_PATTERN.sub("", s)
 
 
 def remove_extra_spaces(s: str) -> str:
@@ -70,14 +76,14 @@ def normalize_doc(s: str) -> str:
         s = remove_html_tags(s)
         s = unicodedata.normalize("NFKC", s)
         s = s.lower()
-        s = remove_punctuations(s)
-        s = remove_extra_spaces(s)
+        s = DOC_SEPARATOR_PATTERN.sub(" ", s).strip()
     except Exception as e:
         logging.error(f"Received an unknown exception: {e} when processing {s}")
         raise
     return s
 
 
+@lru_cache(maxsize=65536)
 def normalize_query(s: str) -> str:
     """Normalize a query.
 
@@ -90,6 +96,8 @@ def normalize_query(s: str) -> str:
     because they are rarely used in queries and if they appear in queries,
     they are likely to be meaningful.
 
+    Results are memoized because queries are short and highly repetitive.
+
     Args:
         s (str): A string to process.
 
@@ -99,9 +107,45 @@ def normalize_query(s: str) -> str:
     try:
         s = unicodedata.normalize("NFKC", s)
         s = s.lower()
-        s = escape_json(s)
-        s = remove_extra_spaces(s)
+        s = QUERY_SEPARATOR_PATTERN.sub(" ", s).strip()
     except Exception as e:
         logging.error(f"Received an unknown exception: {e} when processing {s}")
         raise
     return s
+
+
+def _normalize_nfkc_expr(expr: pl.Expr) -> pl.Expr:
+    # `str.normalize` is available in Polars 1.18 and later.
+    if hasattr(expr.str, "normalize"):
+        return expr.str.normalize("NFKC")
+    return expr.map_elements(partial(unicodedata.normalize, "NFKC"), return_dtype=pl.String)
+
+
+def normalize_doc_expr(expr: pl.Expr) -> pl.Expr:
+    """Normalize a string column as `normalize_doc` does, with native Polars string expressions.
+
+    The regex of `\\w` in Polars (Rust) is slightly broader than in Python, e.g., it matches combining marks,
+    so the results may differ for such characters.
+
+    Args:
+        expr (pl.Expr): A string expression to process.
+
+    Returns:
+        pl.Expr: The processed expression.
+    """
+    expr = expr.str.replace_all(TAG_PATTERN.pattern, " ")
+    expr = _normalize_nfkc_expr(expr).str.to_lowercase()
+    return expr.str.replace_all(DOC_SEPARATOR_PATTERN.pattern, " ").str.strip_chars()
+
+
+def normalize_query_expr(expr: pl.Expr) -> pl.Expr:
+    """Normalize a string column as `normalize_query` does, with native Polars string expressions.
+
+    Args:
+        expr (pl.Expr): A string expression to process.
+
+    Returns:
+        pl.Expr: The processed expression.
+    """
+    expr = _normalize_nfkc_expr(expr).str.to_lowercase()
+    return expr.str.replace_all(QUERY_SEPARATOR_PATTERN.pattern, " ").str.strip_chars()
@@ -1,18 +1,56 @@
+import threading
+
 from amazon_product_search.nlp.tokenizers.english_tokenizer import EnglishTokenizer
-from amazon_product_search.nlp.tokenizers.japanese_tokenizer import JapaneseTokenizer
+from amazon_product_search.nlp.tokenizers.japanese_tokenizer import DicType, JapaneseTokenizer, OutputFormat
 from amazon_product_search.nlp.tokenizers.tokenizer import Tokenizer
 from amazon_product_search.source import Locale
 
+_tokenizers: dict[tuple[Locale, DicType, OutputFormat], Tokenizer] = {}
+_tokenizers_lock = threading.Lock()
+
+
+def get_tokenizer(
+    locale: Locale,
+    dic_type: DicType = DicType.UNIDIC,
+    output_format: OutputFormat = OutputFormat.WAKATI,
+) -> Tokenizer:
+    """Return the tokenizer shared in this process for the given locale, dictionary and output format.
+
+    Tokenizers are constructed on first use and reused afterwards. `dic_type` and `output_format` are only used
+    for "jp". A `JapaneseTokenizer` creates a tagger per thread, so a shared instance can be used from any thread.
+
+    Args:
+        locale (Locale): The locale of texts to tokenize.
+        dic_type (DicType, optional): The MeCab dictionary. Defaults to DicType.UNIDIC.
+        output_format (OutputFormat, optional): The output format. Defaults to OutputFormat.WAKATI.
+
+    Returns:
+        Tokenizer: The shared tokenizer.
+    """
+    key = (locale, dic_type, output_format)
+    tokenizer = _tokenizers.get(key)
+    if tokenizer is not None:
+        return tokenizer
+    with _tokenizers_lock:
+        if key not in _tokenizers:
+            match locale:
+                case "us":
+                    _tokenizers[key] = EnglishTokenizer()
+                case "jp":
+                    _tokenizers[key] = JapaneseTokenizer(dic_type, output_format)
+                case _:
+                    raise ValueError(f"Unsupported locale was given: {locale}")
+        return _tokenizers[key]
+
 
 def locale_to_tokenizer(locale: Locale) -> Tokenizer:
-    return {
-        "us": EnglishTokenizer,
-        "jp": JapaneseTokenizer,
-    }[locale]()
+    return get_tokenizer(locale)
 
 
 __all__ = [
     "EnglishTokenizer",
     "JapaneseTokenizer",
     "Tokenizer",
+    "get_tokenizer",
+    "locale_to_tokenizer",
 ]
@@ -1,8 +1,15 @@
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from enum import Enum, auto
-from typing import TypeAlias
+from itertools import chain, islice
+from typing import Iterable, Iterator, TypeAlias
 
 import ipadic
 from fugashi import GenericTagger, Tagger
+from more_itertools import chunked
 
 from amazon_product_search.nlp.tokenizers.tokenizer import Tokenizer
 
@@ -39,6 +46,20 @@ class POSTag(Enum):
     WHITESPACE = "空白"
 
 
+# A tokenizer per worker process, which is initialized by `_init_worker`.
+_worker_tokenizer: "JapaneseTokenizer | None" = None
+
+
+def _init_worker(dic_type: DicType, output_format: OutputFormat) -> None:
+    global _worker_tokenizer
+    _worker_tokenizer = JapaneseTokenizer(dic_type, output_format)
+
+
+def _tokenize_chunk(texts: list[str]) -> list[list[str] | list[tuple[str, str]]]:
+    assert _worker_tokenizer is not None
+    return [_worker_tokenizer.tokenize(s) for s in texts]
+
+
 class JapaneseTokenizer(Tokenizer):
     def __init__(
         self,
@@ -47,21 +68,37 @@ class JapaneseTokenizer(Tokenizer):
     ) -> None:
         self.dic_type = dic_type
         self.output_format = output_format
+        self._executor: ProcessPoolExecutor | None = None
+        self._executor_num_workers: int | None = None
+        self._executor_lock = threading.Lock()
 
         tagger_options = []
         if dic_type == DicType.IPADIC:
             tagger_options.append(ipadic.MECAB_ARGS)
         if output_format == OutputFormat.WAKATI:
             tagger_options.append(f"-O{output_format.value}")
+        self._tagger_args = " ".join(tagger_options)
 
-        self.tagger: Tagger
-        match dic_type:
+        # A MeCab tagger must not be used by multiple threads at the same time, so each thread has its own.
+        self._local = threading.local()
+        # Build the tagger of the current thread eagerly to fail fast on an invalid configuration.
+        self._local.tagger = self._build_tagger()
+
+    def _build_tagger(self) -> TAGGER:
+        match self.dic_type:
             case DicType.UNIDIC:
-                self.tagger = Tagger(" ".join(tagger_options))
+                return Tagger(self._tagger_args)
             case DicType.IPADIC:
-                self.tagger = GenericTagger(" ".join(tagger_options))
+                return GenericTagger(self._tagger_args)
             case _:
-                raise ValueError(f"Unsupported dic_type was given: {dic_type}")
+                raise ValueError(f"Unsupported dic_type was given: {self.dic_type}")
+
+    @property
+    def tagger(self) -> TAGGER:
+        tagger = getattr(self._local, "tagger", None)
+        if tagger is None:
+            tagger = self._local.tagger = self._build_tagger()
+        return tagger
 
     def tokenize(self, s: str) -> list[str] | list[tuple[str, str]]:
         """Tokenize a given string into tokens.
@@ -87,3 +124,71 @@ class JapaneseTokenizer(Tokenizer):
                 case DicType.IPADIC:
                     pos_tags.append(result.feature)
         return list(zip(tokens, pos_tags, strict=True))
+
+    def _get_executor(self, num_workers: int | None) -> ProcessPoolExecutor:
+        """Return the worker pool of this tokenizer, creating it on first use or when `num_workers` changes."""
+        with self._executor_lock:
+            if self._executor is None or self._executor_num_workers != num_workers:
+                if self._executor is not None:
+                    self._executor.shutdown()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=num_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.dic_type, self.output_format),
+                )
+                self._executor_num_workers = num_workers
+            return self._executor
+
+    def close(self) -> None:
+        """Shut down the worker pool created by `tokenize_many`, if any."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def tokenize_many(
+        self,
+        texts: Iterable[str],
+        num_workers: int | None = 1,
+        chunk_size: int = 256,
+        min_parallel_size: int = 10000,
+    ) -> Iterator[list[str] | list[tuple[str, str]]]:
+        """Tokenize given strings in a pool of worker processes, each of which has its own tagger.
+
+        The pool is created on first use and reused by later calls until `close` is called, because starting
+        workers and loading dictionaries takes seconds. Fewer than `min_parallel_size` texts are tokenized
+        in this process, which is faster than sending them to workers.
+
+        Texts are sent to workers in chunks of `chunk_size`, with at most two chunks per worker in flight,
+        and the results are yielded in the same order as the texts as soon as they are available.
+
+        Args:
+            texts (Iterable[str]): Strings to tokenize.
+            num_workers (int | None, optional): The number of worker processes. If 1, texts are tokenized
+                in this process. If None, `os.cpu_count()` is used. Defaults to 1.
+            chunk_size (int, optional): The number of texts sent to a worker at a time. Defaults to 256.
+            min_parallel_size (int, optional): The minimum number of texts to use workers for. Defaults to 10000.
+
+        Yields:
+            Iterator[list[str] | list[tuple[str, str]]]: Tokenized results. See `tokenize`.
+        """
+        if num_workers == 1:
+            yield from super().tokenize_many(texts)
+            return
+
+        texts = iter(texts)
+        head = list(islice(texts, min_parallel_size))
+        if len(head) < min_parallel_size:
+            yield from super().tokenize_many(head)
+            return
+
+        executor = self._get_executor(num_workers)
+        max_in_flight = 2 * (num_workers or os.cpu_count() or 1)
+        futures: deque[Future[list[list[str] | list[tuple[str, str]]]]] = deque()
+        for chunk in chunked(chain(head, texts), chunk_size):
+            futures.append(executor.submit(_tokenize_chunk, chunk))
+            if len(futures) >= max_in_flight:
+                yield from futures.popleft().result()
+        while futures:
+            yield from futures.popleft().result()
@@ -1,6 +1,25 @@
 from abc import ABC, abstractmethod
+from typing import Iterable, Iterator
+
+from amazon_product_search.cache import lru_cache_method
 
 
 class Tokenizer(ABC):
     @abstractmethod
     def tokenize(self, s: str) -> list[str] | list[tuple[str, str]]: ...
+
+    def tokenize_many(self, texts: Iterable[str]) -> Iterator[list[str] | list[tuple[str, str]]]:
+        """Tokenize given strings, yielding results in the same order."""
+        for s in texts:
+            yield self.tokenize(s)
+
+    @lru_cache_method(max_size=8192)
+    def _tokenize_cached(self, s: str) -> list[str] | list[tuple[str, str]]:
+        return self.tokenize(s)
+
+    def tokenize_query(self, s: str) -> list[str] | list[tuple[str, str]]:
+        """Tokenize a given query with memoization.
+
+        Use this instead of `tokenize` for short and repetitive strings such as queries.
+        """
+        return self._tokenize_cached(s).copy()
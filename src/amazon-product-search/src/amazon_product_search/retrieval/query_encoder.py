@@ -0,0 +1,49 @@
+from typing import Any, Literal, Protocol
+
+from amazon_product_search.constants import MODELS_DIR
+
+EncoderBackend = Literal["sbert", "onnx"]
+
+# The quantized model exported by `inv model.export` with the default output model name.
+DEFAULT_ONNX_MODEL_FILEPATH = f"{MODELS_DIR}/model_quantized.onnx"
+
+
+class QueryEncoder(Protocol):
+    def encode(self, texts: Any) -> Any: ...
+
+
+def load_query_encoder(
+    hf_model_name: str,
+    backend: EncoderBackend = "sbert",
+    onnx_model_filepath: str = DEFAULT_ONNX_MODEL_FILEPATH,
+    intra_op_num_threads: int = 0,
+    inter_op_num_threads: int = 0,
+) -> QueryEncoder:
+    """Load a query encoder of the given backend, importing only the dependencies of that backend.
+
+    Args:
+        hf_model_name (str): The Hugging Face model name. For "onnx", it must be the model exported to
+            `onnx_model_filepath` so that its tokenizer is used.
+        backend (EncoderBackend, optional): "sbert" (PyTorch) or "onnx" (ONNX Runtime). Defaults to "sbert".
+        onnx_model_filepath (str, optional): The ONNX model to use for "onnx".
+            Defaults to the quantized model exported by `tasks/model_tasks.py`.
+        intra_op_num_threads (int, optional): ONNX Runtime threads within an operator. Defaults to 0 (auto).
+        inter_op_num_threads (int, optional): ONNX Runtime threads across operators. Defaults to 0 (auto).
+
+    Returns:
+        QueryEncoder: An encoder with `encode(texts)`.
+    """
+    if backend == "sbert":
+        from dense_retrieval.encoders import SBERTEncoder
+
+        return SBERTEncoder(hf_model_name)
+    if backend == "onnx":
+        from dense_retrieval.encoders import ONNXEncoder
+
+        return ONNXEncoder(
+            onnx_model_filepath,
+            tokenizer_name_or_path=hf_model_name,
+            intra_op_num_threads=intra_op_num_threads,
+            inter_op_num_threads=inter_op_num_threads,
+        )
+    raise ValueError(f"Unsupported encoder backend: {backend}")
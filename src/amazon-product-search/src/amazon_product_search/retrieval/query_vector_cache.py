@@ -1,12 +1,88 @@
+import atexit
+import glob
+import hashlib
+import json
 import logging
 import os
+import threading
+import weakref
+from functools import partial
+from typing import TYPE_CHECKING, Any, TypeAlias
+from uuid import uuid4
 
-import pandas as pd
-from google.cloud import bigquery
-from pandas import DataFrame
+import numpy as np
+from numpy.typing import DTypeLike
 
+from amazon_product_search.cache import LRUCache
 from amazon_product_search.constants import DATA_DIR, DATASET_ID, PROJECT_ID
+from amazon_product_search.files import atomic_write, lock_file
 from amazon_product_search.source import Locale
+from amazon_product_search.timestamp import get_unix_timestamp
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+QueryVector: TypeAlias = list[float] | np.ndarray
+
+
+def get_lock_filepath(locale: Locale, data_dir: str) -> str:
+    """Return the lock file guarding the query vector cache files of the locale (see `lock_file`)."""
+    return f"{data_dir}/query_vector_cache_{locale}.lock"
+
+
+def get_spill_filepaths(locale: Locale, data_dir: str) -> list[str]:
+    """Return the published files spilled by `QueryEmbeddingCache` in the order they were written."""
+    return sorted(glob.glob(f"{data_dir}/query_vector_cache_{locale}.spill-*.parquet"))
+
+
+def _compact_spill_files(locale: Locale, data_dir: str) -> int:
+    """Merge spill files into `query_vector_cache_{locale}.parquet` and remove them. See `compact_spill_files`."""
+    filepath = f"{data_dir}/query_vector_cache_{locale}.parquet"
+    spill_filepaths = get_spill_filepaths(locale, data_dir)
+    if not spill_filepaths or not os.path.isfile(filepath):
+        # Without the main file, spill files are kept so that the cache is still loaded from BigQuery.
+        return 0
+    import pandas as pd
+
+    try:
+        df = pd.concat([pd.read_parquet(path) for path in [filepath, *spill_filepaths]], ignore_index=True)
+        # The main file comes first, so its vectors win as in `MmapQueryVectorCache`.
+        df = df.drop_duplicates(subset="query", keep="first", ignore_index=True)
+        # Spilled vectors are float32 while exported ones are float64, which a single column cannot mix.
+        df["query_vector"] = df["query_vector"].map(to_list)
+        with atomic_write(filepath) as tmp_filepath:
+            df.to_parquet(tmp_filepath)
+        for spill_filepath in spill_filepaths:
+            os.remove(spill_filepath)
+    except OSError as e:
+        logging.warning(f"Spill files were not compacted: {e}")
+        return 0
+    logging.info(f"{len(spill_filepaths)} spill files compacted into {filepath} with {len(df)} rows.")
+    return len(spill_filepaths)
+
+
+def compact_spill_files(locale: Locale, data_dir: str = DATA_DIR) -> int:
+    """Merge the files spilled by `QueryEmbeddingCache` into `query_vector_cache_{locale}.parquet` and remove them.
+
+    Loading caches does this as well, so that spill files do not pile up and `MmapQueryVectorCache` is rebuilt
+    only once for them. Nothing is done if the main file does not exist or the directory is not writable.
+
+    Args:
+        locale (Locale): The locale to compact the files of.
+        data_dir (str, optional): The data directory of the cache. Defaults to DATA_DIR.
+
+    Returns:
+        int: The number of compacted spill files.
+    """
+    with lock_file(get_lock_filepath(locale, data_dir)):
+        return _compact_spill_files(locale, data_dir)
+
+
+def to_list(query_vector: QueryVector) -> list[float]:
+    """Convert a query vector returned from a cache to a list, e.g., to embed it in a JSON query."""
+    if isinstance(query_vector, np.ndarray):
+        return query_vector.tolist()
+    return query_vector
 
 
 class QueryVectorCache:
@@ -18,30 +94,57 @@ class QueryVectorCache:
     ) -> None:
         """Attempt to load query vector cache from file, otherwise load from BigQuery.
 
+        Spill files are compacted into the file first (see `compact_spill_files`).
+
         Args:
             locale (Locale): The locale to load the cache for.
             project_id (str, optional): The BigQuery project ID. Defaults to PROJECT_ID.
             dataset_id (str, optional): The dataset ID. Defaults to DATASET_ID.
             data_dir (str, optional): The data directory to save and load the cache from. Defaults to DATA_DIR.
         """
-        self._cache = self._load_cache_from_file(locale, data_dir)
-        if self._cache:
+        with lock_file(get_lock_filepath(locale, data_dir)):
+            _compact_spill_files(locale, data_dir)
+            df = self._load_df(locale, project_id, dataset_id, data_dir)
+        if df is None:
+            self._cache = {}
             return
-        self._cache = self._load_cache_from_bq(locale, project_id, dataset_id, data_dir)
+        df["query_vector"] = df["query_vector"].apply(to_list)
+        self._cache = self._df_to_cache_dict(df)
+
+    def _load_df(self, locale: Locale, project_id: str, dataset_id: str, data_dir: str) -> "DataFrame | None":
+        df = self._load_df_from_file(locale, data_dir)
+        if df is None:
+            df = self._load_df_from_bq(locale, project_id, dataset_id, data_dir)
+        spill_df = self._load_spill_df(locale, data_dir)
+        if spill_df is None:
+            return df
+        import pandas as pd
+
+        return spill_df if df is None else pd.concat([df, spill_df], ignore_index=True)
 
-    def _load_cache_from_file(self, locale: Locale, data_dir: str) -> dict[str, list[float]]:
+    def _load_spill_df(self, locale: Locale, data_dir: str) -> "DataFrame | None":
+        """Load vectors spilled by `QueryEmbeddingCache`."""
+        filepaths = get_spill_filepaths(locale, data_dir)
+        if not filepaths:
+            return None
+        import pandas as pd
+
+        df = pd.concat([pd.read_parquet(filepath) for filepath in filepaths], ignore_index=True)
+        logging.info(f"Spilled query vectors loaded from {len(filepaths)} files with {len(df)} rows.")
+        return df
+
+    def _load_df_from_file(self, locale: Locale, data_dir: str) -> "DataFrame | None":
         filepath = f"{data_dir}/query_vector_cache_{locale}.parquet"
         if not os.path.isfile(filepath):
             logging.info(f"Attempted to load query vector cache from {filepath} but file does not exist.")
-            return {}
+            return None
+        import pandas as pd
+
         df = pd.read_parquet(filepath)
-        df["query_vector"] = df["query_vector"].apply(lambda v: v.tolist())
         logging.info(f"Query vector cache loaded from {filepath} with {len(df)} rows.")
-        return self._df_to_cache_dict(df)
+        return df
 
-    def _load_cache_from_bq(
-        self, locale: Locale, project_id: str, dataset_id: str, data_dir: str
-    ) -> dict[str, list[float]]:
+    def _load_df_from_bq(self, locale: Locale, project_id: str, dataset_id: str, data_dir: str) -> "DataFrame | None":
         sql = f"""
         SELECT
             query,
@@ -51,26 +154,267 @@ class QueryVectorCache:
         LIMIT
             1000000
         """
-        cache: dict[str, list[float]] = {}
         try:
+            from google.cloud import bigquery
+
             df = bigquery.Client().query(sql).to_dataframe()
             logging.info(f"Query vector cache loaded from BigQuery with {len(df)} rows.")
             self._save_cache_to_file(df, locale, data_dir)
-            cache = self._df_to_cache_dict(df)
+            return df
         except Exception as e:
             logging.error(e)
-        return cache
+        return None
 
-    def _save_cache_to_file(self, df: DataFrame, locale: Locale, data_dir: str) -> None:
+    def _save_cache_to_file(self, df: "DataFrame", locale: Locale, data_dir: str) -> None:
         filepath = f"{data_dir}/query_vector_cache_{locale}.parquet"
-        df.to_parquet(filepath)
+        with atomic_write(filepath) as tmp_filepath:
+            df.to_parquet(tmp_filepath)
         logging.info(f"Query vector cache saved to {filepath}")
 
-    def _df_to_cache_dict(self, df: DataFrame) -> dict[str, list[float]]:
+    def _df_to_cache_dict(self, df: "DataFrame") -> dict[str, list[float]]:
         cache: dict[str, list[float]] = {}
         for row in df.to_dict(orient="records"):
             cache[row["query"]] = row["query_vector"]
         return cache
 
-    def __getitem__(self, query: str) -> list[float] | None:
+    def __getitem__(self, query: str) -> QueryVector | None:
         return self._cache.get(query, None)
+
+
+class MmapQueryVectorCache(QueryVectorCache):
+    """A query vector cache backed by memory-mapped NumPy files.
+
+    Vectors are stored in a contiguous (num_queries, dim) matrix, and queries are indexed by a sorted array of
+    64-bit hashes in the same row order. Both files are opened with `mmap_mode="r"`, so loading takes constant time
+    regardless of the number of queries and the pages are shared by all processes on the same host.
+
+    The files are built from the parquet file (or BigQuery) and the spill files used by `QueryVectorCache`.
+    Each build writes a new pair of files (`query_vector_cache_{locale}.{build_id}.keys.npy` and
+    `query_vector_cache_{locale}.{build_id}.vectors.npy`) and then atomically replaces the manifest
+    (`query_vector_cache_{locale}.mmap.json`) that points to them, so concurrent workers never see a half-written
+    or mismatched pair. The manifest also records the mtime and size of the source files, and the files are rebuilt
+    when any of them changes. Builds hold an exclusive lock on `query_vector_cache_{locale}.lock` and loads hold
+    a shared one, so only one worker builds at a time, and older builds are removed only when no one is between
+    reading the manifest and mapping the files it points to.
+    `dtype` (float32 or float16) is applied when building the files; existing files are loaded as they are.
+
+    Queries are not stored, so two queries whose hashes collide share a vector.
+    With 64-bit hashes, the probability of any collision among a million queries is about 3e-8.
+    """
+
+    def __init__(self, dtype: DTypeLike = np.float32) -> None:
+        super().__init__()
+        self.dtype = np.dtype(dtype)
+        self._keys: np.ndarray = np.array([], dtype=np.uint64)
+        self._vectors: np.ndarray = np.empty((0, 0), dtype=self.dtype)
+
+    @staticmethod
+    def _hash(query: str) -> int:
+        return int.from_bytes(hashlib.blake2b(query.encode(), digest_size=8).digest(), "little")
+
+    @staticmethod
+    def _get_manifest_filepath(locale: Locale, data_dir: str) -> str:
+        return f"{data_dir}/query_vector_cache_{locale}.mmap.json"
+
+    @staticmethod
+    def _get_filepaths(locale: Locale, data_dir: str, build_id: str) -> tuple[str, str]:
+        prefix = f"{data_dir}/query_vector_cache_{locale}.{build_id}"
+        return f"{prefix}.keys.npy", f"{prefix}.vectors.npy"
+
+    @staticmethod
+    def _get_source_stats(locale: Locale, data_dir: str) -> list[list[str | int]]:
+        """Return the name, mtime and size of each source file, which change whenever a source file is rewritten."""
+        filepaths = glob.glob(f"{data_dir}/query_vector_cache_{locale}.parquet")
+        filepaths += get_spill_filepaths(locale, data_dir)
+        stats: list[list[str | int]] = []
+        for filepath in sorted(filepaths):
+            stat = os.stat(filepath)
+            stats.append([os.path.basename(filepath), stat.st_mtime_ns, stat.st_size])
+        return stats
+
+    @staticmethod
+    def _read_manifest(manifest_filepath: str) -> dict[str, Any] | None:
+        if not os.path.isfile(manifest_filepath):
+            return None
+        with open(manifest_filepath) as file:
+            return json.load(file)
+
+    def load(
+        self, locale: Locale, project_id: str = PROJECT_ID, dataset_id: str = DATASET_ID, data_dir: str = DATA_DIR
+    ) -> None:
+        """Memory-map the cache files, building them first if they do not exist or their sources changed.
+
+        Args:
+            locale (Locale): The locale to load the cache for.
+            project_id (str, optional): The BigQuery project ID. Defaults to PROJECT_ID.
+            dataset_id (str, optional): The dataset ID. Defaults to DATASET_ID.
+            data_dir (str, optional): The data directory to save and load the cache from. Defaults to DATA_DIR.
+        """
+        lock_filepath = get_lock_filepath(locale, data_dir)
+        with lock_file(lock_filepath, shared=True):
+            manifest = self._read_manifest(self._get_manifest_filepath(locale, data_dir))
+            if manifest is not None and manifest["sources"] == self._get_source_stats(locale, data_dir):
+                self._mmap(locale, data_dir, manifest)
+                return
+
+        with lock_file(lock_filepath):
+            # Another worker may have built the files while this one was waiting for the lock.
+            manifest = self._read_manifest(self._get_manifest_filepath(locale, data_dir))
+            source_stats = self._get_source_stats(locale, data_dir)
+            if manifest is None or manifest["sources"] != source_stats:
+                if _compact_spill_files(locale, data_dir):
+                    source_stats = self._get_source_stats(locale, data_dir)
+                df = self._load_df(locale, project_id, dataset_id, data_dir)
+                if df is None:
+                    return
+                # The stats are taken before reading the sources, so a source written meanwhile triggers a rebuild.
+                manifest = self._build(df, locale, data_dir, source_stats)
+            self._mmap(locale, data_dir, manifest)
+
+    def _mmap(self, locale: Locale, data_dir: str, manifest: dict[str, Any]) -> None:
+        keys_filepath, vectors_filepath = self._get_filepaths(locale, data_dir, manifest["build_id"])
+        self._keys = np.load(keys_filepath, mmap_mode="r")
+        self._vectors = np.load(vectors_filepath, mmap_mode="r")
+        logging.info(f"Query vector cache memory-mapped from {vectors_filepath} with {len(self._keys)} rows.")
+
+    def _build(
+        self, df: "DataFrame", locale: Locale, data_dir: str, source_stats: list[list[str | int]]
+    ) -> dict[str, Any]:
+        """Write a new pair of files, publish it by replacing the manifest and remove older builds.
+
+        It must be called with the exclusive lock held.
+        """
+        build_id = f"{get_unix_timestamp()}-{uuid4().hex[:8]}"
+        keys_filepath, vectors_filepath = self._get_filepaths(locale, data_dir, build_id)
+        self._save_mmap_files(df, keys_filepath, vectors_filepath)
+
+        manifest = {"build_id": build_id, "sources": source_stats}
+        with (
+            atomic_write(self._get_manifest_filepath(locale, data_dir)) as tmp_filepath,
+            open(tmp_filepath, "w") as file,
+        ):
+            json.dump(manifest, file)
+
+        # Files that are already memory-mapped stay readable after being removed.
+        for filepath in glob.glob(f"{data_dir}/query_vector_cache_{locale}.*-*.*.npy"):
+            if os.path.basename(filepath).split(".")[1] != build_id:
+                os.remove(filepath)
+        return manifest
+
+    def _save_mmap_files(self, df: "DataFrame", keys_filepath: str, vectors_filepath: str) -> None:
+        keys = np.fromiter((self._hash(query) for query in df["query"]), dtype=np.uint64, count=len(df))
+        # `np.unique` sorts the keys, and duplicated queries keep their first vector.
+        keys, indices = np.unique(keys, return_index=True)
+        query_vectors = df["query_vector"].to_numpy()
+        dim = len(query_vectors[0]) if len(query_vectors) else 0
+        vectors = np.lib.format.open_memmap(vectors_filepath, mode="w+", dtype=self.dtype, shape=(len(keys), dim))
+        for row, index in enumerate(indices):
+            vectors[row] = query_vectors[index]
+        vectors.flush()
+        np.save(keys_filepath, keys)
+        logging.info(f"Query vector cache saved to {vectors_filepath} with {len(keys)} rows.")
+
+    def __getitem__(self, query: str) -> np.ndarray | None:
+        """Return a read-only view of the query vector without copying, or None if not cached."""
+        if not len(self._keys):
+            return None
+        key = np.uint64(self._hash(query))
+        row = int(np.searchsorted(self._keys, key))
+        if row == len(self._keys) or self._keys[row] != key:
+            return None
+        return self._vectors[row]
+
+
+class QueryEmbeddingCache:
+    """A thread-safe LRU cache of query vectors computed online, bounded by bytes.
+
+    Unlike `QueryVectorCache`, which is loaded once, this cache records vectors as they are encoded.
+    A single instance can be shared by multiple `QueryBuilder`s.
+
+    If `locale` is given, newly computed vectors are also spilled to
+    `{data_dir}/query_vector_cache_{locale}.spill-*.parquet` every `spill_every` new vectors (and on `spill()`),
+    which `QueryVectorCache.load` picks up next time. Vectors still pending are spilled on `close()`
+    or at interpreter exit.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        locale: Locale | None = None,
+        data_dir: str = DATA_DIR,
+        spill_every: int = 1000,
+    ) -> None:
+        self.locale = locale
+        self.data_dir = data_dir
+        self.spill_every = spill_every
+        self._cache = LRUCache[str, np.ndarray](max_size=None, max_bytes=max_bytes)
+        self._pending: dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self._spill_at_exit = None
+        if locale:
+            # A weak reference so that the hook does not keep the cache alive.
+            self._spill_at_exit = partial(_spill_at_exit, weakref.ref(self))
+            atexit.register(self._spill_at_exit)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(self, query: str) -> np.ndarray | None:
+        return self._cache.get(query)
+
+    def set(self, query: str, query_vector: QueryVector) -> None:
+        array = np.asarray(query_vector, dtype=np.float32)
+        self._cache.set(query, array)
+        if not self.locale:
+            return
+        with self._lock:
+            self._pending[query] = array
+            should_spill = len(self._pending) >= self.spill_every
+        if should_spill:
+            self.spill()
+
+    def spill(self) -> str | None:
+        """Write vectors added since the last spill to a new parquet file.
+
+        Returns:
+            str | None: The written file path, or None if there was nothing to write.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not self.locale or not pending:
+            return None
+        import pandas as pd
+
+        filepath = (
+            f"{self.data_dir}/query_vector_cache_{self.locale}.spill-{get_unix_timestamp()}-{uuid4().hex[:8]}.parquet"
+        )
+        df = pd.DataFrame({"query": list(pending.keys()), "query_vector": list(pending.values())})
+        # Spill files are loaded by globbing their final names, so they must never be seen half-written.
+        with atomic_write(filepath) as tmp_filepath:
+            df.to_parquet(tmp_filepath)
+        logging.info(f"{len(df)} query vectors spilled to {filepath}")
+        return filepath
+
+    def close(self) -> str | None:
+        """Spill vectors still pending and stop doing so at interpreter exit.
+
+        Returns:
+            str | None: The written file path, or None if there was nothing to write.
+        """
+        if self._spill_at_exit is not None:
+            atexit.unregister(self._spill_at_exit)
+            self._spill_at_exit = None
+        return self.spill()
+
+    def stats(self) -> dict[str, float]:
+        return self._cache.stats()
+
+
+def _spill_at_exit(cache_ref: "weakref.ReferenceType[QueryEmbeddingCache]") -> None:
+    cache = cache_ref()
+    if cache is None:
+        return
+    try:
+        cache.spill()
+    except Exception as e:
+        logging.warning(f"Query vectors pending at exit were not spilled: {e}")
@@ -1,14 +1,19 @@
+import heapq
 from dataclasses import dataclass
 from functools import partial
 from typing import Any, Callable, Literal
 
+import numpy as np
+
 from amazon_product_search.retrieval.response import Response, Result
 from amazon_product_search.retrieval.score_normalizer import min_max_scale
 from amazon_product_search.retrieval.weighting_strategy import FixedWeighting
 
 _ScoreTransformationMethod = Literal["min_max", "rrf", "borda"]
 
-ScoreTransformationMethod = _ScoreTransformationMethod | list[_ScoreTransformationMethod] | None  # type: ignore
+ScoreTransformationMethod = (  # type: ignore
+    _ScoreTransformationMethod | list[_ScoreTransformationMethod] | dict[str, _ScoreTransformationMethod | None] | None
+)
 
 CombinationMethod = Literal["sum", "max", "append"]
 
@@ -20,6 +25,8 @@ class RankFusion:
     score_transformation_method: ScoreTransformationMethod = "min_max"
     weighting_strategy: Literal["fixed"] = "fixed"
     ranking_constant: int = 60
+    # If True, scores are transformed and combined on NumPy arrays (see `_fuse_vectorized`).
+    vectorized: bool = False
 
 
 def _min_max_scores(response: Response) -> Response:
@@ -71,32 +78,57 @@ def _borda_counts(response: Response, n: int) -> Response:
     return Response(results=results, total_hits=response.total_hits)
 
 
-def _transform_scores(
-    lexical_response: Response, semantic_response: Response, rank_fusion: RankFusion, size: int
-) -> tuple[Response, Response]:
-    score_transformation_method = rank_fusion.score_transformation_method
-    if score_transformation_method is None:
-        return lexical_response, semantic_response
+def _resolve_score_transformation_methods(
+    score_transformation_method: ScoreTransformationMethod, leg_names: list[str]
+) -> dict[str, _ScoreTransformationMethod | None]:
+    """Return the score transformation method for each leg.
+
+    A single method is applied to all legs, a list is matched with legs by position,
+    and a dict is matched by leg name (legs not in the dict are left as they are).
 
+    Args:
+        score_transformation_method (ScoreTransformationMethod): The method(s) given via `RankFusion`.
+        leg_names (list[str]): The names of the legs to fuse.
+
+    Returns:
+        dict[str, _ScoreTransformationMethod | None]: A dict of leg name to method.
+    """
+    if score_transformation_method is None or isinstance(score_transformation_method, str):
+        return {leg_name: score_transformation_method for leg_name in leg_names}
+
+    if isinstance(score_transformation_method, list):
+        if len(score_transformation_method) != len(leg_names):
+            raise ValueError(
+                f"score_transformation_method has {len(score_transformation_method)} elements "
+                f"but {len(leg_names)} legs are given: {leg_names}"
+            )
+        return dict(zip(leg_names, score_transformation_method, strict=True))
+
+    if isinstance(score_transformation_method, dict):
+        return {leg_name: score_transformation_method.get(leg_name) for leg_name in leg_names}
+
+    raise ValueError(f"Invalid score_transformation_method: {score_transformation_method}")
+
+
+def _transform_responses(responses: dict[str, Response], rank_fusion: RankFusion, size: int) -> dict[str, Response]:
     score_transformation_method_dict: dict[str | None, Callable[[Response], Response]] = {
         "min_max": _min_max_scores,
         "rrf": partial(_rrf_scores, k=rank_fusion.ranking_constant),
         "borda": partial(_borda_counts, n=size),
         None: lambda response: response,
     }
+    methods = _resolve_score_transformation_methods(rank_fusion.score_transformation_method, list(responses))
+    return {
+        leg_name: score_transformation_method_dict[methods[leg_name]](response)
+        for leg_name, response in responses.items()
+    }
 
-    if isinstance(score_transformation_method, str):
-        lexical_response = score_transformation_method_dict[score_transformation_method](lexical_response)
-        semantic_response = score_transformation_method_dict[score_transformation_method](semantic_response)
-        return lexical_response, semantic_response
-
-    if isinstance(score_transformation_method, list):
-        for_lexical, for_semantic = tuple(score_transformation_method)
-        lexical_response = score_transformation_method_dict[for_lexical](lexical_response)
-        semantic_response = score_transformation_method_dict[for_semantic](semantic_response)
-        return lexical_response, semantic_response
 
-    raise ValueError(f"Invalid score_transformation_method: {score_transformation_method}")
+def _transform_scores(
+    lexical_response: Response, semantic_response: Response, rank_fusion: RankFusion, size: int
+) -> tuple[Response, Response]:
+    responses = _transform_responses({"lexical": lexical_response, "semantic": semantic_response}, rank_fusion, size)
+    return responses["lexical"], responses["semantic"]
 
 
 def _append_results(original_response: Response, alternative_response: Response, size: int) -> Response:
@@ -118,6 +150,41 @@ def _append_results(original_response: Response, alternative_response: Response,
     return Response(results=results, total_hits=total_hits)
 
 
+def _merge_responses(responses: dict[str, Response], combination_method: CombinationMethod, size: int) -> Response:
+    """Merge any number of responses by score.
+
+    All hits are visited once to collect the score of each leg per product, and the top `size` products are
+    selected with a heap, so the cost grows linearly in the total number of hits.
+    The score of each leg is stored in the explanation as `{leg_name}_score` (0 if the leg did not return it).
+
+    Args:
+        responses (dict[str, Response]): Responses keyed by leg name, e.g., `{"lexical": ..., "semantic": ...}`.
+        combination_method (CombinationMethod): The method to combine results.
+        size (int): The number of results to return.
+
+    Returns:
+        Response: A merged response.
+    """
+    id_to_product: dict[str, dict[str, Any]] = {}
+    id_to_leg_scores: dict[str, dict[str, float]] = {}
+    for leg_name, response in responses.items():
+        for result in response.results:
+            product_id = result.product["product_id"]
+            id_to_product[product_id] = result.product
+            id_to_leg_scores.setdefault(product_id, {})[leg_name] = result.score
+
+    results: list[Result] = []
+    for product_id, leg_scores in id_to_leg_scores.items():
+        scores = [leg_scores.get(leg_name, 0) for leg_name in responses]
+        score = max(scores) if combination_method == "max" else sum(scores)
+        explanation = {f"{leg_name}_score": leg_score for leg_name, leg_score in zip(responses, scores, strict=True)}
+        results.append(Result(product=id_to_product[product_id], score=score, explanation=explanation))
+    total_hits = max([response.total_hits for response in responses.values()] + [len(results)])
+
+    results = heapq.nlargest(size, results, key=lambda result: (result.score, result.product["product_id"]))
+    return Response(results=results, total_hits=total_hits)
+
+
 def _combine_responses(
     lexical_response: Response, semantic_response: Response, combination_method: CombinationMethod, size: int
 ) -> Response:
@@ -132,54 +199,197 @@ def _combine_responses(
     Returns:
         Response: A merged response.
     """
-    id_to_product: dict[str, dict[str, Any]] = {}
-    lexical_results: dict[str, float] = {}
-    semantic_results: dict[str, float] = {}
-
-    for result in lexical_response.results:
-        product_id = result.product["product_id"]
-        id_to_product[product_id] = result.product
-        lexical_results[product_id] = result.score
-    for result in semantic_response.results:
-        product_id = result.product["product_id"]
-        id_to_product[product_id] = result.product
-        semantic_results[product_id] = result.score
+    return _merge_responses({"lexical": lexical_response, "semantic": semantic_response}, combination_method, size)
 
-    results: list[Result] = []
-    for product_id in lexical_results.keys() | semantic_results.keys():
-        lexical_score, semantic_score = lexical_results.get(product_id, 0), semantic_results.get(product_id, 0)
-        score = max(lexical_score, semantic_score) if combination_method == "max" else lexical_score + semantic_score
-        explanation = {
-            "lexical_score": lexical_score,
-            "semantic_score": semantic_score,
-        }
-        result = Result(product=id_to_product[product_id], score=score, explanation=explanation)
-        results.append(result)
-    total_hits = max(lexical_response.total_hits, semantic_response.total_hits, len(results))
-
-    results = sorted(results, key=lambda result: (result.score, result.product["product_id"]), reverse=True)[:size]
+
+@dataclass
+class _ScoreArray:
+    """A response represented as parallel arrays of product IDs and scores in rank order."""
+
+    products: list[dict[str, Any]]
+    product_ids: np.ndarray
+    scores: np.ndarray
+    total_hits: int
+
+    @staticmethod
+    def from_response(response: Response) -> "_ScoreArray":
+        products = [result.product for result in response.results]
+        return _ScoreArray(
+            products=products,
+            product_ids=np.array([product["product_id"] for product in products], dtype=str),
+            scores=np.fromiter((result.score for result in response.results), dtype=np.float64),
+            total_hits=response.total_hits,
+        )
+
+
+def _transform_score_array(
+    scores: np.ndarray, method: _ScoreTransformationMethod | None, ranking_constant: int, n: int
+) -> np.ndarray:
+    """Apply the same transformation as `_min_max_scores`, `_rrf_scores` and `_borda_counts` to a score array.
+
+    Args:
+        scores (np.ndarray): Scores in rank order.
+        method (_ScoreTransformationMethod | None): The transformation to apply.
+        ranking_constant (int): The ranking constant for RRF.
+        n (int): The number of points given to the first result for Borda count.
+
+    Returns:
+        np.ndarray: Transformed scores.
+    """
+    ranks = np.arange(len(scores), dtype=np.float64)
+    match method:
+        case "min_max":
+            if not len(scores):
+                return scores
+            max_val = scores.max()
+            if max_val == 0:
+                return np.full(len(scores), 0.5)
+            return scores / max_val
+        case "rrf":
+            return 1 / (ranking_constant + ranks + 1)
+        case "borda":
+            return n - ranks
+        case None:
+            return scores
+    raise ValueError(f"Invalid score_transformation_method: {method}")
+
+
+def _top_k_indices(scores: np.ndarray, size: int) -> np.ndarray:
+    """Return the indices of the top `size` scores, sorted by score and then by index in descending order.
+
+    `np.argpartition` narrows the candidates down first so that only (about) `size` elements are sorted.
+    Elements tied with the `size`-th score are kept as candidates so that ties are broken deterministically.
+
+    Args:
+        scores (np.ndarray): Scores to rank.
+        size (int): The number of indices to return.
+
+    Returns:
+        np.ndarray: The indices of the top scores.
+    """
+    if size <= 0 or not len(scores):
+        return np.array([], dtype=np.int64)
+    if size < len(scores):
+        threshold = scores[np.argpartition(-scores, size - 1)[:size]].min()
+        candidates = np.flatnonzero(scores >= threshold)
+    else:
+        candidates = np.arange(len(scores))
+    order = np.lexsort((candidates, scores[candidates]))[::-1]
+    return candidates[order][:size]
+
+
+def _fuse_vectorized(
+    query: str,
+    responses: dict[str, Response],
+    weights: dict[str, float],
+    rank_fusion: RankFusion,
+    size: int,
+) -> Response:
+    """Equivalent to `fuse_many` for `combination_method` of "sum" or "max", but computed on NumPy arrays.
+
+    Product IDs of all responses are mapped to a sorted union with `np.unique`, so each leg becomes
+    a row of a (num_legs, num_products) matrix. `Result` objects are created only for the returned hits.
+    """
+    legs = {leg_name: _ScoreArray.from_response(response) for leg_name, response in responses.items()}
+    methods = _resolve_score_transformation_methods(rank_fusion.score_transformation_method, list(legs))
+    weighting_strategy = FixedWeighting(weights) if rank_fusion.weighting_strategy else None
+
+    all_product_ids = np.concatenate([leg.product_ids for leg in legs.values()] + [np.array([], dtype=str)])
+    unique_product_ids, inverse = np.unique(all_product_ids, return_inverse=True)
+    leg_scores = np.zeros((len(legs), len(unique_product_ids)))
+    # Points to the product dict of each unique product ID. Later legs take precedence as in `_merge_responses`.
+    product_indices = np.zeros(len(unique_product_ids), dtype=np.int64)
+    offset = 0
+    for i, (leg_name, leg) in enumerate(legs.items()):
+        positions = inverse[offset : offset + len(leg.product_ids)]
+        scores = _transform_score_array(leg.scores, methods[leg_name], rank_fusion.ranking_constant, size)
+        if weighting_strategy:
+            scores = scores * weighting_strategy.apply(leg_name, query)
+        leg_scores[i, positions] = scores
+        product_indices[positions] = np.arange(offset, offset + len(leg.product_ids))
+        offset += len(leg.product_ids)
+
+    scores = leg_scores.max(axis=0) if rank_fusion.combination_method == "max" else leg_scores.sum(axis=0)
+    products = [product for leg in legs.values() for product in leg.products]
+    results = [
+        Result(
+            product=products[product_indices[i]],
+            score=float(scores[i]),
+            explanation={f"{leg_name}_score": float(leg_scores[j, i]) for j, leg_name in enumerate(legs)},
+        )
+        for i in _top_k_indices(scores, size)
+    ]
+    total_hits = max([leg.total_hits for leg in legs.values()] + [len(unique_product_ids)])
     return Response(results=results, total_hits=total_hits)
 
 
-def fuse(
+def fuse_many(
     query: str,
-    lexical_response: Response,
-    semantic_response: Response,
-    lexical_boost: float,
-    semantic_boost: float,
+    responses: dict[str, Response],
     rank_fusion: RankFusion,
     size: int,
+    weights: dict[str, float] | None = None,
 ) -> Response:
+    """Fuse any number of responses from different retrieval legs.
+
+    ```
+    fuse_many(
+        query,
+        responses={"title": title_response, "bullet_point": bullet_point_response, "dense": dense_response},
+        rank_fusion=RankFusion(score_transformation_method={"title": "min_max", "bullet_point": "min_max"}),
+        size=20,
+        weights={"title": 1.0, "bullet_point": 0.5, "dense": 1.0},
+    )
+    ```
+
+    Args:
+        query (str): The query.
+        responses (dict[str, Response]): Responses keyed by leg name. The order matters for "append".
+        rank_fusion (RankFusion): How to fuse responses. `score_transformation_method` can be given per leg
+            either as a list in the same order as `responses` or as a dict keyed by leg name.
+        size (int): The number of results to return.
+        weights (dict[str, float] | None, optional): The weight of each leg. Missing legs are weighted 1.0.
+
+    Returns:
+        Response: The fused response.
+    """
     if rank_fusion.combination_method == "append":
-        return _append_results(lexical_response, semantic_response, size)
+        if not responses:
+            return Response(results=[], total_hits=0)
+        fused_response, *alternative_responses = responses.values()
+        for alternative_response in alternative_responses:
+            fused_response = _append_results(fused_response, alternative_response, size)
+        return fused_response
 
-    lexical_response, semantic_response = _transform_scores(lexical_response, semantic_response, rank_fusion, size)
+    weights = {leg_name: (weights or {}).get(leg_name, 1.0) for leg_name in responses}
+    if rank_fusion.vectorized:
+        return _fuse_vectorized(query, responses, weights, rank_fusion, size)
+
+    responses = _transform_responses(responses, rank_fusion, size)
 
     if rank_fusion.weighting_strategy:
-        weighting_strategy = FixedWeighting({"lexical": lexical_boost, "semantic": semantic_boost})
-        for result in lexical_response.results:
-            result.score *= weighting_strategy.apply("lexical", query)
-        for result in semantic_response.results:
-            result.score *= weighting_strategy.apply("semantic", query)
+        weighting_strategy = FixedWeighting(weights)
+        for leg_name, response in responses.items():
+            weight = weighting_strategy.apply(leg_name, query)
+            for result in response.results:
+                result.score *= weight
+
+    return _merge_responses(responses, rank_fusion.combination_method, size)
 
-    return _combine_responses(lexical_response, semantic_response, rank_fusion.combination_method, size)
+
+def fuse(
+    query: str,
+    lexical_response: Response,
+    semantic_response: Response,
+    lexical_boost: float,
+    semantic_boost: float,
+    rank_fusion: RankFusion,
+    size: int,
+) -> Response:
+    return fuse_many(
+        query,
+        {"lexical": lexical_response, "semantic": semantic_response},
+        rank_fusion,
+        size,
+        weights={"lexical": lexical_boost, "semantic": semantic_boost},
+    )
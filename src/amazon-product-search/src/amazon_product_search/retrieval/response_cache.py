@@ -0,0 +1,75 @@
+import hashlib
+import json
+import pickle
+import threading
+from collections import defaultdict
+from typing import Any
+
+from amazon_product_search.cache import LRUCache
+from amazon_product_search.retrieval.response import Response
+
+
+class ResponseCache:
+    """A cache of fused responses keyed by a canonical hash of the normalized query and search parameters.
+
+    Responses are stored pickled, so the size of each entry is known exactly and every hit returns a fresh copy
+    that callers can modify freely.
+
+    Each index has a generation number that is part of the key. `invalidate(index_name)` increments it,
+    so responses cached before the index was re-fed are never returned again and are evicted as they age out.
+
+    Args:
+        max_size (int | None, optional): The maximum number of responses. Defaults to 10000.
+        max_bytes (int | None, optional): The maximum total size of pickled responses. Defaults to 256 MiB.
+        ttl (float | None, optional): Seconds after which a response expires. Defaults to 300.
+    """
+
+    def __init__(
+        self,
+        max_size: int | None = 10000,
+        max_bytes: int | None = 256 * 1024 * 1024,
+        ttl: float | None = 300.0,
+    ) -> None:
+        self._cache = LRUCache[str, bytes](max_size=max_size, max_bytes=max_bytes, ttl=ttl, size_of=len)
+        self._generations: defaultdict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def make_key(self, index_name: str, **params: Any) -> str:
+        """Return a key that is identical for identical parameters regardless of the order of keyword arguments.
+
+        Args:
+            index_name (str): The index name to search.
+            **params: Other search parameters. They must be JSON serializable.
+
+        Returns:
+            str: The cache key.
+        """
+        with self._lock:
+            generation = self._generations[index_name]
+        payload = json.dumps(
+            {"index_name": index_name, "generation": generation, **params},
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Response | None:
+        data = self._cache.get(key)
+        if data is None:
+            return None
+        return pickle.loads(data)
+
+    def set(self, key: str, response: Response) -> None:
+        self._cache.set(key, pickle.dumps(response, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def invalidate(self, index_name: str | None = None) -> None:
+        """Invalidate cached responses of the given index, or all responses if `index_name` is None."""
+        if index_name is None:
+            self._cache.clear()
+            return
+        with self._lock:
+            self._generations[index_name] += 1
+
+    def stats(self) -> dict[str, float]:
+        return self._cache.stats()
@@ -1,11 +1,37 @@
-from amazon_product_search.es.es_client import EsClient
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import asdict
+from functools import partial
+from typing import Iterator
+
+from elasticsearch import ConnectionTimeout
+from more_itertools import chunked
+
+from amazon_product_search.es.es_client import EsClient, SearchRequest
 from amazon_product_search.es.query_builder import QueryBuilder
 from amazon_product_search.nlp.normalizer import normalize_query
 from amazon_product_search.retrieval.rank_fusion import RankFusion, fuse
 from amazon_product_search.retrieval.response import Response
+from amazon_product_search.retrieval.response_cache import ResponseCache
+from amazon_product_search.retrieval.weighting_strategy import MatchingMethod
 from amazon_product_search.source import Locale
 
 
+def get_request_timeout(deadline: float | None) -> float | None:
+    """Return the time left until `deadline` (a `time.monotonic()` value) to be used as a request timeout.
+
+    Raises `ConnectionTimeout` if the deadline has already passed, so that no request is sent.
+    """
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise ConnectionTimeout("The deadline passed before the request was sent.")
+    return remaining
+
+
 def split_fields(fields: list[str]) -> tuple[list[str], list[str]]:
     """Convert a given list of fields into a tuple of (lexical_fields, semantic_fields)
 
@@ -26,7 +52,12 @@ def split_fields(fields: list[str]) -> tuple[list[str], list[str]]:
 
 class Retriever:
     def __init__(
-        self, locale: Locale, es_client: EsClient | None = None, query_builder: QueryBuilder | None = None
+        self,
+        locale: Locale,
+        es_client: EsClient | None = None,
+        query_builder: QueryBuilder | None = None,
+        max_workers: int = 4,
+        response_cache: ResponseCache | None = None,
     ) -> None:
         if es_client:
             self.es_client = es_client
@@ -38,6 +69,106 @@ class Retriever:
         else:
             self.query_builder = QueryBuilder(locale)
 
+        # Threads are spawned lazily, so this costs nothing unless `concurrent=True` is used.
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="retriever")
+
+        # Fused responses are cached only if given. Call `response_cache.invalidate(index_name)` after re-feeding.
+        self.response_cache = response_cache
+
+    def _search_lexical(
+        self,
+        index_name: str,
+        normalized_query: str,
+        lexical_fields: list[str],
+        enable_synonym_expansion: bool,
+        product_ids: list[str] | None,
+        window_size: int,
+        deadline: float | None = None,
+    ) -> Response:
+        if not lexical_fields:
+            return Response(results=[], total_hits=0)
+
+        lexical_query = self.query_builder.build_lexical_search_query(
+            query=normalized_query,
+            fields=lexical_fields,
+            enable_synonym_expansion=enable_synonym_expansion,
+            product_ids=product_ids,
+        )
+        return self.es_client.search(
+            index_name=index_name,
+            query=lexical_query,
+            knn_query=None,
+            size=window_size,
+            explain=True,
+            request_timeout=get_request_timeout(deadline),
+        )
+
+    def _search_semantic(
+        self,
+        index_name: str,
+        normalized_query: str,
+        semantic_fields: list[str],
+        product_ids: list[str] | None,
+        window_size: int,
+        deadline: float | None = None,
+    ) -> Response:
+        if not normalized_query or not semantic_fields:
+            return Response(results=[], total_hits=0)
+
+        semantic_query = self.query_builder.build_semantic_search_query(
+            normalized_query,
+            field=semantic_fields[0],
+            top_k=window_size,
+            product_ids=product_ids,
+        )
+        return self.es_client.search(
+            index_name=index_name,
+            query=None,
+            knn_query=semantic_query,
+            size=window_size,
+            explain=True,
+            # The time spent encoding the query is deducted from the request timeout.
+            request_timeout=get_request_timeout(deadline),
+        )
+
+    @staticmethod
+    def _join_legs(
+        futures: dict[MatchingMethod, Future[Response]],
+        timeouts: dict[MatchingMethod, float],
+        dispatched_at: float,
+    ) -> dict[MatchingMethod, Response]:
+        """Wait for each leg until its own deadline and substitute an empty response for late legs.
+
+        Deadlines are measured from `dispatched_at`, so the total wait is bounded by the largest timeout
+        rather than the sum of them.
+
+        A running leg cannot be cancelled, so a late leg keeps occupying a worker of the thread pool until it returns.
+        Its Elasticsearch request is bounded by the same deadline (see `get_request_timeout`), which is what keeps
+        abandoned legs from piling up in the pool. Query encoding, however, is not interrupted.
+
+        Args:
+            futures (dict[MatchingMethod, Future[Response]]): Dispatched legs.
+            timeouts (dict[MatchingMethod, float]): Timeouts in seconds. Legs without a timeout are awaited.
+            dispatched_at (float): The `time.monotonic()` value at which the legs were dispatched.
+
+        Returns:
+            dict[MatchingMethod, Response]: Responses of the legs that finished in time.
+        """
+        responses: dict[MatchingMethod, Response] = {}
+        for matching_method, future in futures.items():
+            timeout = timeouts.get(matching_method)
+            if timeout is not None:
+                timeout = max(dispatched_at + timeout - time.monotonic(), 0)
+            try:
+                responses[matching_method] = future.result(timeout=timeout)
+            except (FutureTimeoutError, ConnectionTimeout):
+                if timeout is None:
+                    # The client-side timeout of a leg without a deadline is an error as usual.
+                    raise
+                logging.warning(f"The {matching_method} leg did not finish within {timeouts[matching_method]}s.")
+                responses[matching_method] = Response(results=[], total_hits=0)
+        return responses
+
     def search(
         self,
         index_name: str,
@@ -50,7 +181,33 @@ class Retriever:
         size: int = 20,
         window_size: int | None = None,
         rank_fusion: RankFusion | None = None,
+        concurrent: bool = False,
+        timeouts: dict[MatchingMethod, float] | None = None,
     ) -> Response:
+        """Perform lexical and semantic search and fuse the results.
+
+        Args:
+            index_name (str): An index name to perform a search.
+            query (str): A raw query.
+            fields (list[str]): Fields to search. Fields containing "vector" are used for semantic search.
+            enable_synonym_expansion (bool, optional): Expand the query with synonyms if True. Defaults to False.
+            product_ids (list[str] | None, optional): Product IDs to filter. Defaults to None.
+            lexical_boost (float, optional): The weight of lexical scores. Defaults to 1.0.
+            semantic_boost (float, optional): The weight of semantic scores. Defaults to 1.0.
+            size (int, optional): The number of results to return. Defaults to 20.
+            window_size (int | None, optional): The number of results to retrieve per leg. Defaults to `size`.
+            rank_fusion (RankFusion | None, optional): How to fuse results. Defaults to RankFusion().
+            concurrent (bool, optional): If True, the lexical leg and the semantic leg (including query encoding)
+                are dispatched to a thread pool and joined before fusion. Defaults to False.
+            timeouts (dict[MatchingMethod, float] | None, optional): Per-leg timeouts in seconds, e.g.,
+                `{"semantic": 0.1}`. Only used when `concurrent=True`. A leg that does not finish in time
+                is treated as an empty response, so the other leg is returned as it is.
+                The timeout is also passed to Elasticsearch as the request timeout of the leg.
+                Such partial responses are not cached. Defaults to None.
+
+        Returns:
+            Response: The fused response.
+        """
         normalized_query = normalize_query(query)
         lexical_fields, semantic_fields = split_fields(fields)
         if window_size is None:
@@ -59,42 +216,151 @@ class Retriever:
         if not rank_fusion:
             rank_fusion = RankFusion()
 
-        lexical_query = None
-        if lexical_fields:
-            lexical_query = self.query_builder.build_lexical_search_query(
+        cache_key = None
+        if self.response_cache:
+            cache_key = self.response_cache.make_key(
+                index_name,
                 query=normalized_query,
-                fields=lexical_fields,
+                fields=fields,
                 enable_synonym_expansion=enable_synonym_expansion,
                 product_ids=product_ids,
+                lexical_boost=lexical_boost,
+                semantic_boost=semantic_boost,
+                size=size,
+                window_size=window_size,
+                rank_fusion=asdict(rank_fusion),
             )
-        semantic_query = None
-        if normalized_query and semantic_fields:
-            semantic_query = self.query_builder.build_semantic_search_query(
-                normalized_query,
-                field=semantic_fields[0],
-                top_k=window_size,
-                product_ids=product_ids,
-            )
+            cached_response = self.response_cache.get(cache_key)
+            if cached_response is not None:
+                return cached_response
 
-        if lexical_query:
-            lexical_response = self.es_client.search(
-                index_name=index_name,
-                query=lexical_query,
-                knn_query=None,
-                size=window_size,
-                explain=True,
+        search_lexical = partial(
+            self._search_lexical,
+            index_name,
+            normalized_query,
+            lexical_fields,
+            enable_synonym_expansion,
+            product_ids,
+            window_size,
+        )
+        search_semantic = partial(
+            self._search_semantic,
+            index_name,
+            normalized_query,
+            semantic_fields,
+            product_ids,
+            window_size,
+        )
+        if concurrent:
+            timeouts = timeouts or {}
+            dispatched_at = time.monotonic()
+            deadlines = {matching_method: dispatched_at + timeout for matching_method, timeout in timeouts.items()}
+            futures: dict[MatchingMethod, Future[Response]] = {
+                "lexical": self._executor.submit(search_lexical, deadline=deadlines.get("lexical")),
+                "semantic": self._executor.submit(search_semantic, deadline=deadlines.get("semantic")),
+            }
+            responses = self._join_legs(futures, timeouts, dispatched_at)
+            lexical_response, semantic_response = responses["lexical"], responses["semantic"]
+            # A leg that timed out was replaced with an empty response, which must not be cached.
+            is_complete = all(
+                future.done() and future.exception() is None and future.result() is responses[matching_method]
+                for matching_method, future in futures.items()
             )
         else:
-            lexical_response = Response(results=[], total_hits=0)
-        if semantic_query:
-            semantic_response = self.es_client.search(
-                index_name=index_name,
-                query=None,
-                knn_query=semantic_query,
-                size=window_size,
-                explain=True,
-            )
-        else:
-            semantic_response = Response(results=[], total_hits=0)
+            lexical_response = search_lexical()
+            semantic_response = search_semantic()
+            is_complete = True
+
+        response = fuse(query, lexical_response, semantic_response, lexical_boost, semantic_boost, rank_fusion, size)
+        if self.response_cache and cache_key and is_complete:
+            self.response_cache.set(cache_key, response)
+        return response
+
+    def search_many(
+        self,
+        index_name: str,
+        queries: list[str],
+        fields: list[str],
+        enable_synonym_expansion: bool = False,
+        product_ids: list[str] | None = None,
+        lexical_boost: float = 1.0,
+        semantic_boost: float = 1.0,
+        size: int = 20,
+        window_size: int | None = None,
+        rank_fusion: RankFusion | None = None,
+        batch_size: int = 100,
+    ) -> Iterator[Response]:
+        """Perform `search` for many queries at once, e.g., for offline evaluation.
+
+        Queries are processed in batches of `batch_size`. For each batch, queries that are not in the vector cache
+        are encoded in a single forward pass, and the lexical and KNN requests of all queries are sent
+        via the Multi search API. Results are then fused per query.
+
+        See `search` for the other arguments.
+
+        Args:
+            queries (list[str]): Raw queries to search.
+            batch_size (int, optional): The number of queries processed at a time. Defaults to 100.
+
+        Yields:
+            Iterator[Response]: Fused responses in the same order as the queries.
+        """
+        lexical_fields, semantic_fields = split_fields(fields)
+        if window_size is None:
+            window_size = size
+
+        if not rank_fusion:
+            rank_fusion = RankFusion()
+
+        for batch in chunked(queries, batch_size):
+            normalized_queries = [normalize_query(query) for query in batch]
+
+            query_vectors: dict[str, list[float]] = {}
+            if semantic_fields:
+                queries_to_encode = [normalized_query for normalized_query in normalized_queries if normalized_query]
+                query_vectors = dict(
+                    zip(queries_to_encode, self.query_builder.encode_many(queries_to_encode), strict=True)
+                )
+
+            requests: list[SearchRequest] = []
+            # Indices of the lexical and semantic requests of each query in `requests`.
+            request_indices: list[tuple[int | None, int | None]] = []
+            for normalized_query in normalized_queries:
+                lexical_index, semantic_index = None, None
+                if lexical_fields:
+                    lexical_index = len(requests)
+                    lexical_query = self.query_builder.build_lexical_search_query(
+                        query=normalized_query,
+                        fields=lexical_fields,
+                        enable_synonym_expansion=enable_synonym_expansion,
+                        product_ids=product_ids,
+                    )
+                    requests.append(
+                        SearchRequest(index_name=index_name, query=lexical_query, size=window_size, explain=True)
+                    )
+                if normalized_query and semantic_fields:
+                    semantic_index = len(requests)
+                    semantic_query = self.query_builder.build_semantic_search_query(
+                        normalized_query,
+                        field=semantic_fields[0],
+                        top_k=window_size,
+                        product_ids=product_ids,
+                        query_vector=query_vectors[normalized_query],
+                    )
+                    requests.append(
+                        SearchRequest(index_name=index_name, knn_query=semantic_query, size=window_size, explain=True)
+                    )
+                request_indices.append((lexical_index, semantic_index))
+
+            responses = self.es_client.search_many(requests)
+            for query, (lexical_index, semantic_index) in zip(batch, request_indices, strict=True):
+                lexical_response = (
+                    responses[lexical_index] if lexical_index is not None else Response(results=[], total_hits=0)
+                )
+                semantic_response = (
+                    responses[semantic_index] if semantic_index is not None else Response(results=[], total_hits=0)
+                )
+                yield fuse(query, lexical_response, semantic_response, lexical_boost, semantic_boost, rank_fusion, size)
 
-        return fuse(query, lexical_response, semantic_response, lexical_boost, semantic_boost, rank_fusion, size)
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
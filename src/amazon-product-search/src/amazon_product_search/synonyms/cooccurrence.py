@@ -0,0 +1,172 @@
+"""Functions to count words and their cooccurrences in query title pairs.
+
+They are kept apart from `generator` so that worker processes spawned by `count_words_parallel`
+do not have to import the models used to filter synonyms.
+"""
+
+import itertools
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import polars as pl
+from more_itertools import chunked
+from polars import DataFrame
+from tqdm import tqdm
+
+from amazon_product_search.nlp.tokenizers import Tokenizer, locale_to_tokenizer
+from amazon_product_search.source import Locale
+from amazon_product_search.synonyms.filters import utils
+
+
+def generate_ngrams(tokens: list[str], n: int) -> list[str]:
+    ngrams = []
+    for i in range(len(tokens) - n + 1):
+        ngram = " ".join(tokens[i : i + n])
+        ngrams.append(ngram)
+    return ngrams
+
+
+def generate_ngrams_all(tokens: list[str], n: int) -> list[str]:
+    ngrams = []
+    for i in range(1, n + 1):
+        ngrams.extend(generate_ngrams(tokens, i))
+    return ngrams
+
+
+def _count_pair(
+    tokenizer: Tokenizer,
+    query: str,
+    title: str,
+    ngrams: int,
+    word_counter: Counter,
+    pair_counter: Counter,
+) -> None:
+    if not query or not title:
+        return
+
+    query_tokens = [
+        token for token in tokenizer.tokenize(query) if isinstance(token, str) and token not in utils.STOPWORDS
+    ]
+    query_tokens = generate_ngrams_all(query_tokens, ngrams)
+    title_tokens = [
+        token for token in tokenizer.tokenize(title) if isinstance(token, str) and token not in utils.STOPWORDS
+    ]
+    title_tokens = generate_ngrams_all(title_tokens, ngrams)
+    for query_word, title_word in itertools.product(query_tokens, title_tokens):
+        word_counter[query_word] += 1
+        word_counter[title_word] += 1
+        if query_word != title_word:
+            pair_counter[(query_word, title_word)] += 1
+
+
+def count_words(
+    locale: Locale,
+    pairs: list[list[str]],
+    ngrams: int = 2,
+) -> tuple[Counter, Counter]:
+    """Generate synonyms based on cooccurrence."""
+    tokenizer = locale_to_tokenizer(locale)
+    word_counter: Counter = Counter()
+    pair_counter: Counter = Counter()
+
+    print("Counting words...")
+    for query, title in tqdm(pairs):
+        _count_pair(tokenizer, query, title, ngrams, word_counter, pair_counter)
+    return word_counter, pair_counter
+
+
+def pair_counter_to_df(pair_counter: Counter) -> DataFrame:
+    return pl.DataFrame(
+        {
+            "query": [query for query, _ in pair_counter],
+            "title": [title for _, title in pair_counter],
+            "cooccurrence": list(pair_counter.values()),
+        },
+        schema={"query": pl.String, "title": pl.String, "cooccurrence": pl.Int64},
+    )
+
+
+# A tokenizer per worker process, which is initialized by `_init_worker`.
+_worker_tokenizer: Tokenizer | None = None
+
+
+def _init_worker(locale: Locale) -> None:
+    global _worker_tokenizer
+    _worker_tokenizer = locale_to_tokenizer(locale)
+
+
+def _count_shard(
+    pairs: list[list[str]],
+    ngrams: int,
+    spill_filepath: str | None,
+) -> tuple[Counter, Counter | None]:
+    """Count words in a shard in a worker process.
+
+    If `spill_filepath` is given, the pair counter is written to it instead of being returned.
+    """
+    assert _worker_tokenizer is not None
+    word_counter: Counter = Counter()
+    pair_counter: Counter = Counter()
+    for query, title in pairs:
+        _count_pair(_worker_tokenizer, query, title, ngrams, word_counter, pair_counter)
+    if spill_filepath is None:
+        return word_counter, pair_counter
+    pair_counter_to_df(pair_counter).write_parquet(spill_filepath)
+    return word_counter, None
+
+
+def count_words_parallel(
+    locale: Locale,
+    pairs: list[list[str]],
+    ngrams: int = 2,
+    num_workers: int | None = None,
+    shard_size: int = 10000,
+    spill_dir: str | None = None,
+) -> tuple[Counter, DataFrame]:
+    """Count words as `count_words` does, but in shards processed by a pool of worker processes.
+
+    Each worker has its own tokenizer and returns partial counters per shard, which are merged in this process.
+    If `spill_dir` is given, the pair counter of each shard is written to `{spill_dir}/pair_counts_*.parquet`
+    and they are merged by Polars, so the pair counts are never held in a Python `Counter` as a whole.
+
+    Args:
+        locale (Locale): The target locale.
+        pairs (list[list[str]]): Query title pairs.
+        ngrams (int, optional): The maximum n of n-grams. Defaults to 2.
+        num_workers (int | None, optional): The number of worker processes. Defaults to `os.cpu_count()`.
+        shard_size (int, optional): The number of pairs per shard. Defaults to 10000.
+        spill_dir (str | None, optional): A directory to spill pair counters to. Defaults to None.
+
+    Returns:
+        tuple[Counter, DataFrame]: The word counter and a DataFrame of pair counts
+            with the columns "query", "title" and "cooccurrence".
+    """
+    shards = list(chunked(pairs, shard_size))
+    spill_filepaths = [f"{spill_dir}/pair_counts_{i:05d}.parquet" if spill_dir else None for i in range(len(shards))]
+    word_counter: Counter = Counter()
+    pair_counter: Counter = Counter()
+
+    print(f"Counting words in {len(shards)} shards...")
+    # Forking a process that has started Polars (or PyTorch) threads can deadlock, so workers are spawned.
+    with ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(locale,),
+    ) as executor:
+        results = executor.map(_count_shard, shards, itertools.repeat(ngrams), spill_filepaths)
+        for shard_word_counter, shard_pair_counter in tqdm(results, total=len(shards)):
+            word_counter.update(shard_word_counter)
+            if shard_pair_counter is not None:
+                pair_counter.update(shard_pair_counter)
+
+    if not spill_dir or not shards:
+        return word_counter, pair_counter_to_df(pair_counter)
+    pair_df = (
+        pl.scan_parquet([filepath for filepath in spill_filepaths if filepath])
+        .group_by(["query", "title"])
+        .agg(pl.col("cooccurrence").sum())
+        .collect()
+    )
+    return word_counter, pair_df
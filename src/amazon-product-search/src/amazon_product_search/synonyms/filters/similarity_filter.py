@@ -1,3 +1,4 @@
+import numpy as np
 import polars as pl
 import torch
 from more_itertools import chunked
@@ -9,9 +10,26 @@ from dense_retrieval.encoders import SBERTEncoder
 
 
 class SimilarityFilter:
-    def __init__(self, hf_model_name: str = HF.JP_SLUKE_MEAN, batch_size: int = 8) -> None:
+    def __init__(
+        self,
+        hf_model_name: str = HF.JP_SLUKE_MEAN,
+        batch_size: int = 8,
+        deduplicate: bool = False,
+        encode_batch_size: int = 256,
+    ) -> None:
+        """Filter synonyms by the cosine similarity between terms.
+
+        Args:
+            hf_model_name (str, optional): The model to encode terms with. Defaults to HF.JP_SLUKE_MEAN.
+            batch_size (int, optional): The number of pairs encoded at a time. Defaults to 8.
+            deduplicate (bool, optional): If True, each unique term is encoded only once (see `calculate_scores`)
+                and `batch_size` is not used. Defaults to False.
+            encode_batch_size (int, optional): The batch size to encode unique terms with. Defaults to 256.
+        """
         self.encoder: SBERTEncoder = SBERTEncoder(hf_model_name)
         self.batch_size = batch_size
+        self.deduplicate = deduplicate
+        self.encode_batch_size = encode_batch_size
 
     def calculate_score(self, left: list[str], right: list[str]) -> list[float]:
         """Calculate the cosine similarity of the given two inputs.
@@ -27,6 +45,41 @@ class SimilarityFilter:
         right_tensor = torch.from_numpy(self.encoder.encode(right))
         return cosine_similarity(left_tensor, right_tensor, dim=1).tolist()
 
+    def calculate_scores(self, left: pl.Series, right: pl.Series) -> np.ndarray:
+        """Calculate the cosine similarity of the given two inputs, encoding each unique term only once.
+
+        Unique terms are sorted by length so that each batch contains texts of similar lengths with little padding,
+        and their normalized embeddings are stored in a matrix. The scores are then computed for all pairs at once
+        by gathering the rows of the left and right terms.
+
+        Args:
+            left (pl.Series): Input texts.
+            right (pl.Series): Other input texts.
+
+        Returns:
+            np.ndarray: The scores.
+        """
+        terms = (
+            pl.DataFrame({"term": pl.concat([left, right]).unique()})
+            .sort(pl.col("term").str.len_chars(), "term")["term"]
+            .to_list()
+        )
+        if not terms:
+            return np.array([], dtype=np.float32)
+        embeddings = np.concatenate(
+            [
+                self.encoder.encode(batch, batch_size=self.encode_batch_size)
+                for batch in tqdm(list(chunked(terms, self.encode_batch_size)))
+            ]
+        ).astype(np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings /= np.maximum(norms, 1e-8)
+
+        term_to_index = {term: i for i, term in enumerate(terms)}
+        left_indices = left.replace_strict(term_to_index, return_dtype=pl.Int64).to_numpy()
+        right_indices = right.replace_strict(term_to_index, return_dtype=pl.Int64).to_numpy()
+        return np.einsum("ij,ij->i", embeddings[left_indices], embeddings[right_indices])
+
     def apply(self, synonyms_df: pl.DataFrame, threshold: float = 0.5) -> pl.DataFrame:
         """Filter out synonyms based on the similarity between terms.
 
@@ -36,12 +89,16 @@ class SimilarityFilter:
         Returns:
             The filtered dataframe.
         """
-        scores = []
-        chunks = chunked(synonyms_df.to_dicts(), self.batch_size)
-        for batch in tqdm(list(chunks)):
-            queries = [row["query"] for row in batch]
-            titles = [row["title"] for row in batch]
-            scores.extend(self.calculate_score(queries, titles))
+        scores: list[float] | np.ndarray
+        if self.deduplicate:
+            scores = self.calculate_scores(synonyms_df["query"], synonyms_df["title"])
+        else:
+            scores = []
+            chunks = chunked(synonyms_df.to_dicts(), self.batch_size)
+            for batch in tqdm(list(chunks)):
+                queries = [row["query"] for row in batch]
+                titles = [row["title"] for row in batch]
+                scores.extend(self.calculate_score(queries, titles))
 
         synonyms_df = (
             synonyms_df.with_columns(pl.Series(name="similarity", values=scores))
@@ -1,16 +1,14 @@
-import itertools
+import tempfile
 from collections import Counter
 from math import log
 
 import polars as pl
 from polars import DataFrame
-from tqdm import tqdm
 
 from amazon_product_search.constants import DATA_DIR, HF
-from amazon_product_search.nlp.normalizer import normalize_doc
-from amazon_product_search.nlp.tokenizers import locale_to_tokenizer
+from amazon_product_search.nlp.normalizer import normalize_doc_expr
 from amazon_product_search.source import Locale, load_merged
-from amazon_product_search.synonyms.filters import utils
+from amazon_product_search.synonyms.cooccurrence import count_words_parallel, pair_counter_to_df
 from amazon_product_search.synonyms.filters.similarity_filter import SimilarityFilter
 
 
@@ -25,114 +23,76 @@ def preprocess_query_title_pairs(df: DataFrame) -> DataFrame:
     df = df.filter((pl.col("query").is_not_null() & pl.col("product_title").is_not_null()))
     return df.with_columns(
         [
-            pl.col("query").map_elements(normalize_doc),
-            pl.col("product_title").map_elements(normalize_doc),
+            normalize_doc_expr(pl.col("query")),
+            normalize_doc_expr(pl.col("product_title")),
         ]
     )
 
 
-def generate_ngrams(tokens: list[str], n: int) -> list[str]:
-    ngrams = []
-    for i in range(len(tokens) - n + 1):
-        ngram = " ".join(tokens[i : i + n])
-        ngrams.append(ngram)
-    return ngrams
-
-
-def generate_ngrams_all(tokens: list[str], n: int) -> list[str]:
-    ngrams = []
-    for i in range(1, n + 1):
-        ngrams.extend(generate_ngrams(tokens, i))
-    return ngrams
-
-
-def count_words(
-    locale: Locale,
-    pairs: list[list[str]],
-    ngrams: int = 2,
-) -> tuple[Counter, Counter]:
-    """Generate synonyms based on cooccurrence."""
-    tokenizer = locale_to_tokenizer(locale)
-    word_counter: Counter = Counter()
-    pair_counter: Counter = Counter()
-
-    print("Counting words...")
-    for query, title in tqdm(pairs):
-        if not query or not title:
-            continue
-
-        query_tokens = [
-            token for token in tokenizer.tokenize(query) if isinstance(token, str) and token not in utils.STOPWORDS
-        ]
-        query_tokens = generate_ngrams_all(query_tokens, ngrams)
-        title_tokens = [
-            token for token in tokenizer.tokenize(title) if isinstance(token, str) and token not in utils.STOPWORDS
-        ]
-        title_tokens = generate_ngrams_all(title_tokens, ngrams)
-        for query_word, title_word in itertools.product(query_tokens, title_tokens):
-            word_counter[query_word] += 1
-            word_counter[title_word] += 1
-            if query_word != title_word:
-                pair_counter[(query_word, title_word)] += 1
-    return word_counter, pair_counter
-
-
 def apply_fast_filters(
     word_counter: Counter,
-    pair_counter: Counter,
+    pair_counter: Counter | DataFrame,
     min_cooccurrence: int,
     min_npmi: float,
 ) -> DataFrame:
-    total_word_count = sum(word_counter.values())
-    log_total_word_count = log(total_word_count)
+    """Compute NPMI of word pairs and filter out unlikely synonym candidates as vectorized Polars expressions.
 
-    print("Calculating metrics...")
-    rows = []
-    original_num_candidates = len(pair_counter)
-    for key in tqdm(pair_counter):
-        query, title = key
-
-        if utils.are_two_sets_identical(query, title):
-            continue
-        if utils.is_either_contained_in_other(query, title):
-            continue
-        if utils.is_either_number(query, title):
-            continue
-
-        query_count, title_count, pair_count = (
-            word_counter[query],
-            word_counter[title],
-            pair_counter[key],
-        )
-        if pair_count < min_cooccurrence:
-            continue
+    The string filters are the columnar equivalents of `utils.are_two_sets_identical`,
+    `utils.is_either_contained_in_other` and `utils.is_either_number`.
 
-        log_pair_count, log_query_count, log_title_count = (
-            log(pair_count),
-            log(query_count),
-            log(title_count),
-        )
+    Args:
+        word_counter (Counter): Word counts.
+        pair_counter (Counter | DataFrame): Pair counts as a Counter of (query, title) tuples or a DataFrame
+            with the columns "query", "title" and "cooccurrence".
+        min_cooccurrence (int): The minimum cooccurrence of a pair.
+        min_npmi (float): The minimum NPMI of a pair.
+
+    Returns:
+        DataFrame: Candidates with the columns "query", "title", "query_count", "title_count", "cooccurrence"
+            and "npmi".
+    """
+    if isinstance(pair_counter, Counter):
+        pair_counter = pair_counter_to_df(pair_counter)
+    log_total_word_count = log(sum(word_counter.values()))
+    word_count_df = pl.DataFrame(
+        {"word": list(word_counter.keys()), "count": list(word_counter.values())},
+        schema={"word": pl.String, "count": pl.Int64},
+    )
 
-        pmi = log_total_word_count + log_pair_count - log_query_count - log_title_count
-        npmi = pmi / (log_total_word_count - log_pair_count)
-        if npmi < min_npmi:
-            continue
-
-        rows.append(
-            {
-                "query": query,
-                "title": title,
-                "query_count": query_count,
-                "title_count": title_count,
-                "cooccurrence": pair_count,
-                "npmi": npmi,
-            }
+    print("Calculating metrics...")
+    query, title = pl.col("query"), pl.col("title")
+    candidates_df = (
+        pair_counter.lazy()
+        .filter(pl.col("cooccurrence") >= min_cooccurrence)
+        .filter(
+            ~(
+                query.str.split(" ").list.set_symmetric_difference(title.str.split(" ")).list.len().eq(0)
+                | title.str.contains(query, literal=True)
+                | query.str.contains(title, literal=True)
+                | query.str.contains(r"^\d+$")
+                | title.str.contains(r"^\d+$")
+            )
+        )
+        .join(word_count_df.lazy().rename({"word": "query", "count": "query_count"}), on="query", how="left")
+        .join(word_count_df.lazy().rename({"word": "title", "count": "title_count"}), on="title", how="left")
+        .with_columns(
+            (
+                (
+                    log_total_word_count
+                    + pl.col("cooccurrence").log()
+                    - pl.col("query_count").log()
+                    - pl.col("title_count").log()
+                )
+                / (log_total_word_count - pl.col("cooccurrence").log())
+            ).alias("npmi")
         )
-    filtered_num_candidates = len(rows)
+        .filter(pl.col("npmi") >= min_npmi)
+        .select(["query", "title", "query_count", "title_count", "cooccurrence", "npmi"])
+        .collect()
+    )
+    original_num_candidates, filtered_num_candidates = len(pair_counter), len(candidates_df)
     diff = original_num_candidates - filtered_num_candidates
     print(f"Filtered out {diff} candidates ({original_num_candidates} -> {filtered_num_candidates})")
-
-    candidates_df = pl.from_dicts(rows)
     return candidates_df
 
 
@@ -141,6 +101,7 @@ def generate(
     output_filename: str,
     min_cooccurrence: int = 10,
     min_npmi: float = 0.5,
+    num_workers: int | None = None,
 ) -> None:
     """Generate synonyms from query title pairs.
 
@@ -154,6 +115,7 @@ def generate(
     Args:
         locale (Locale): The target locale.
         output_filename (str): The output filename.
+        num_workers (int | None, optional): The number of processes to count words. Defaults to `os.cpu_count()`.
     """
     hf_model_name = HF.LOCALE_TO_MODEL_NAME[locale]
 
@@ -166,12 +128,13 @@ def generate(
 
     print("Generate candidates from query-title pairs")
     pairs: list[list[str]] = pairs_df.select(["query", "product_title"]).to_numpy().tolist()  # type: ignore
-    word_counter, pair_counter = count_words(locale, pairs)
+    with tempfile.TemporaryDirectory() as spill_dir:
+        word_counter, pair_counter = count_words_parallel(locale, pairs, num_workers=num_workers, spill_dir=spill_dir)
     candidates_df = apply_fast_filters(word_counter, pair_counter, min_cooccurrence, min_npmi)
     print(f"{len(candidates_df)} candidates were generated")
 
     print("Filter synonyms by Semantic Similarity")
-    filter = SimilarityFilter(hf_model_name)
+    filter = SimilarityFilter(hf_model_name, deduplicate=True)
     synonyms_df = filter.apply(candidates_df)
 
     filepath = f"{DATA_DIR}/includes/{output_filename}"
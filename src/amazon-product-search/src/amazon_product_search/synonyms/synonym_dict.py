@@ -1,11 +1,21 @@
+import glob
+import heapq
+import json
+import logging
+import os
 import re
 from collections import defaultdict
+from typing import Any, Iterator
+from uuid import uuid4
 
 import polars as pl
 
+from amazon_product_search.cache import get_method_cache, lru_cache_method
 from amazon_product_search.constants import DATA_DIR
+from amazon_product_search.files import atomic_write, lock_file
 from amazon_product_search.nlp.tokenizers import locale_to_tokenizer
 from amazon_product_search.source import Locale
+from amazon_product_search.synonyms.synonym_trie import SynonymTrie
 
 
 def has_numbers(s: str) -> bool:
@@ -43,6 +53,49 @@ def expand_synonyms(
             expand_synonyms(token_chain[1:], [*current, (synonym, score)], result)
 
 
+def iter_expansions(
+    token_chain: list[tuple[str, list[tuple[str, float]]]],
+) -> Iterator[list[tuple[str, float | None]]]:
+    """Lazily yield expanded token lists in descending order of their combined scores.
+
+    The combined score is the sum of the scores of the chosen alternatives, where an original token counts as 1.0.
+    Expansions are generated best-first from a heap, so taking the first N of them costs O(N * len(token_chain))
+    heap operations instead of enumerating the whole Cartesian product as `expand_synonyms` does.
+    Ties are broken in the same order as `expand_synonyms`, so the original query always comes first.
+
+    Args:
+        token_chain (list[tuple[str, list[tuple[str, float]]]]): Tokens and their synonyms returned by
+            `SynonymDict.look_up`.
+
+    Yields:
+        Iterator[list[tuple[str, float | None]]]: Expanded tokens with scores (None for original tokens).
+    """
+    alternatives: list[list[tuple[str, float | None]]] = []
+    alternative_scores: list[list[float]] = []
+    for token, synonym_score_tuples in token_chain:
+        # `sorted` is stable, so the original token stays first among alternatives with the same score.
+        sorted_alternatives = sorted(
+            [(token, None), *synonym_score_tuples],
+            key=lambda alternative: -1.0 if alternative[1] is None else -alternative[1],
+        )
+        alternatives.append(sorted_alternatives)
+        alternative_scores.append([1.0 if score is None else score for _, score in sorted_alternatives])
+
+    # Each state is a tuple of indices into `alternatives`. To generate each state exactly once, a state only
+    # increments indices at or after its last non-zero position.
+    initial = (0,) * len(alternatives)
+    heap: list[tuple[float, tuple[int, ...], int]] = [(-sum(scores[0] for scores in alternative_scores), initial, 0)]
+    while heap:
+        negative_score, indices, start = heapq.heappop(heap)
+        yield [alternatives[i][j] for i, j in enumerate(indices)]
+        for i in range(start, len(indices)):
+            j = indices[i] + 1
+            if j == len(alternatives[i]):
+                continue
+            score = -negative_score - alternative_scores[i][j - 1] + alternative_scores[i][j]
+            heapq.heappush(heap, (-score, (*indices[:i], j, *indices[i + 1 :]), i))
+
+
 class SynonymDict:
     def __init__(
         self,
@@ -50,16 +103,85 @@ class SynonymDict:
         synonym_filename: str | None = None,
         data_dir: str = DATA_DIR,
         threshold: float = 0.6,
+        cache_dir: str | None = None,
     ) -> None:
         self.tokenizer = locale_to_tokenizer(locale)
         self.threshold = threshold
+        # `{data_dir}/includes` is tracked by Git, so compiled tries go elsewhere.
+        self.cache_dir = cache_dir if cache_dir is not None else f"{data_dir}/cache"
         if synonym_filename:
-            self._entry_dict: dict[str, list[tuple[str, float]]] = self.load_synonym_dict(
-                data_dir,
-                synonym_filename,
-            )
+            self._trie = self.load_synonym_trie(data_dir, synonym_filename)
         else:
-            self._entry_dict = defaultdict(list)
+            self._trie = SynonymTrie.from_entry_dict({})
+
+    @property
+    def _entry_dict(self) -> dict[str, list[tuple[str, float]]]:
+        return self._trie.to_entry_dict()
+
+    @_entry_dict.setter
+    def _entry_dict(self, entry_dict: dict[str, list[tuple[str, float]]]) -> None:
+        self._trie = SynonymTrie.from_entry_dict(entry_dict)
+        look_up_cache = get_method_cache(self, "_look_up")
+        if look_up_cache is not None:
+            look_up_cache.clear()
+
+    def load_synonym_trie(self, data_dir: str, synonym_filename: str) -> SynonymTrie:
+        """Memory-map the compiled synonym trie, compiling it from the synonym file first if necessary.
+
+        The trie is saved under `cache_dir` for each threshold. Each compilation writes new files
+        (`{name}.trie_{threshold}.{build_id}.*.npy`) and then atomically replaces the manifest
+        (`{name}.trie_{threshold}.json`) that points to them, along with the mtime and size of the synonym file.
+        The trie is compiled again when either changes. Compilation and loading hold a lock on
+        `{name}.trie_{threshold}.lock`, so older files are removed only when no one is about to map them.
+        If `cache_dir` is not writable, the trie is compiled in memory instead.
+
+        Args:
+            data_dir (str): The data directory.
+            synonym_filename (str): A filename to load, which is supposed to be under `{DATA_DIR}/includes`.
+
+        Returns:
+            SynonymTrie: The loaded synonym trie.
+        """
+        stat = os.stat(f"{data_dir}/includes/{synonym_filename}")
+        source_stats = [stat.st_mtime_ns, stat.st_size]
+        prefix = f"{self.cache_dir}/{os.path.splitext(synonym_filename)[0]}.trie_{self.threshold}"
+        try:
+            os.makedirs(os.path.dirname(prefix), exist_ok=True)
+            with lock_file(f"{prefix}.lock"):
+                manifest = self._read_manifest(f"{prefix}.json")
+                if manifest is None or manifest["source"] != source_stats:
+                    manifest = self._compile_synonym_trie(data_dir, synonym_filename, prefix, source_stats)
+                return SynonymTrie.load(f"{prefix}.{manifest['build_id']}")
+        except OSError as e:
+            logging.warning(f"Compiling the synonym trie in memory because {prefix} cannot be written: {e}")
+            return SynonymTrie.from_entry_dict(self.load_synonym_dict(data_dir, synonym_filename))
+
+    @staticmethod
+    def _read_manifest(manifest_filepath: str) -> dict[str, Any] | None:
+        if not os.path.isfile(manifest_filepath):
+            return None
+        with open(manifest_filepath) as file:
+            return json.load(file)
+
+    def _compile_synonym_trie(
+        self, data_dir: str, synonym_filename: str, prefix: str, source_stats: list[int]
+    ) -> dict[str, Any]:
+        """Save a new trie, publish it by replacing the manifest and remove older ones.
+
+        It must be called with the lock held.
+        """
+        build_id = uuid4().hex[:8]
+        SynonymTrie.from_entry_dict(self.load_synonym_dict(data_dir, synonym_filename)).save(f"{prefix}.{build_id}")
+
+        manifest = {"build_id": build_id, "source": source_stats}
+        with atomic_write(f"{prefix}.json") as tmp_filepath, open(tmp_filepath, "w") as file:
+            json.dump(manifest, file)
+
+        # Files that are already memory-mapped stay readable after being removed.
+        for filepath in glob.glob(f"{glob.escape(prefix)}.*.*.npy"):
+            if filepath[len(prefix) + 1 :].split(".")[0] != build_id:
+                os.remove(filepath)
+        return manifest
 
     def load_synonym_dict(self, data_dir: str, synonym_filename: str) -> dict[str, list[tuple[str, float]]]:
         """Load the synonym file and convert it into a dict for lookup.
@@ -83,31 +205,31 @@ class SynonymDict:
             entry_dict[query].append((title, score))
         return entry_dict
 
-    def look_up(self, tokens: list[str], ngrams: int = 2) -> list[tuple[str, list[tuple[str, float]]]]:
+    def look_up(self, tokens: list[str], ngrams: int | None = 2) -> list[tuple[str, list[tuple[str, float]]]]:
         """Return a list of synonyms for a given query.
 
+        At each position, the longest entry is matched in a single walk down the synonym trie.
+        Results are cached per token sequence, so do not modify the returned synonym lists.
+
         Args:
             tokens (list[str]): A list of tokens to look up.
+            ngrams (int | None, optional): The maximum number of tokens of an entry to match.
+                Pass None to match entries of any length. Defaults to 2.
 
         Returns:
             list[tuple[str, list[str]]]: A list of the original query terms and their synonyms.
         """
+        return list(self._look_up(tuple(tokens), ngrams))
+
+    @lru_cache_method(max_size=4096)
+    def _look_up(self, tokens: tuple[str, ...], ngrams: int | None) -> list[tuple[str, list[tuple[str, float]]]]:
         expanded_query: list[tuple[str, list[tuple[str, float]]]] = []
         current_position = 0
         while current_position < len(tokens):
-            found = None
-            for n in range(ngrams, 0, -1):
-                end_position = current_position + n
-                if end_position > len(tokens):
-                    continue
-                key = " ".join(tokens[current_position:end_position])
-                if key not in self._entry_dict:
-                    continue
-                synonyms = self._entry_dict[key]
-                found = (key, synonyms)
-                break
-            if found:
-                expanded_query.append(found)
+            match = self._trie.longest_match(tokens, current_position, ngrams)
+            if match:
+                end_position, synonyms = match
+                expanded_query.append((" ".join(tokens[current_position:end_position]), synonyms))
                 current_position = end_position
             else:
                 expanded_query.append((tokens[current_position], []))
@@ -0,0 +1,167 @@
+import logging
+import os
+from typing import Any, Mapping
+
+import numpy as np
+
+_ARRAY_NAMES = (
+    "vocab",
+    "edge_offsets",
+    "edge_tokens",
+    "edge_children",
+    "node_entries",
+    "entry_offsets",
+    "synonyms",
+    "scores",
+)
+
+
+class SynonymTrie:
+    """A token trie of synonym entries stored in flat NumPy arrays.
+
+    Entries are keyed by space-separated token sequences, e.g., "a b". Node `n` has children
+    `edge_children[edge_offsets[n]:edge_offsets[n + 1]]` reached by the token IDs in the same range of `edge_tokens`,
+    sorted so that they can be binary-searched. Token IDs are indices into `vocab`, a sorted array of tokens.
+    If node `n` terminates an entry `e = node_entries[n]` (-1 otherwise), its synonyms and scores are
+    `synonyms[entry_offsets[e]:entry_offsets[e + 1]]` and `scores[...]` of the same range.
+
+    Since lookup works on the arrays as they are, `load` memory-maps them without parsing anything,
+    so loading takes constant time regardless of the number of entries.
+    """
+
+    def __init__(self, arrays: Mapping[str, np.ndarray]) -> None:
+        self.vocab = arrays["vocab"]
+        self.edge_offsets = arrays["edge_offsets"]
+        self.edge_tokens = arrays["edge_tokens"]
+        self.edge_children = arrays["edge_children"]
+        self.node_entries = arrays["node_entries"]
+        self.entry_offsets = arrays["entry_offsets"]
+        self.synonyms = arrays["synonyms"]
+        self.scores = arrays["scores"]
+
+    def __len__(self) -> int:
+        return len(self.entry_offsets) - 1
+
+    @classmethod
+    def from_entry_dict(cls, entry_dict: Mapping[str, list[tuple[str, float]]]) -> "SynonymTrie":
+        """Build a trie from a dict of space-separated token sequences to their synonyms and scores."""
+        vocab = sorted({token for key in entry_dict for token in key.split(" ")})
+        token_to_id = {token: i for i, token in enumerate(vocab)}
+
+        # Build a trie of nested dicts first, then flatten it in breadth-first order.
+        root: dict[str, Any] = {"children": {}, "entry": None}
+        for key, synonym_score_tuples in entry_dict.items():
+            node = root
+            for token in key.split(" "):
+                node = node["children"].setdefault(token_to_id[token], {"children": {}, "entry": None})
+            node["entry"] = synonym_score_tuples
+
+        nodes = [root]
+        edge_offsets, edge_tokens, edge_children, node_entries = [0], [], [], []
+        entry_offsets, synonyms, scores = [0], [], []
+        for node in nodes:
+            for token_id in sorted(node["children"]):
+                edge_tokens.append(token_id)
+                edge_children.append(len(nodes))
+                nodes.append(node["children"][token_id])
+            edge_offsets.append(len(edge_tokens))
+            if node["entry"] is None:
+                node_entries.append(-1)
+                continue
+            node_entries.append(len(entry_offsets) - 1)
+            for synonym, score in node["entry"]:
+                synonyms.append(synonym)
+                scores.append(score)
+            entry_offsets.append(len(synonyms))
+
+        return cls(
+            {
+                "vocab": np.array(vocab, dtype=str),
+                "edge_offsets": np.array(edge_offsets, dtype=np.int64),
+                "edge_tokens": np.array(edge_tokens, dtype=np.int32),
+                "edge_children": np.array(edge_children, dtype=np.int32),
+                "node_entries": np.array(node_entries, dtype=np.int32),
+                "entry_offsets": np.array(entry_offsets, dtype=np.int64),
+                "synonyms": np.array(synonyms, dtype=str),
+                "scores": np.array(scores, dtype=np.float64),
+            }
+        )
+
+    @staticmethod
+    def _get_filepath(prefix: str, name: str) -> str:
+        return f"{prefix}.{name}.npy"
+
+    @classmethod
+    def exists(cls, prefix: str) -> bool:
+        return all(os.path.isfile(cls._get_filepath(prefix, name)) for name in _ARRAY_NAMES)
+
+    def save(self, prefix: str) -> None:
+        """Save the arrays to `{prefix}.{name}.npy`."""
+        for name in _ARRAY_NAMES:
+            np.save(self._get_filepath(prefix, name), getattr(self, name))
+        logging.info(f"Synonym trie saved to {prefix}.*.npy with {len(self)} entries.")
+
+    @classmethod
+    def load(cls, prefix: str) -> "SynonymTrie":
+        """Memory-map the arrays saved by `save`."""
+        return cls({name: np.load(cls._get_filepath(prefix, name), mmap_mode="r") for name in _ARRAY_NAMES})
+
+    def _get_child(self, node: int, token: str) -> int | None:
+        token_id = int(np.searchsorted(self.vocab, token))
+        if token_id == len(self.vocab) or self.vocab[token_id] != token:
+            return None
+        start, end = int(self.edge_offsets[node]), int(self.edge_offsets[node + 1])
+        i = start + int(np.searchsorted(self.edge_tokens[start:end], token_id))
+        if i == end or self.edge_tokens[i] != token_id:
+            return None
+        return int(self.edge_children[i])
+
+    def _get_synonyms(self, entry: int) -> list[tuple[str, float]]:
+        start, end = int(self.entry_offsets[entry]), int(self.entry_offsets[entry + 1])
+        return [
+            (str(synonym), float(score))
+            for synonym, score in zip(self.synonyms[start:end], self.scores[start:end], strict=True)
+        ]
+
+    def longest_match(
+        self, tokens: tuple[str, ...] | list[str], start: int, max_length: int | None = None
+    ) -> tuple[int, list[tuple[str, float]]] | None:
+        """Find the longest entry matching the tokens from `start` in a single walk down the trie.
+
+        Args:
+            tokens (tuple[str, ...] | list[str]): Tokens to match.
+            start (int): The position to start matching from.
+            max_length (int | None, optional): The maximum number of tokens to match. Defaults to None (unlimited).
+
+        Returns:
+            tuple[int, list[tuple[str, float]]] | None: The end position of the match and its synonyms,
+                or None if no entry matches.
+        """
+        end = len(tokens) if max_length is None else min(len(tokens), start + max_length)
+        node = 0
+        found = None
+        for position in range(start, end):
+            child = self._get_child(node, tokens[position])
+            if child is None:
+                break
+            node = child
+            entry = int(self.node_entries[node])
+            if entry >= 0:
+                found = (position + 1, entry)
+        if found is None:
+            return None
+        end_position, entry = found
+        return end_position, self._get_synonyms(entry)
+
+    def to_entry_dict(self) -> dict[str, list[tuple[str, float]]]:
+        """Convert the trie back into a dict of space-separated token sequences to their synonyms and scores."""
+        entry_dict: dict[str, list[tuple[str, float]]] = {}
+        stack: list[tuple[int, list[str]]] = [(0, [])]
+        while stack:
+            node, prefix = stack.pop()
+            entry = int(self.node_entries[node])
+            if entry >= 0:
+                entry_dict[" ".join(prefix)] = self._get_synonyms(entry)
+            for i in range(int(self.edge_offsets[node]), int(self.edge_offsets[node + 1])):
+                stack.append((int(self.edge_children[i]), [*prefix, str(self.vocab[self.edge_tokens[i]])]))
+        return entry_dict
@@ -1,12 +1,17 @@
+from functools import cached_property
 from typing import Any, Literal, cast
 
-from amazon_product_search.cache import weak_lru_cache
 from amazon_product_search.nlp.normalizer import normalize_query
 from amazon_product_search.nlp.tokenizers import Tokenizer, locale_to_tokenizer
-from amazon_product_search.retrieval.query_vector_cache import QueryVectorCache
+from amazon_product_search.retrieval.query_encoder import (
+    DEFAULT_ONNX_MODEL_FILEPATH,
+    EncoderBackend,
+    QueryEncoder,
+    load_query_encoder,
+)
+from amazon_product_search.retrieval.query_vector_cache import QueryEmbeddingCache, QueryVectorCache, to_list
 from amazon_product_search.source import Locale
 from amazon_product_search.synonyms.synonym_dict import SynonymDict
-from dense_retrieval.encoders import SBERTEncoder
 
 Operator = Literal["and", "weakAnd"]
 
@@ -18,22 +23,51 @@ class QueryBuilder:
         hf_model_name: str,
         synonym_dict: SynonymDict | None = None,
         vector_cache: QueryVectorCache | None = None,
+        embedding_cache: QueryEmbeddingCache | None = None,
+        encoder_backend: EncoderBackend = "sbert",
+        onnx_model_filepath: str = DEFAULT_ONNX_MODEL_FILEPATH,
+        intra_op_num_threads: int = 0,
+        inter_op_num_threads: int = 0,
+        encoder: QueryEncoder | None = None,
     ) -> None:
         self.tokenizer: Tokenizer = locale_to_tokenizer(locale)
-        self.encoder = SBERTEncoder(hf_model_name)
+        self.hf_model_name = hf_model_name
+        self.encoder_backend = encoder_backend
+        self.onnx_model_filepath = onnx_model_filepath
+        # ONNX Runtime thread counts for the "onnx" backend, where 0 lets ONNX Runtime decide.
+        self.intra_op_num_threads = intra_op_num_threads
+        self.inter_op_num_threads = inter_op_num_threads
+        if encoder is not None:
+            self.encoder = encoder
         if synonym_dict is None:
             synonym_dict = SynonymDict(locale)
         self.synonym_dict = synonym_dict
         if vector_cache is None:
             vector_cache = QueryVectorCache()
         self.vector_cache = vector_cache
+        if embedding_cache is None:
+            embedding_cache = QueryEmbeddingCache()
+        self.embedding_cache = embedding_cache
+
+    @cached_property
+    def encoder(self) -> QueryEncoder:
+        """The query encoder, loaded on first use so that lexical search does not import or load the model."""
+        return load_query_encoder(
+            self.hf_model_name,
+            backend=self.encoder_backend,
+            onnx_model_filepath=self.onnx_model_filepath,
+            intra_op_num_threads=self.intra_op_num_threads,
+            inter_op_num_threads=self.inter_op_num_threads,
+        )
 
-    @weak_lru_cache(maxsize=128)
     def encode(self, query_str: str) -> list[float]:
         query_vector = self.vector_cache[query_str]
-        if query_vector is not None:
-            return query_vector
-        return self.encoder.encode(query_str).tolist()
+        if query_vector is None:
+            query_vector = self.embedding_cache.get(query_str)
+        if query_vector is None:
+            query_vector = self.encoder.encode(query_str)
+            self.embedding_cache.set(query_str, query_vector)
+        return to_list(query_vector)
 
     def _build_text_matching_query(self, tokens: list[str], fields: list[str], operator: Operator) -> str:
         if operator == "weakAnd":
@@ -73,7 +107,7 @@ class QueryBuilder:
         description_weight: float = 1.0,
     ) -> dict[str, Any]:
         query_str = normalize_query(query_str)
-        tokens = cast(list, self.tokenizer.tokenize(query_str))
+        tokens = cast(list, self.tokenizer.tokenize_query(query_str))
         query_str = " ".join(tokens)
 
         if not fields:
@@ -36,6 +36,23 @@ class VespaClient:
         batch = [{"id": id_fn(doc), "fields": doc} for doc in docs]
         self.vespa_app.feed_iterable(iter=batch, schema=schema, callback=callback_fn)
 
+    def delete(
+        self,
+        schema: str,
+        doc_ids: list[str],
+        callback_fn: Callable[[VespaResponse, str], None] | None = None,
+    ) -> None:
+        """Delete a batch of docs from Vespa by ID.
+
+        Args:
+            schema (str): The name of the target schema.
+            doc_ids (list[str]): IDs of the docs to delete.
+            callback_fn (Callable[[VespaResponse, str], None] | None, optional): Called with each response.
+                Defaults to None.
+        """
+        batch = [{"id": doc_id} for doc_id in doc_ids]
+        self.vespa_app.feed_iterable(iter=batch, schema=schema, operation_type="delete", callback=callback_fn)
+
     @staticmethod
     def _convert_vespa_response_to_response(vespa_response: VespaQueryResponse) -> Response:
         """Map a raw Elasticsearch response to our Response class for convenience.
@@ -60,9 +60,9 @@ def export(c, hf_model_name=HF.EN_ALL_MINILM, output_model_name="model", verbose
         input_names=["input_ids", "attention_mask"],
         output_names=["output"],
         dynamic_axes={
-            "input_ids": {0: "batch_size"},
-            "attention_mask": {0: "batch_size"},
-            "vector": {0: "batch_size"},
+            "input_ids": {0: "batch_size", 1: "sequence_length"},
+            "attention_mask": {0: "batch_size", 1: "sequence_length"},
+            "output": {0: "batch_size"},
         },
         opset_version=17,
         do_constant_folding=True,
@@ -1,4 +1,9 @@
-from amazon_product_search.es.es_client import EsClient
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from amazon_product_search.es.es_client import AsyncEsClient, EsClient, SearchRequest
 from amazon_product_search.retrieval.response import Response, Result
 
 
@@ -29,6 +34,14 @@ def test_generate_actions():
     assert actual == expected
 
 
+def test_generate_delete_actions():
+    actual = list(EsClient._generate_delete_actions("products", ["1", "2"]))
+    assert actual == [
+        {"_op_type": "delete", "_index": "products", "_id": "1"},
+        {"_op_type": "delete", "_index": "products", "_id": "2"},
+    ]
+
+
 def test_convert_es_response_to_response():
     es_response = {
         "took": 3,
@@ -64,3 +77,53 @@ def test_convert_es_response_to_response():
     )
     actual = EsClient._convert_es_response_to_response(es_response)
     assert actual == expected
+
+
+def _build_es_response(product_id: str) -> dict:
+    return {
+        "hits": {
+            "total": {"value": 1, "relation": "eq"},
+            "hits": [{"_id": product_id, "_score": 1.0, "_source": {"product_id": product_id}}],
+        },
+    }
+
+
+def test_build_msearch_body():
+    requests = [
+        SearchRequest(index_name="products", query={"match_all": {}}, size=10),
+        SearchRequest(index_name="products", knn_query={"field": "product_vector"}, explain=True),
+    ]
+    expected = [
+        {"index": "products"},
+        {"query": {"match_all": {}}, "size": 10, "explain": False},
+        {"index": "products"},
+        {"knn": {"field": "product_vector"}, "size": 20, "explain": True},
+    ]
+    actual = EsClient._build_msearch_body(requests)
+    assert actual == expected
+
+
+def test_convert_msearch_response_to_responses():
+    es_response = {"responses": [_build_es_response("1"), _build_es_response("2")]}
+    responses = EsClient._convert_msearch_response_to_responses(es_response)
+    assert [response.results[0].product["product_id"] for response in responses] == ["1", "2"]
+
+    es_response = {"responses": [_build_es_response("1"), {"error": {"type": "index_not_found_exception"}}]}
+    with pytest.raises(RuntimeError):
+        EsClient._convert_msearch_response_to_responses(es_response)
+
+
+def test_search_many():
+    async def msearch(body):
+        return {"responses": [_build_es_response(header["index"]) for header in body[::2]]}
+
+    async def run() -> list[Response]:
+        async with AsyncEsClient() as es_client:
+            es_client.es.msearch = AsyncMock(side_effect=msearch)
+            requests = [SearchRequest(index_name=str(i)) for i in range(5)]
+            responses = await es_client.search_many(requests, batch_size=2)
+            assert es_client.es.msearch.call_count == 3
+            return responses
+
+    responses = asyncio.run(run())
+    assert [response.results[0].product["product_id"] for response in responses] == ["0", "1", "2", "3", "4"]
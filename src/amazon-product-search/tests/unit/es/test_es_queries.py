@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from amazon_product_search.es.queries import (
+    build_knn_query,
+    build_lexical_query,
+    build_match_all_query,
+    build_rescore_query,
+)
+from amazon_product_search.es.templates.template_loader import TemplateLoader
+
+
+@pytest.fixture(scope="module")
+def template_loader():
+    return TemplateLoader()
+
+
+def test_build_match_all_query(template_loader):
+    expected = json.loads(template_loader.load("match_all.j2").render())
+    assert build_match_all_query() == expected
+
+
+@pytest.mark.parametrize(
+    ("queries", "fields", "operator", "enable_phrase_match_boost"),
+    [
+        (["query"], ["product_title"], "and", False),
+        (["query", "synonym", "another synonym"], ["product_title^2", "product_brand"], "or", False),
+        (["query", "synonym"], ["product_title"], "and", True),
+    ],
+)
+def test_build_lexical_query(template_loader, queries, fields, operator, enable_phrase_match_boost):
+    kwargs = {
+        "queries": queries,
+        "fields": fields,
+        "operator": operator,
+        "enable_phrase_match_boost": enable_phrase_match_boost,
+    }
+    expected = json.loads(template_loader.load("lexical.j2").render(**kwargs))
+    assert build_lexical_query(**kwargs) == expected
+
+
+@pytest.mark.parametrize("product_ids", [None, [], ["1", "2"]])
+def test_build_knn_query(template_loader, product_ids):
+    kwargs = {
+        "query_vector": [0.1, -0.25, 3e-8],
+        "field": "product_vector",
+        "k": 10,
+        "num_candidates": 100,
+        "product_ids": product_ids,
+    }
+    expected = json.loads(template_loader.load("semantic.j2").render(**kwargs))
+    assert build_knn_query(**kwargs) == expected
+
+
+def test_build_rescore_query(template_loader):
+    kwargs = {"query_vector": [0.1, -0.25, 3e-8], "window_size": 100}
+    expected = json.loads(template_loader.load("rescore.j2").render(**kwargs))
+    assert build_rescore_query(**kwargs) == expected
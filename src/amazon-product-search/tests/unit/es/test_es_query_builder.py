@@ -187,3 +187,11 @@ def test_build_knn_search_query_with_product_id():
         "boost",
         "filter",
     }
+
+
+def test_encode_many():
+    query_builder = QueryBuilder(locale="us")
+    query_vectors = query_builder.encode_many(["query", "another query", "query"])
+    assert len(query_vectors) == 3
+    assert query_vectors[0] == query_vectors[2]
+    assert query_vectors[0] == query_builder.encode("query")
@@ -57,3 +57,34 @@ def test_analyze_with_unidic(s, expected):
     t = JapaneseTokenizer(DicType.UNIDIC, output_format=OutputFormat.DUMP)
     actual = t.tokenize(s)
     assert actual == expected
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_tokenize_many(num_workers):
+    texts = ["", "ナイキ ユニクロ", "あらかじめご了承いただきますようお願い申し上げます", "キャンプ用品"] * 3
+    t = JapaneseTokenizer(DicType.UNIDIC)
+    executors = []
+    for _ in range(2):
+        actual = list(t.tokenize_many(iter(texts), num_workers=num_workers, chunk_size=3, min_parallel_size=4))
+        assert actual == [t.tokenize(s) for s in texts]
+        executors.append(t._executor)
+    # The pool is created once and reused.
+    assert executors[0] is executors[1]
+    assert (t._executor is not None) == (num_workers != 1)
+    t.close()
+    assert t._executor is None
+
+
+def test_tokenize_many_below_min_parallel_size():
+    texts = ["ナイキ ユニクロ", "キャンプ用品"]
+    t = JapaneseTokenizer(DicType.UNIDIC)
+    actual = list(t.tokenize_many(texts, num_workers=2))
+    assert actual == [t.tokenize(s) for s in texts]
+    assert t._executor is None
+
+
+def test_tokenize_query():
+    t = JapaneseTokenizer(DicType.UNIDIC)
+    tokens = t.tokenize_query("ナイキ ユニクロ")
+    tokens.append("modified")
+    assert t.tokenize_query("ナイキ ユニクロ") == ["ナイキ", "ユニクロ"]
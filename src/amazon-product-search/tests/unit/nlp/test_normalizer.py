@@ -1,6 +1,35 @@
+import random
+import unicodedata
+
+import polars as pl
 import pytest
 
-from amazon_product_search.nlp.normalizer import escape_json, normalize_doc, normalize_query
+from amazon_product_search.nlp.normalizer import (
+    escape_json,
+    normalize_doc,
+    normalize_doc_expr,
+    normalize_query,
+    normalize_query_expr,
+    remove_extra_spaces,
+    remove_html_tags,
+    remove_punctuations,
+    remove_surrogates,
+)
+
+TEXTS = [
+    "",
+    "  ",
+    "Joe's Kitchen",
+    "  LOUIS VUITTON",
+    '<p>Hello, "World"!</p>\n<br/>C++ 2.5°C #1 a/b \\ \x08',
+    "\uff21\uff22\uff23　ｱｲｳ①\t商品写真は、撮影条件などの影響により<br>差異がみられる場合が御座います。",
+    "emoji 😀 and ½ cup",
+]
+
+
+def test_remove_surrogates():
+    assert remove_surrogates("a😀b𠮷c") == "abc"
+    assert remove_surrogates("日本語") == "日本語"
 
 
 @pytest.mark.parametrize(
@@ -43,3 +72,42 @@ def test_normalize_doc(s, expected):
 def test_normalize_query(s, expected):
     actual = normalize_query(s)
     assert actual == expected
+
+
+@pytest.mark.parametrize("s", TEXTS)
+def test_normalize_doc_is_equivalent_to_multiple_passes(s):
+    expected = remove_extra_spaces(remove_punctuations(unicodedata.normalize("NFKC", remove_html_tags(s)).lower()))
+    assert normalize_doc(s) == expected
+
+
+@pytest.mark.parametrize("s", TEXTS)
+def test_normalize_query_is_equivalent_to_multiple_passes(s):
+    expected = remove_extra_spaces(escape_json(unicodedata.normalize("NFKC", s).lower()))
+    assert normalize_query(s) == expected
+
+
+def test_normalize_expr():
+    df = pl.DataFrame({"text": [*TEXTS, None]})
+    df = df.select(
+        normalize_doc_expr(pl.col("text")).alias("doc"),
+        normalize_query_expr(pl.col("text")).alias("query"),
+    )
+    assert df["doc"].to_list() == [*[normalize_doc(s) for s in TEXTS], None]
+    assert df["query"].to_list() == [*[normalize_query(s) for s in TEXTS], None]
+
+
+def test_normalize_expr_on_random_texts():
+    # ASCII including controls such as `\x1c-\x1f`, which Python and Polars (Rust) disagree on as whitespace,
+    # and non-ASCII characters changed by NFKC or treated as whitespace. Combining marks are excluded (see
+    # `normalize_doc_expr`).
+    alphabet = [chr(c) for c in range(0x80)] + list("\x85\xa0\u2003\u2028\u3000\u180e\u200béÅあ漢\uff03°ﬁ½")
+    rng = random.Random(0)
+    texts = ["".join(rng.choices(alphabet, k=rng.randint(0, 20))) for _ in range(1000)]
+    texts += ["\x1c", " a\x1db\x1e ", "\x1fa\x1f"]
+    df = pl.DataFrame({"text": texts})
+    df = df.select(
+        normalize_doc_expr(pl.col("text")).alias("doc"),
+        normalize_query_expr(pl.col("text")).alias("query"),
+    )
+    assert df["doc"].to_list() == [normalize_doc(s) for s in texts]
+    assert df["query"].to_list() == [normalize_query(s) for s in texts]
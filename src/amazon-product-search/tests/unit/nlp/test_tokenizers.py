@@ -0,0 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from amazon_product_search.nlp.tokenizers import (
+    EnglishTokenizer,
+    JapaneseTokenizer,
+    get_tokenizer,
+    locale_to_tokenizer,
+)
+from amazon_product_search.nlp.tokenizers.japanese_tokenizer import DicType, OutputFormat
+
+
+def test_get_tokenizer():
+    assert isinstance(get_tokenizer("us"), EnglishTokenizer)
+    assert isinstance(get_tokenizer("jp"), JapaneseTokenizer)
+    assert get_tokenizer("jp") is locale_to_tokenizer("jp")
+    assert get_tokenizer("jp", output_format=OutputFormat.DUMP) is not get_tokenizer("jp")
+    assert get_tokenizer("jp", dic_type=DicType.IPADIC) is get_tokenizer("jp", dic_type=DicType.IPADIC)
+
+    with pytest.raises(ValueError, match="Unsupported locale"):
+        get_tokenizer("fr")  # type: ignore
+
+
+def test_tagger_per_thread():
+    tokenizer = JapaneseTokenizer()
+    texts = ["ナイキ ユニクロ", "あらかじめご了承いただきますようお願い申し上げます"] * 50
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        actual = list(executor.map(tokenizer.tokenize, texts))
+        taggers = set(executor.map(lambda _: id(tokenizer.tagger), range(100)))
+
+    assert actual == [tokenizer.tokenize(s) for s in texts]
+    assert id(tokenizer.tagger) not in taggers
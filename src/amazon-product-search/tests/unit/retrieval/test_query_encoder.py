@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+from onnx import TensorProto, helper, numpy_helper, save_model
+from tokenizers import Tokenizer
+from tokenizers.models import WordLevel
+from tokenizers.pre_tokenizers import Whitespace
+
+from amazon_product_search.es.query_builder import QueryBuilder
+from amazon_product_search.retrieval.query_encoder import load_query_encoder
+from amazon_product_search.vespa.query_builder import QueryBuilder as VespaQueryBuilder
+from dense_retrieval.encoders import ONNXEncoder
+
+VOCAB = {"[PAD]": 0, "[UNK]": 1, "red": 2, "blue": 3, "shoes": 4}
+EMBEDDINGS = np.arange(len(VOCAB) * 3, dtype=np.float32).reshape(len(VOCAB), 3)
+
+
+def save_mean_pooling_model(filepath: str, sequence_length: int | str = "sequence_length") -> None:
+    """Save a model that looks up token embeddings and mean-pools them, like `MeanPoolingEncoderONNX`."""
+    nodes = [
+        helper.make_node("Gather", ["embeddings", "input_ids"], ["token_embs"]),
+        helper.make_node("Cast", ["attention_mask"], ["mask"], to=TensorProto.FLOAT),
+        helper.make_node("Unsqueeze", ["mask", "last_axis"], ["mask_3d"]),
+        helper.make_node("Mul", ["token_embs", "mask_3d"], ["masked_embs"]),
+        helper.make_node("ReduceSum", ["masked_embs", "sequence_axis"], ["sum_embs"], keepdims=0),
+        helper.make_node("ReduceSum", ["mask_3d", "sequence_axis"], ["num_tokens"], keepdims=0),
+        helper.make_node("Div", ["sum_embs", "num_tokens"], ["output"]),
+    ]
+    graph = helper.make_graph(
+        nodes,
+        "mean_pooling",
+        inputs=[
+            helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["batch_size", sequence_length]),
+            helper.make_tensor_value_info("attention_mask", TensorProto.INT64, ["batch_size", sequence_length]),
+        ],
+        outputs=[helper.make_tensor_value_info("output", TensorProto.FLOAT, ["batch_size", 3])],
+        initializer=[
+            numpy_helper.from_array(EMBEDDINGS, "embeddings"),
+            numpy_helper.from_array(np.array([-1], dtype=np.int64), "last_axis"),
+            numpy_helper.from_array(np.array([1], dtype=np.int64), "sequence_axis"),
+        ],
+    )
+    # The IR version is pinned so that older ONNX Runtime versions can load the model.
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)], ir_version=8)
+    save_model(model, filepath)
+
+
+@pytest.fixture
+def model_and_tokenizer(tmp_path) -> tuple[str, str]:
+    model_filepath = str(tmp_path / "model_quantized.onnx")
+    save_mean_pooling_model(model_filepath)
+    tokenizer = Tokenizer(WordLevel(VOCAB, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = Whitespace()
+    tokenizer_filepath = str(tmp_path / "tokenizer.json")
+    tokenizer.save(tokenizer_filepath)
+    return model_filepath, tokenizer_filepath
+
+
+def expected_vector(text: str) -> np.ndarray:
+    return EMBEDDINGS[[VOCAB.get(token, 1) for token in text.split()]].mean(axis=0)
+
+
+def test_onnx_encoder_encode(model_and_tokenizer):
+    model_filepath, tokenizer_filepath = model_and_tokenizer
+    encoder = ONNXEncoder(model_filepath, tokenizer_filepath, intra_op_num_threads=1, inter_op_num_threads=1)
+    texts = ["red blue shoes", "red", "blue shoes", "green"]
+
+    actual = encoder.encode(texts, batch_size=2)
+
+    assert actual.dtype == np.float32
+    np.testing.assert_allclose(actual, np.stack([expected_vector(text) for text in texts]))
+    np.testing.assert_allclose(encoder.encode("blue shoes"), expected_vector("blue shoes"))
+
+
+def test_onnx_encoder_encode_with_fixed_sequence_length(tmp_path, model_and_tokenizer):
+    _, tokenizer_filepath = model_and_tokenizer
+    model_filepath = str(tmp_path / "fixed.onnx")
+    save_mean_pooling_model(model_filepath, sequence_length=8)
+    encoder = ONNXEncoder(model_filepath, tokenizer_filepath)
+
+    actual = encoder.encode(["red blue shoes", "red"])
+
+    assert encoder.fixed_length == 8
+    np.testing.assert_allclose(actual, np.stack([expected_vector("red blue shoes"), expected_vector("red")]))
+
+
+def test_load_query_encoder_with_unsupported_backend():
+    with pytest.raises(ValueError, match="Unsupported encoder backend"):
+        load_query_encoder("model", backend="unknown")  # type: ignore[arg-type]
+
+
+def test_query_builder_with_onnx_backend(model_and_tokenizer):
+    model_filepath, tokenizer_filepath = model_and_tokenizer
+    query_builder = QueryBuilder(
+        locale="us",
+        hf_model_name=tokenizer_filepath,
+        encoder_backend="onnx",
+        onnx_model_filepath=model_filepath,
+        intra_op_num_threads=2,
+        inter_op_num_threads=1,
+    )
+
+    assert isinstance(query_builder.encoder, ONNXEncoder)
+    session_options = query_builder.encoder.session.get_session_options()
+    assert (session_options.intra_op_num_threads, session_options.inter_op_num_threads) == (2, 1)
+    np.testing.assert_allclose(query_builder.encode("red shoes"), expected_vector("red shoes"), rtol=1e-6)
+    np.testing.assert_allclose(
+        query_builder.encode_many(["blue", "red shoes"]), [expected_vector("blue"), expected_vector("red shoes")]
+    )
+
+
+def test_vespa_query_builder_with_onnx_backend(model_and_tokenizer):
+    model_filepath, tokenizer_filepath = model_and_tokenizer
+    query_builder = VespaQueryBuilder(
+        locale="us",
+        hf_model_name=tokenizer_filepath,
+        encoder_backend="onnx",
+        onnx_model_filepath=model_filepath,
+        intra_op_num_threads=2,
+        inter_op_num_threads=1,
+    )
+
+    session_options = query_builder.encoder.session.get_session_options()
+    assert (session_options.intra_op_num_threads, session_options.inter_op_num_threads) == (2, 1)
+    np.testing.assert_allclose(query_builder.encode("red shoes"), expected_vector("red shoes"), rtol=1e-6)
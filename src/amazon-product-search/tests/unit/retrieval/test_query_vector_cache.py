@@ -0,0 +1,169 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from amazon_product_search.retrieval.query_vector_cache import (
+    MmapQueryVectorCache,
+    QueryEmbeddingCache,
+    QueryVectorCache,
+)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    df = pd.DataFrame(
+        {
+            "query": ["a", "b", "c", "a"],
+            "query_vector": [np.array([1.0, 0.0]), np.array([0.0, 1.0]), np.array([0.5, 0.5]), np.array([9.0, 9.0])],
+        }
+    )
+    df.to_parquet(tmp_path / "query_vector_cache_us.parquet")
+    return str(tmp_path)
+
+
+def test_load(data_dir):
+    cache = QueryVectorCache()
+    cache.load(locale="us", data_dir=data_dir)
+    assert cache["b"] == [0.0, 1.0]
+    assert cache["unknown"] is None
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float16])
+def test_load_mmap(data_dir, dtype):
+    cache = MmapQueryVectorCache(dtype=dtype)
+    assert cache["a"] is None
+    cache.load(locale="us", data_dir=data_dir)
+
+    query_vector = cache["b"]
+    assert isinstance(query_vector, np.ndarray)
+    assert query_vector.dtype == dtype
+    assert query_vector.tolist() == [0.0, 1.0]
+    # Duplicated queries keep their first vector.
+    assert cache["a"].tolist() == [1.0, 0.0]
+    assert cache["unknown"] is None
+
+    # The second load memory-maps the files saved by the first load.
+    another_cache = MmapQueryVectorCache(dtype=dtype)
+    another_cache.load(locale="us", data_dir=data_dir)
+    assert isinstance(another_cache._vectors, np.memmap)
+    assert another_cache["c"].tolist() == [0.5, 0.5]
+
+
+def test_load_mmap_rebuilds_when_sources_change(tmp_path, data_dir):
+    first_cache = MmapQueryVectorCache()
+    first_cache.load(locale="us", data_dir=data_dir)
+    assert first_cache["d"] is None
+    first_files = {path.name for path in tmp_path.glob("*.npy")}
+    assert len(first_files) == 2
+
+    # Loading again without changes reuses the files.
+    MmapQueryVectorCache().load(locale="us", data_dir=data_dir)
+    assert {path.name for path in tmp_path.glob("*.npy")} == first_files
+
+    # A new spill file triggers a rebuild into new files, and the old files are removed.
+    QueryEmbeddingCache(locale="us", data_dir=data_dir, spill_every=1).set("d", [0.25, 0.75])
+    cache = MmapQueryVectorCache()
+    cache.load(locale="us", data_dir=data_dir)
+    assert cache["d"].tolist() == [0.25, 0.75]
+    # The old files are still readable by the caches that mapped them.
+    assert first_cache["a"].tolist() == [1.0, 0.0]
+    second_files = {path.name for path in tmp_path.glob("*.npy")}
+    assert len(second_files) == 2
+    assert not first_files & second_files
+    assert not list(tmp_path.glob("*.tmp-*"))
+
+
+def test_load_mmap_concurrently(data_dir):
+    num_builds = 0
+    save_mmap_files = MmapQueryVectorCache._save_mmap_files
+
+    def slow_save_mmap_files(self, *args):
+        nonlocal num_builds
+        num_builds += 1
+        # Without the lock, the other worker would publish its build and remove these files meanwhile.
+        time.sleep(0.2)
+        save_mmap_files(self, *args)
+
+    caches = [MmapQueryVectorCache() for _ in range(4)]
+    with (
+        patch.object(MmapQueryVectorCache, "_save_mmap_files", slow_save_mmap_files),
+        ThreadPoolExecutor(max_workers=len(caches)) as executor,
+    ):
+        list(executor.map(lambda cache: cache.load(locale="us", data_dir=data_dir), caches))
+
+    # Only one worker builds the files, and the others wait and map them.
+    assert num_builds == 1
+    for cache in [*caches, MmapQueryVectorCache()]:
+        cache.load(locale="us", data_dir=data_dir)
+        assert cache["b"].tolist() == [0.0, 1.0]
+
+
+def test_embedding_cache_evicts_least_recently_used():
+    # Each vector takes 8 bytes (2 x float32), so up to 2 vectors fit.
+    cache = QueryEmbeddingCache(max_bytes=16)
+    cache.set("a", [1.0, 0.0])
+    cache.set("b", [0.0, 1.0])
+    assert cache.get("a").tolist() == [1.0, 0.0]
+    cache.set("c", [0.5, 0.5])
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.stats() == {"hits": 3, "misses": 1, "evictions": 1, "hit_rate": 0.75, "size": 2, "bytes": 16}
+
+
+def test_embedding_cache_spill(tmp_path, data_dir):
+    cache = QueryEmbeddingCache(locale="us", data_dir=data_dir, spill_every=2)
+    assert cache.spill() is None
+    cache.set("d", [0.25, 0.75])
+    assert not list(tmp_path.glob("*.spill-*.parquet"))
+    cache.set("e", [0.75, 0.25])
+    assert len(list(tmp_path.glob("*.spill-*.parquet"))) == 1
+    cache.set("f", [1.0, 1.0])
+    assert cache.spill() is not None
+
+    query_vector_cache = QueryVectorCache()
+    query_vector_cache.load(locale="us", data_dir=data_dir)
+    assert query_vector_cache["b"] == [0.0, 1.0]
+    assert query_vector_cache["d"] == [0.25, 0.75]
+    assert query_vector_cache["f"] == [1.0, 1.0]
+    # Loading compacts the spill files into the main file.
+    assert not list(tmp_path.glob("*.spill-*.parquet"))
+    df = pd.read_parquet(tmp_path / "query_vector_cache_us.parquet")
+    assert sorted(df["query"]) == ["a", "b", "c", "d", "e", "f"]
+    assert df["query_vector"][0].tolist() == [1.0, 0.0]
+
+
+def test_embedding_cache_spill_is_atomic(tmp_path, data_dir):
+    cache = QueryEmbeddingCache(locale="us", data_dir=data_dir)
+    cache.set("d", [0.25, 0.75])
+    to_parquet = pd.DataFrame.to_parquet
+
+    def to_parquet_partially(self, path, *args, **kwargs):
+        to_parquet(self, path, *args, **kwargs)
+        # Until the file is complete, loaders do not see it.
+        assert not list(tmp_path.glob("*.spill-*.parquet"))
+        raise OSError("Disk full")
+
+    with patch.object(pd.DataFrame, "to_parquet", to_parquet_partially), pytest.raises(OSError, match="Disk full"):
+        cache.spill()
+    assert not list(tmp_path.glob("*.spill-*"))
+
+    filepath = cache.spill()
+    assert filepath is None
+    cache.set("e", [0.75, 0.25])
+    filepath = cache.spill()
+    assert [str(path) for path in tmp_path.glob("*.spill-*")] == [filepath]
+
+
+def test_embedding_cache_close(tmp_path, data_dir):
+    cache = QueryEmbeddingCache(locale="us", data_dir=data_dir)
+    cache.set("d", [0.25, 0.75])
+    assert not list(tmp_path.glob("*.spill-*.parquet"))
+    assert cache.close() is not None
+    assert len(list(tmp_path.glob("*.spill-*.parquet"))) == 1
+    assert cache.close() is None
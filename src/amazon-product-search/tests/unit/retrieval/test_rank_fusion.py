@@ -2,11 +2,17 @@ import numpy as np
 import pytest
 
 from amazon_product_search.retrieval.rank_fusion import (
+    RankFusion,
     _append_results,
     _borda_counts,
     _combine_responses,
+    _merge_responses,
     _min_max_scores,
+    _resolve_score_transformation_methods,
     _rrf_scores,
+    _top_k_indices,
+    fuse,
+    fuse_many,
 )
 from amazon_product_search.retrieval.response import Response, Result
 
@@ -180,3 +186,126 @@ def test_combine_responses_with_size():
     response = _combine_responses(lexical_response, semantic_response, combination_method="sum", size=4)
     assert response.total_hits == 6
     assert len(response.results) == 4
+
+
+@pytest.mark.parametrize(
+    ("scores", "size", "expected"),
+    [
+        ([], 3, []),
+        ([1, 3, 2], 0, []),
+        ([1, 3, 2], 2, [1, 2]),
+        ([1, 3, 2], 5, [1, 2, 0]),
+        # Ties are broken by index in descending order.
+        ([1, 1, 1, 0], 2, [2, 1]),
+    ],
+)
+def test_top_k_indices(scores, size, expected):
+    actual = _top_k_indices(np.array(scores, dtype=np.float64), size)
+    assert actual.tolist() == expected
+
+
+def _random_response(rng: np.random.Generator, num_results: int) -> Response:
+    product_ids = rng.choice(100, size=num_results, replace=False)
+    # Scores are rounded so that ties occur.
+    scores = sorted(np.round(rng.uniform(0, 10, size=num_results), 0).tolist(), reverse=True)
+    results = [
+        Result(product={"product_id": str(product_id)}, score=score)
+        for product_id, score in zip(product_ids, scores, strict=True)
+    ]
+    return Response(results=results, total_hits=num_results * 2)
+
+
+@pytest.mark.parametrize("combination_method", ["sum", "max"])
+@pytest.mark.parametrize("score_transformation_method", ["min_max", "rrf", "borda", None, ["min_max", "rrf"]])
+@pytest.mark.parametrize("size", [0, 5, 100])
+def test_fuse_vectorized(combination_method, score_transformation_method, size):
+    rng = np.random.default_rng(seed=0)
+    for _ in range(10):
+        lexical_response = _random_response(rng, int(rng.integers(0, 30)))
+        semantic_response = _random_response(rng, int(rng.integers(0, 30)))
+        responses = []
+        for vectorized in [False, True]:
+            rank_fusion = RankFusion(
+                combination_method=combination_method,
+                score_transformation_method=score_transformation_method,
+                vectorized=vectorized,
+            )
+            responses.append(
+                fuse(
+                    "query",
+                    Response(results=[Result(**vars(r)) for r in lexical_response.results], total_hits=10),
+                    Response(results=[Result(**vars(r)) for r in semantic_response.results], total_hits=20),
+                    lexical_boost=0.3,
+                    semantic_boost=0.7,
+                    rank_fusion=rank_fusion,
+                    size=size,
+                )
+            )
+        expected, actual = responses
+        assert actual.total_hits == expected.total_hits
+        assert [r.product["product_id"] for r in actual.results] == [r.product["product_id"] for r in expected.results]
+        assert np.allclose([r.score for r in actual.results], [r.score for r in expected.results])
+
+
+@pytest.mark.parametrize(
+    ("score_transformation_method", "expected"),
+    [
+        (None, {"a": None, "b": None, "c": None}),
+        ("rrf", {"a": "rrf", "b": "rrf", "c": "rrf"}),
+        (["rrf", "min_max", None], {"a": "rrf", "b": "min_max", "c": None}),
+        ({"a": "borda"}, {"a": "borda", "b": None, "c": None}),
+    ],
+)
+def test_resolve_score_transformation_methods(score_transformation_method, expected):
+    actual = _resolve_score_transformation_methods(score_transformation_method, ["a", "b", "c"])
+    assert actual == expected
+
+
+def test_resolve_score_transformation_methods_with_wrong_length():
+    with pytest.raises(ValueError, match="3 legs"):
+        _resolve_score_transformation_methods(["rrf", "min_max"], ["a", "b", "c"])
+
+
+def test_merge_responses():
+    responses = {
+        "a": Response(results=[Result(product={"product_id": "1"}, score=3)], total_hits=1),
+        "b": Response(
+            results=[Result(product={"product_id": "1"}, score=1), Result(product={"product_id": "2"}, score=2)],
+            total_hits=10,
+        ),
+        "c": Response(results=[Result(product={"product_id": "3"}, score=1)], total_hits=1),
+    }
+    response = _merge_responses(responses, combination_method="sum", size=2)
+    assert response.total_hits == 10
+    assert [result.product["product_id"] for result in response.results] == ["1", "2"]
+    assert response.results[0].score == 4
+    assert response.results[0].explanation == {"a_score": 3, "b_score": 1, "c_score": 0}
+
+    response = _merge_responses(responses, combination_method="max", size=3)
+    assert [result.product["product_id"] for result in response.results] == ["1", "2", "3"]
+    assert response.results[0].score == 3
+
+
+@pytest.mark.parametrize("vectorized", [False, True])
+def test_fuse_many(vectorized):
+    responses = {
+        "title": Response(
+            results=[Result(product={"product_id": "1"}, score=10), Result(product={"product_id": "2"}, score=5)],
+            total_hits=2,
+        ),
+        "bullet_point": Response(results=[Result(product={"product_id": "2"}, score=1)], total_hits=1),
+        "dense": Response(results=[Result(product={"product_id": "3"}, score=0.8)], total_hits=1),
+    }
+    rank_fusion = RankFusion(score_transformation_method={"title": "min_max", "dense": "rrf"}, vectorized=vectorized)
+    response = fuse_many("query", responses, rank_fusion, size=3, weights={"bullet_point": 0.5, "dense": 60})
+    # title: 1 -> 1.0, 2 -> 0.5 / bullet_point: 2 -> 0.5 / dense: 3 -> 60 / 61
+    assert [result.product["product_id"] for result in response.results] == ["2", "1", "3"]
+    assert np.allclose([result.score for result in response.results], [1.0, 1.0, 60 / 61])
+
+
+def test_fuse_many_append():
+    responses = {
+        name: Response(results=[Result(product={"product_id": name}, score=0)], total_hits=1) for name in "abc"
+    }
+    response = fuse_many("query", responses, RankFusion(combination_method="append"), size=2)
+    assert [result.product["product_id"] for result in response.results] == ["a", "b"]
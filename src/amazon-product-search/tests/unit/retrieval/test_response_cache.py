@@ -0,0 +1,36 @@
+from amazon_product_search.retrieval.response import Response, Result
+from amazon_product_search.retrieval.response_cache import ResponseCache
+
+
+def test_make_key():
+    cache = ResponseCache()
+    key = cache.make_key("products", query="query", size=20, fields=["product_title"])
+    assert key == cache.make_key("products", fields=["product_title"], size=20, query="query")
+    assert key != cache.make_key("products", query="query", size=10, fields=["product_title"])
+    assert key != cache.make_key("other_products", query="query", size=20, fields=["product_title"])
+
+
+def test_get_returns_copy():
+    cache = ResponseCache()
+    key = cache.make_key("products", query="query")
+    cache.set(key, Response(results=[Result(product={"product_id": "1"}, score=1.0)], total_hits=1))
+
+    response = cache.get(key)
+    response.results.clear()
+    assert cache.get(key) == Response(results=[Result(product={"product_id": "1"}, score=1.0)], total_hits=1)
+
+
+def test_invalidate():
+    cache = ResponseCache()
+    response = Response(results=[], total_hits=0)
+    products_key = cache.make_key("products", query="query")
+    other_key = cache.make_key("other_products", query="query")
+    cache.set(products_key, response)
+    cache.set(other_key, response)
+
+    cache.invalidate("products")
+    assert cache.get(cache.make_key("products", query="query")) is None
+    assert cache.get(cache.make_key("other_products", query="query")) == response
+
+    cache.invalidate()
+    assert cache.get(other_key) is None
@@ -1,4 +1,11 @@
-from amazon_product_search.retrieval.retriever import split_fields
+import time
+from unittest.mock import MagicMock
+
+from elasticsearch import ConnectionTimeout
+
+from amazon_product_search.retrieval.response import Response, Result
+from amazon_product_search.retrieval.response_cache import ResponseCache
+from amazon_product_search.retrieval.retriever import Retriever, split_fields
 
 
 def test_split_fields():
@@ -6,3 +13,118 @@ def test_split_fields():
     lexical_fields, semantic_fields = split_fields(fields)
     assert lexical_fields == ["title", "description"]
     assert semantic_fields == ["vector"]
+
+
+def _build_retriever(semantic_latency: float, response_cache: ResponseCache | None = None) -> Retriever:
+    def search(index_name, query, knn_query, size, explain, request_timeout=None):
+        if knn_query:
+            time.sleep(semantic_latency)
+            return Response(results=[Result(product={"product_id": "2"}, score=1.0)], total_hits=1)
+        return Response(results=[Result(product={"product_id": "1"}, score=1.0)], total_hits=1)
+
+    def search_many(requests):
+        return [
+            search(request.index_name, request.query, request.knn_query, request.size, request.explain)
+            for request in requests
+        ]
+
+    es_client = MagicMock()
+    es_client.search.side_effect = search
+    es_client.search_many.side_effect = search_many
+    query_builder = MagicMock()
+    query_builder.build_lexical_search_query.return_value = {"match_all": {}}
+    query_builder.build_semantic_search_query.return_value = {"field": "product_vector"}
+    query_builder.encode_many.side_effect = lambda queries: [[0.0] for _ in queries]
+    return Retriever(locale="us", es_client=es_client, query_builder=query_builder, response_cache=response_cache)
+
+
+def test_search_concurrently():
+    retriever = _build_retriever(semantic_latency=0)
+    sequential_response = retriever.search("products", "query", fields=["product_title", "product_vector"])
+    concurrent_response = retriever.search(
+        "products", "query", fields=["product_title", "product_vector"], concurrent=True
+    )
+    assert concurrent_response == sequential_response
+    assert {result.product["product_id"] for result in concurrent_response.results} == {"1", "2"}
+
+
+def test_search_concurrently_with_timeout():
+    retriever = _build_retriever(semantic_latency=1)
+    response = retriever.search(
+        "products",
+        "query",
+        fields=["product_title", "product_vector"],
+        concurrent=True,
+        timeouts={"semantic": 0.1},
+    )
+    assert [result.product["product_id"] for result in response.results] == ["1"]
+    retriever.close()
+
+
+def test_search_concurrently_passes_timeouts_to_requests():
+    retriever = _build_retriever(semantic_latency=0)
+    retriever.search(
+        "products", "query", fields=["product_title", "product_vector"], concurrent=True, timeouts={"semantic": 1}
+    )
+    request_timeouts = {
+        "semantic" if call.kwargs["knn_query"] else "lexical": call.kwargs["request_timeout"]
+        for call in retriever.es_client.search.call_args_list
+    }
+    assert request_timeouts["lexical"] is None
+    assert 0 < request_timeouts["semantic"] <= 1
+    retriever.close()
+
+
+def test_search_concurrently_with_request_timeout():
+    retriever = _build_retriever(semantic_latency=0)
+    search = retriever.es_client.search.side_effect
+
+    def search_with_timeout(index_name, query, knn_query, size, explain, request_timeout=None):
+        if request_timeout is not None:
+            raise ConnectionTimeout("timed out")
+        return search(index_name, query, knn_query, size, explain)
+
+    retriever.es_client.search.side_effect = search_with_timeout
+    response = retriever.search(
+        "products", "query", fields=["product_title", "product_vector"], concurrent=True, timeouts={"semantic": 1}
+    )
+    assert [result.product["product_id"] for result in response.results] == ["1"]
+    retriever.close()
+
+
+def test_search_with_response_cache():
+    retriever = _build_retriever(semantic_latency=0, response_cache=ResponseCache())
+    fields = ["product_title", "product_vector"]
+    response = retriever.search("products", "query", fields=fields)
+    assert retriever.es_client.search.call_count == 2
+
+    # The normalized query is the same, so the cached response is returned.
+    assert retriever.search("products", "QUERY ", fields=fields) == response
+    assert retriever.es_client.search.call_count == 2
+
+    retriever.search("products", "query", fields=fields, size=10)
+    assert retriever.es_client.search.call_count == 4
+
+    retriever.response_cache.invalidate("products")
+    retriever.search("products", "query", fields=fields)
+    assert retriever.es_client.search.call_count == 6
+
+
+def test_search_with_response_cache_does_not_cache_timed_out_response():
+    retriever = _build_retriever(semantic_latency=0.5, response_cache=ResponseCache())
+    kwargs = {"fields": ["product_title", "product_vector"], "concurrent": True, "timeouts": {"semantic": 0.1}}
+    retriever.search("products", "query", **kwargs)
+    retriever.search("products", "query", **kwargs)
+    assert retriever.es_client.search.call_count == 4
+    retriever.close()
+
+
+def test_search_many():
+    retriever = _build_retriever(semantic_latency=0)
+    queries = ["query", "", "another query"]
+    fields = ["product_title", "product_vector"]
+    responses = list(retriever.search_many("products", queries, fields=fields, batch_size=2))
+    expected = [retriever.search("products", query, fields=fields) for query in queries]
+    assert responses == expected
+    assert retriever.query_builder.encode_many.call_count == 2
+    assert retriever.es_client.search_many.call_count == 2
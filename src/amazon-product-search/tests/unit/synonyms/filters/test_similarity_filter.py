@@ -1,3 +1,9 @@
+from unittest.mock import patch
+
+import numpy as np
+import polars as pl
+import pytest
+
 from amazon_product_search.synonyms.filters.similarity_filter import SimilarityFilter
 
 
@@ -9,3 +15,44 @@ def test_calculate_score():
     scores = filter.calculate_score(left, right)
 
     assert len(scores) == 2
+
+
+def _fake_encode(texts: list[str], batch_size: int = 32) -> np.ndarray:
+    return np.array([[len(text), text.count("a"), 1.0] for text in texts], dtype=np.float32)
+
+
+@patch("amazon_product_search.synonyms.filters.similarity_filter.SBERTEncoder")
+def test_calculate_scores(mock_encoder_cls):
+    mock_encoder_cls.return_value.encode.side_effect = _fake_encode
+    filter = SimilarityFilter(deduplicate=True, encode_batch_size=2)
+    left = pl.Series(["a", "bb", "a", "ccc"])
+    right = pl.Series(["bb", "aaa", "aaa", "a"])
+
+    scores = filter.calculate_scores(left, right)
+
+    assert scores == pytest.approx(filter.calculate_score(left.to_list(), right.to_list()), abs=1e-6)
+    # Each of the 4 unique terms is encoded once, in batches of 2 sorted by length.
+    encoded_batches = [call.args[0] for call in mock_encoder_cls.return_value.encode.call_args_list[:2]]
+    assert encoded_batches == [["a", "bb"], ["aaa", "ccc"]]
+
+
+@patch("amazon_product_search.synonyms.filters.similarity_filter.SBERTEncoder")
+def test_apply_with_deduplicate(mock_encoder_cls):
+    mock_encoder_cls.return_value.encode.side_effect = _fake_encode
+    synonyms_df = pl.DataFrame({"query": ["a", "bb", "a"], "title": ["aa", "aaa", "bbbbbbbbbb"]})
+
+    expected = SimilarityFilter().apply(synonyms_df, threshold=0.9)
+    actual = SimilarityFilter(deduplicate=True).apply(synonyms_df, threshold=0.9)
+
+    assert actual["query"].to_list() == expected["query"].to_list()
+    assert actual["similarity"].to_numpy() == pytest.approx(expected["similarity"].to_numpy(), abs=1e-6)
+
+
+@patch("amazon_product_search.synonyms.filters.similarity_filter.SBERTEncoder")
+def test_apply_with_deduplicate_and_no_synonyms(mock_encoder_cls):
+    filter = SimilarityFilter(deduplicate=True)
+    synonyms_df = pl.DataFrame({"query": [], "title": []}, schema={"query": pl.String, "title": pl.String})
+
+    assert filter.calculate_scores(synonyms_df["query"], synonyms_df["title"]).shape == (0,)
+    assert filter.apply(synonyms_df).columns == ["query", "title", "similarity"]
+    mock_encoder_cls.return_value.encode.assert_not_called()
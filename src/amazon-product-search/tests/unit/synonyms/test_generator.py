@@ -1,11 +1,18 @@
+from collections import Counter
+from math import log
+
 import polars as pl
 import pytest
 
-from amazon_product_search.synonyms.generator import (
+from amazon_product_search.synonyms.cooccurrence import (
+    count_words,
+    count_words_parallel,
     generate_ngrams,
     generate_ngrams_all,
-    preprocess_query_title_pairs,
+    pair_counter_to_df,
 )
+from amazon_product_search.synonyms.filters import utils
+from amazon_product_search.synonyms.generator import apply_fast_filters, preprocess_query_title_pairs
 
 
 def test_preprocess_query_title_pairs():
@@ -40,3 +47,64 @@ def test_generate_ngrams_all():
     tokens = ["ab", "cd", "ef", "gh"]
     ngrams = generate_ngrams_all(tokens, 3)
     assert ngrams == ["ab", "cd", "ef", "gh", "ab cd", "cd ef", "ef gh", "ab cd ef", "cd ef gh"]
+
+
+@pytest.mark.parametrize("use_spill_dir", [False, True])
+def test_count_words_parallel(tmp_path, use_spill_dir):
+    pairs = [
+        ["red shoes", "red running shoes"],
+        ["", "empty query"],
+        ["blue shirt", "blue cotton shirt"],
+        ["red shirt", "red cotton shirt"],
+    ]
+    expected_word_counter, expected_pair_counter = count_words("us", pairs)
+
+    word_counter, pair_df = count_words_parallel(
+        "us",
+        pairs,
+        num_workers=2,
+        shard_size=1,
+        spill_dir=str(tmp_path) if use_spill_dir else None,
+    )
+    assert word_counter == expected_word_counter
+    assert pair_df.columns == ["query", "title", "cooccurrence"]
+    assert {(query, title): count for query, title, count in pair_df.iter_rows()} == expected_pair_counter
+    assert len(list(tmp_path.glob("pair_counts_*.parquet"))) == (4 if use_spill_dir else 0)
+
+
+def test_apply_fast_filters():
+    word_counter = Counter({"tv": 40, "television": 30, "red": 100, "red tv": 10, "tv red": 10, "42": 20, "cap": 25})
+    pair_counter = Counter(
+        {
+            ("tv", "television"): 20,
+            ("tv", "cap"): 2,
+            ("red tv", "tv red"): 10,  # identical sets
+            ("red", "red tv"): 10,  # contained
+            ("tv", "42"): 10,  # number
+            ("television", "cap"): 1,  # low cooccurrence
+            ("red", "cap"): 5,
+        }
+    )
+
+    # The per-pair computation that the vectorized one is expected to be equivalent to.
+    log_total_word_count = log(sum(word_counter.values()))
+    expected_rows = []
+    for (query, title), pair_count in pair_counter.items():
+        if (
+            utils.are_two_sets_identical(query, title)
+            or utils.is_either_contained_in_other(query, title)
+            or utils.is_either_number(query, title)
+            or pair_count < 2
+        ):
+            continue
+        pmi = log_total_word_count + log(pair_count) - log(word_counter[query]) - log(word_counter[title])
+        npmi = pmi / (log_total_word_count - log(pair_count))
+        if npmi < -0.5:
+            continue
+        expected_rows.append((query, title, word_counter[query], word_counter[title], pair_count, pytest.approx(npmi)))
+
+    for pair_counts in [pair_counter, pair_counter_to_df(pair_counter)]:
+        candidates_df = apply_fast_filters(word_counter, pair_counts, min_cooccurrence=2, min_npmi=-0.5)
+        assert candidates_df.columns == ["query", "title", "query_count", "title_count", "cooccurrence", "npmi"]
+        assert sorted(candidates_df.iter_rows()) == sorted(expected_rows, key=lambda row: row[:5])
+    assert [row[:2] for row in expected_rows] == [("tv", "television"), ("tv", "cap"), ("red", "cap")]
@@ -1,6 +1,10 @@
+from itertools import islice
+
+import polars as pl
 import pytest
 
-from amazon_product_search.synonyms.synonym_dict import SynonymDict, expand_synonyms
+from amazon_product_search.cache import get_method_cache
+from amazon_product_search.synonyms.synonym_dict import SynonymDict, expand_synonyms, iter_expansions
 
 
 def test_expand_synonyms():
@@ -18,6 +22,34 @@ def test_expand_synonyms():
     ]
 
 
+def test_iter_expansions():
+    token_chain = [("a", []), ("b", [("b'", 1.0), ("b''", 0.5)]), ("c", [("c'", 1.0)])]
+    expanded_tokens = list(iter_expansions(token_chain))
+    # Ties are broken in the same order as `expand_synonyms`.
+    assert [" ".join([token for token, _ in token_scores]) for token_scores in expanded_tokens] == [
+        "a b c",
+        "a b c'",
+        "a b' c",
+        "a b' c'",
+        "a b'' c",
+        "a b'' c'",
+    ]
+    assert expanded_tokens[1] == [("a", None), ("b", None), ("c'", 1.0)]
+
+
+def test_iter_expansions_best_first():
+    token_chain = [("a", [("a'", 0.2), ("a''", 0.5)]), ("b", [("b'", 0.4)])]
+    expanded_queries = [" ".join([token for token, _ in token_scores]) for token_scores in iter_expansions(token_chain)]
+    assert expanded_queries == ["a b", "a'' b", "a b'", "a' b", "a'' b'", "a' b'"]
+
+
+def test_iter_expansions_is_lazy():
+    token_chain = [(str(i), [(f"{i}'", 0.5), (f"{i}''", 0.1)]) for i in range(30)]
+    expanded_tokens = list(islice(iter_expansions(token_chain), 10))
+    assert len(expanded_tokens) == 10
+    assert all(score in (None, 0.5) for token_scores in expanded_tokens for _, score in token_scores)
+
+
 @pytest.mark.parametrize(
     ("query", "expected"),
     [
@@ -28,6 +60,7 @@ def test_expand_synonyms():
         ("b c", [("b", [("b'", 1.0)]), ("c", [])]),
         ("c", [("c", [])]),
         ("c d", [("c", []), ("d", [])]),
+        ("a b c", [("a b", [("a b'", 1.0)]), ("c", [])]),
     ],
 )
 def test_look_up(query, expected):
@@ -36,7 +69,76 @@ def test_look_up(query, expected):
         "a": [("a'", 1.0), ("a''", 0.5)],
         "b": [("b'", 1.0)],
         "a b": [("a b'", 1.0)],
+        "a b c": [("abc", 0.5)],
     }
 
     actual = synonym_dict.look_up(query.split())
     assert actual == expected
+
+
+def test_look_up_is_cached():
+    synonym_dict = SynonymDict(locale="us")
+    synonym_dict._entry_dict = {"a": [("a'", 1.0)]}
+    for _ in range(2):
+        assert synonym_dict.look_up(["a", "b"]) == [("a", [("a'", 1.0)]), ("b", [])]
+    assert get_method_cache(synonym_dict, "_look_up").stats()["hits"] == 1
+
+
+def test_look_up_with_ngrams():
+    synonym_dict = SynonymDict(locale="us")
+    synonym_dict._entry_dict = {"a": [("a'", 1.0)], "a b c": [("abc", 0.5)]}
+    expected = [("a", [("a'", 1.0)]), ("b", []), ("c", [])]
+    assert synonym_dict.look_up(["a", "b", "c"]) == expected
+    assert synonym_dict.look_up(["a", "b", "c"], ngrams=2) == expected
+    assert synonym_dict.look_up(["a", "b", "c", "d"], ngrams=None) == [("a b c", [("abc", 0.5)]), ("d", [])]
+
+
+def test_load_synonym_trie(tmp_path):
+    (tmp_path / "includes").mkdir()
+    pl.DataFrame(
+        {
+            "query": ["a", "a", "a b"],
+            "title": ["a'", "a''", "a b'"],
+            "npmi": [0.5, 1.0, 0.5],
+            "similarity": [0.5, 1.0, 1.0],
+        }
+    ).write_csv(tmp_path / "includes" / "synonyms.csv")
+
+    synonym_dict = SynonymDict(locale="us", synonym_filename="synonyms.csv", data_dir=str(tmp_path))
+    # ("a", "a''") is excluded because its score 1.0 exceeds the threshold.
+    assert synonym_dict._entry_dict == {"a": [("a'", 0.25)], "a b": [("a b'", 0.5)]}
+    # The compiled trie is saved outside `includes`, which is tracked by Git.
+    assert [path.name for path in (tmp_path / "includes").iterdir()] == ["synonyms.csv"]
+    first_files = {path.name for path in (tmp_path / "cache").glob("*.npy")}
+    assert len(first_files) == 8
+
+    # The compiled trie is reused.
+    another_synonym_dict = SynonymDict(locale="us", synonym_filename="synonyms.csv", data_dir=str(tmp_path))
+    assert another_synonym_dict.look_up(["a", "b"]) == [("a b", [("a b'", 0.5)])]
+    assert {path.name for path in (tmp_path / "cache").glob("*.npy")} == first_files
+
+    # A changed synonym file is compiled again into new files, and the old files are removed.
+    pl.DataFrame({"query": ["c"], "title": ["c'"], "npmi": [0.5], "similarity": [0.5]}).write_csv(
+        tmp_path / "includes" / "synonyms.csv"
+    )
+    another_synonym_dict = SynonymDict(locale="us", synonym_filename="synonyms.csv", data_dir=str(tmp_path))
+    assert another_synonym_dict._entry_dict == {"c": [("c'", 0.25)]}
+    assert synonym_dict.look_up(["a", "b"]) == [("a b", [("a b'", 0.5)])]
+    second_files = {path.name for path in (tmp_path / "cache").glob("*.npy")}
+    assert len(second_files) == 8
+    assert not first_files & second_files
+    assert not list((tmp_path / "cache").glob("*.tmp-*"))
+
+
+def test_load_synonym_trie_without_writable_cache_dir(tmp_path):
+    (tmp_path / "includes").mkdir()
+    pl.DataFrame({"query": ["a"], "title": ["a'"], "npmi": [0.5], "similarity": [0.5]}).write_csv(
+        tmp_path / "includes" / "synonyms.csv"
+    )
+    # A regular file cannot be used as a directory.
+    (tmp_path / "cache").touch()
+
+    synonym_dict = SynonymDict(
+        locale="us", synonym_filename="synonyms.csv", data_dir=str(tmp_path), cache_dir=str(tmp_path / "cache")
+    )
+    assert synonym_dict._entry_dict == {"a": [("a'", 0.25)]}
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from amazon_product_search.synonyms.synonym_trie import SynonymTrie
+
+ENTRY_DICT = {
+    "a": [("a'", 1.0), ("a''", 0.5)],
+    "a b": [("a b'", 1.0)],
+    "a b c d": [("abcd", 0.25)],
+    "b": [("b'", 0.125)],
+}
+
+
+@pytest.mark.parametrize(
+    ("tokens", "start", "max_length", "expected"),
+    [
+        ([], 0, None, None),
+        (["a"], 0, None, (1, [("a'", 1.0), ("a''", 0.5)])),
+        (["a", "b"], 0, None, (2, [("a b'", 1.0)])),
+        # "a b c" is not an entry, so the longest match is "a b".
+        (["a", "b", "c"], 0, None, (2, [("a b'", 1.0)])),
+        (["a", "b", "c", "d"], 0, None, (4, [("abcd", 0.25)])),
+        (["a", "b", "c", "d"], 0, 3, (2, [("a b'", 1.0)])),
+        (["a", "b", "c", "d"], 1, None, (2, [("b'", 0.125)])),
+        (["c", "d"], 0, None, None),
+        (["unknown"], 0, None, None),
+    ],
+)
+def test_longest_match(tokens, start, max_length, expected):
+    trie = SynonymTrie.from_entry_dict(ENTRY_DICT)
+    assert trie.longest_match(tokens, start, max_length) == expected
+
+
+def test_to_entry_dict():
+    trie = SynonymTrie.from_entry_dict(ENTRY_DICT)
+    assert len(trie) == 4
+    assert trie.to_entry_dict() == ENTRY_DICT
+    assert SynonymTrie.from_entry_dict({}).to_entry_dict() == {}
+
+
+def test_save_and_load(tmp_path):
+    prefix = str(tmp_path / "synonyms")
+    assert not SynonymTrie.exists(prefix)
+    SynonymTrie.from_entry_dict(ENTRY_DICT).save(prefix)
+    assert SynonymTrie.exists(prefix)
+
+    trie = SynonymTrie.load(prefix)
+    assert isinstance(trie.edge_tokens, np.memmap)
+    assert trie.to_entry_dict() == ENTRY_DICT
+    assert trie.longest_match(["a", "b"], 0) == (2, [("a b'", 1.0)])
@@ -1,4 +1,9 @@
-from amazon_product_search.cache import LRUCache, weak_lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import numpy as np
+
+from amazon_product_search.cache import LRUCache, get_method_cache, lru_cache_method, weak_lru_cache
 
 
 def test_lru_cache():
@@ -11,6 +16,55 @@ def test_lru_cache():
     assert cache.get("key") is None
 
 
+def test_lru_cache_moves_accessed_keys_to_end():
+    cache = LRUCache[str, str](max_size=2)
+    cache.set("key1", "value1")
+    cache.set("key2", "value2")
+    assert cache.get("key1") == "value1"
+    cache.set("key3", "value3")
+    assert "key1" in cache
+    assert "key2" not in cache
+    assert cache.stats() == {"hits": 1, "misses": 0, "evictions": 1, "hit_rate": 1.0, "size": 2, "bytes": 0}
+
+
+def test_lru_cache_with_max_bytes():
+    cache = LRUCache[str, np.ndarray](max_size=None, max_bytes=16)
+    cache.set("key1", np.zeros(2))
+    cache.set("key2", np.zeros(1))
+    # 16 + 8 bytes exceed the limit, so key1 is evicted.
+    assert "key1" not in cache
+    assert cache.num_bytes == 8
+    cache.set("key2", np.zeros(2))
+    assert cache.num_bytes == 16
+    assert cache.delete("key2")
+    assert cache.num_bytes == 0
+
+
+def test_lru_cache_with_ttl():
+    cache = LRUCache[str, str](ttl=10)
+    with patch("amazon_product_search.cache.time.monotonic", return_value=100):
+        cache.set("key", "value")
+    with patch("amazon_product_search.cache.time.monotonic", return_value=109):
+        assert cache.get("key") == "value"
+    with patch("amazon_product_search.cache.time.monotonic", return_value=110):
+        assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_lru_cache_is_thread_safe():
+    cache = LRUCache[int, int](max_size=10)
+
+    def f(i: int) -> None:
+        cache.set(i, i)
+        cache.get(i - 1)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(f, range(1000)))
+    assert len(cache) == 10
+    assert cache.evictions == 990
+    assert cache.hits + cache.misses == 1000
+
+
 class Counter:
     def __init__(self):
         self.n = 0
@@ -32,3 +86,29 @@ def test_instance_cache():
     ]:
         counter.f(i)
         assert counter.n == expected
+
+
+class LRUCounter:
+    def __init__(self):
+        self.n = 0
+
+    @lru_cache_method(max_size=1)
+    def f(self, i: int, j: int = 0):
+        """n will be incremented only when (i, j) is not in cache."""
+        self.n += 1
+
+
+def test_lru_cache_method():
+    counter = LRUCounter()
+    for i, j, expected in [
+        (1, 0, 1),
+        (1, 0, 1),
+        (2, 0, 2),
+        (2, 1, 3),
+        (2, 1, 3),
+    ]:
+        counter.f(i, j=j)
+        assert counter.n == expected
+    # `None` results are cached as well.
+    assert get_method_cache(counter, "f").stats()["hits"] == 2
+    assert get_method_cache(LRUCounter(), "f") is None
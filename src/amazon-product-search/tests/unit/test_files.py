@@ -0,0 +1,47 @@
+import threading
+import time
+
+import pytest
+
+from amazon_product_search.files import atomic_write, lock_file
+
+
+def test_atomic_write(tmp_path):
+    filepath = str(tmp_path / "file.txt")
+    with atomic_write(filepath) as tmp_filepath:
+        with open(tmp_filepath, "w") as file:
+            file.write("new")
+        assert not (tmp_path / "file.txt").exists()
+    assert (tmp_path / "file.txt").read_text() == "new"
+
+    def write_partially() -> None:
+        with atomic_write(filepath) as tmp_filepath:
+            with open(tmp_filepath, "w") as file:
+                file.write("partial")
+            raise RuntimeError()
+
+    with pytest.raises(RuntimeError):
+        write_partially()
+    assert (tmp_path / "file.txt").read_text() == "new"
+    assert [path.name for path in tmp_path.iterdir()] == ["file.txt"]
+
+
+def test_lock_file(tmp_path):
+    filepath = str(tmp_path / "file.lock")
+    events = []
+
+    def hold_lock(name: str) -> None:
+        with lock_file(filepath):
+            events.append(f"{name} acquired")
+            time.sleep(0.1)
+            events.append(f"{name} released")
+
+    threads = [threading.Thread(target=hold_lock, args=(name,)) for name in ["a", "b"]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # The critical sections do not overlap.
+    assert [event.split()[1] for event in events] == ["acquired", "released", "acquired", "released"]
+    assert events[0].split()[0] == events[1].split()[0]
@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Generous enough for a loaded CI machine; importing torch alone takes several seconds.
+IMPORT_TIME_BUDGET = 2.0
+
+HEAVY_MODULES = ["torch", "transformers", "sentence_transformers", "dense_retrieval.encoders", "google.cloud.bigquery"]
+
+SCRIPT = """
+import json
+import sys
+import time
+
+start = time.perf_counter()
+{statements}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def run_in_fresh_interpreter(statements: str) -> tuple[float, set[str]]:
+    env = os.environ | {"PYTHONPATH": os.pathsep.join(path for path in sys.path if path)}
+    completed = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(statements=statements)],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    output = json.loads(completed.stdout.strip().splitlines()[-1])
+    return output["elapsed"], set(output["modules"])
+
+
+@pytest.mark.parametrize(
+    "statements",
+    [
+        "import amazon_product_search.es.query_builder",
+        "import amazon_product_search.vespa.query_builder",
+        "import amazon_product_search.reranking.reranker",
+        "\n".join(
+            [
+                "from amazon_product_search.es.query_builder import QueryBuilder",
+                "QueryBuilder(locale='us').build_lexical_search_query('query', fields=['product_title'])",
+            ]
+        ),
+    ],
+)
+def test_lexical_path_imports_within_budget(statements: str):
+    elapsed, modules = run_in_fresh_interpreter(statements)
+
+    assert not modules & set(HEAVY_MODULES)
+    assert elapsed < IMPORT_TIME_BUDGET
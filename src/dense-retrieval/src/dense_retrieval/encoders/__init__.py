@@ -1,8 +1,27 @@
-from .bi_encoder import BiEncoder, ProductEncoder, QueryEncoder
-from .sbert_encoder import SBERTEncoder
+import importlib
+from typing import Any
+
+# Encoders are imported on first access, so that using one of them (e.g., `ONNXEncoder`) does not import
+# the dependencies of the others (e.g., torch).
+_NAME_TO_MODULE = {
+    "BiEncoder": "bi_encoder",
+    "ONNXEncoder": "onnx_encoder",
+    "PoolingMode": "modules.pooler",
+    "ProductEncoder": "bi_encoder",
+    "QueryEncoder": "bi_encoder",
+    "SBERTEncoder": "sbert_encoder",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _NAME_TO_MODULE:
+        return getattr(importlib.import_module(f"{__name__}.{_NAME_TO_MODULE[name]}"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     "BiEncoder",
+    "ONNXEncoder",
     "PoolingMode",
     "ProductEncoder",
     "QueryEncoder",
@@ -0,0 +1,90 @@
+import os
+from typing import cast
+
+import numpy as np
+from more_itertools import chunked
+from onnxruntime import GraphOptimizationLevel, InferenceSession, SessionOptions
+from tokenizers import Tokenizer
+
+
+class ONNXEncoder:
+    """An encoder running a mean pooling model exported to ONNX (e.g., by `tasks/model_tasks.py`) on ONNX Runtime.
+
+    It has the same `encode` interface as `SBERTEncoder` but imports neither torch nor transformers,
+    which makes it suitable for CPU-only serving. Texts are tokenized by a fast tokenizer of `tokenizers`,
+    sorted by length and padded only to the longest text in each batch. If the model was exported with a fixed
+    sequence length, batches are padded to that length instead.
+
+    Args:
+        model_filepath (str): The ONNX model file, taking `input_ids` and `attention_mask` and returning `output`.
+        tokenizer_name_or_path (str): A `tokenizer.json` file or the name of a Hugging Face model that has one.
+        max_length (int, optional): The maximum number of tokens per text. Defaults to 512.
+        intra_op_num_threads (int, optional): Threads used within an operator. Defaults to 0 (ONNX Runtime decides).
+        inter_op_num_threads (int, optional): Threads used across operators. Defaults to 0 (ONNX Runtime decides).
+    """
+
+    def __init__(
+        self,
+        model_filepath: str,
+        tokenizer_name_or_path: str,
+        max_length: int = 512,
+        intra_op_num_threads: int = 0,
+        inter_op_num_threads: int = 0,
+    ) -> None:
+        session_options = SessionOptions()
+        session_options.intra_op_num_threads = intra_op_num_threads
+        session_options.inter_op_num_threads = inter_op_num_threads
+        session_options.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = InferenceSession(
+            model_filepath, sess_options=session_options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        sequence_length = self.session.get_inputs()[0].shape[1]
+        self.fixed_length: int | None = sequence_length if isinstance(sequence_length, int) else None
+        self.max_length = min(max_length, self.fixed_length) if self.fixed_length else max_length
+
+        if os.path.isfile(tokenizer_name_or_path):
+            self.tokenizer = Tokenizer.from_file(tokenizer_name_or_path)
+        else:
+            self.tokenizer = Tokenizer.from_pretrained(tokenizer_name_or_path)
+        self.tokenizer.no_padding()
+        self.tokenizer.enable_truncation(max_length=self.max_length)
+
+    def _run(self, ids_list: list[list[int]]) -> np.ndarray:
+        length = self.fixed_length or max(len(ids) for ids in ids_list)
+        # Padded positions are masked out by the attention mask and pooling, so the padding ID does not matter.
+        input_ids = np.zeros((len(ids_list), length), dtype=np.int64)
+        attention_mask = np.zeros((len(ids_list), length), dtype=np.int64)
+        for i, ids in enumerate(ids_list):
+            input_ids[i, : len(ids)] = ids
+            attention_mask[i, : len(ids)] = 1
+        input_feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            input_feed["token_type_ids"] = np.zeros_like(input_ids)
+        return self.session.run(["output"], input_feed)[0]
+
+    def encode(self, texts: str | list[str], batch_size: int = 32) -> np.ndarray:
+        """Encode a text or a list of texts.
+
+        Args:
+            texts (str | list[str]): A text or texts to encode.
+            batch_size (int, optional): The number of texts per forward pass. Defaults to 32.
+
+        Returns:
+            np.ndarray: A float32 vector of shape (dim,) for a text, or a matrix of shape (len(texts), dim).
+        """
+        if isinstance(texts, str):
+            return self.encode([texts], batch_size=batch_size)[0]
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        ids_list = [encoding.ids for encoding in self.tokenizer.encode_batch(texts)]
+        order = sorted(range(len(ids_list)), key=lambda i: len(ids_list[i]))
+        embs: np.ndarray | None = None
+        for batch_indices in chunked(order, n=batch_size):
+            batch_embs = self._run([ids_list[i] for i in batch_indices])
+            if embs is None:
+                embs = np.empty((len(texts), batch_embs.shape[1]), dtype=np.float32)
+            embs[batch_indices] = batch_embs
+        return cast(np.ndarray, embs)
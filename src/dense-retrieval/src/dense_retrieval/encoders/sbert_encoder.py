@@ -14,9 +14,10 @@ class SBERTEncoder:
         )
         self.sentence_transformer = SentenceTransformer(modules=[transformer, pooling])
 
-    def encode(self, texts: list[str]) -> Tensor:
+    def encode(self, texts: list[str], batch_size: int = 32) -> Tensor:
         return self.sentence_transformer.encode(
             texts,
+            batch_size=batch_size,
             show_progress_bar=False,
             convert_to_tensor=False,
         )
@@ -1,36 +1,39 @@
 import logging
 import os
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import apache_beam as beam
-import polars as pl
 from apache_beam.io.gcp.bigquery import WriteToBigQuery
 from apache_beam.options.pipeline_options import GoogleCloudOptions
 from apache_beam.transforms.ptransform import PTransform
 from apache_beam.transforms.util import BatchElements
 from apache_beam.utils.shared import Shared
 
-from amazon_product_search import source
 from amazon_product_search.constants import DATA_DIR, DATASET_ID, HF, PROJECT_ID
 from amazon_product_search.source import Locale
-from indexing.io.elasticsearch_io import WriteToElasticsearch
-from indexing.io.vespa_io import WriteToVespa
+from indexing.io.elasticsearch_io import DeleteFromElasticsearch, WriteToElasticsearch
+from indexing.io.parquet_io import ReadParquetRowGroups
+from indexing.io.vespa_io import DeleteFromVespa, WriteToVespa
 from indexing.options import IndexerOptions
 from indexing.transforms.add_image_url import AddImageUrlFn
 from indexing.transforms.analyze_doc import AnalyzeDocFn
 from indexing.transforms.encode_product import EncodeProduct
 from indexing.transforms.extract_keywords import (
+    AddKeywordsFn,
     ExtractKeywordsFn,
 )
 from indexing.transforms.filters import is_indexable
+from indexing.transforms.fingerprint import DiffFingerprints, WriteFingerprints
 
 
-def get_input_source(data_dir: str, locale: Locale, nrows: int = -1) -> PTransform:
-    products_df = source.load_products(locale, nrows, data_dir)
-    products_df = products_df.with_columns(pl.col("*").fill_null(pl.lit("")))
-    products = products_df.to_dicts()
-    logging.info(f"{len(products)} products are going to be indexed")
-    return beam.Create(products)
+def get_input_source(data_dir: str, locale: Locale, nrows: int = -1, columns: Optional[List[str]] = None) -> PTransform:
+    """Read products by row group on workers instead of loading the whole catalog on the launcher.
+
+    Nulls are replaced with "" so that downstream transforms can treat every field as a string.
+    """
+    filepath = f"{data_dir}/products_{locale}.parquet"
+    logging.info(f"Products are going to be read from {filepath}")
+    return ReadParquetRowGroups(filepath, columns=columns, nrows=nrows)
 
 
 def join_branches(kv: Tuple[str, Dict[str, Any]]) -> Dict[str, Any]:
@@ -46,6 +49,76 @@ def join_branches(kv: Tuple[str, Dict[str, Any]]) -> Dict[str, Any]:
     return product
 
 
+def join_enriched_branches(
+    products: beam.PCollection,
+    extract_keywords: bool,
+    encode_product: Optional[EncodeProduct],
+) -> beam.PCollection:
+    """Enrich products in separate branches and join them with the products by `CoGroupByKey`."""
+    branches = {}
+    if extract_keywords:
+        branches["extracted_keywords"] = products | "Extract keywords" >> beam.ParDo(ExtractKeywordsFn())
+    if encode_product:
+        branches["product_vector"] = products | "Encode products" >> encode_product
+    if branches:
+        branches["product"] = products | beam.WithKeys(lambda product: product["product_id"])
+        products = branches | beam.CoGroupByKey() | beam.Map(join_branches)
+    return products
+
+
+def enrich_products(
+    products: beam.PCollection,
+    extract_keywords: bool,
+    encode_product: Optional[EncodeProduct],
+) -> beam.PCollection:
+    """Enrich products step by step on the same stream.
+
+    Each step emits the products with fields added, so the steps are fused into a single stage
+    and no product is shuffled, unlike `join_enriched_branches`. `encode_product` must be created with `enrich=True`.
+    """
+    if extract_keywords:
+        products |= "Add keywords" >> beam.ParDo(AddKeywordsFn())
+    if encode_product:
+        products |= "Add product vectors" >> encode_product
+    return products
+
+
+def build_encode_product(options: IndexerOptions, hf_model_name: str) -> Optional[EncodeProduct]:
+    if not options.encode_text:
+        return None
+    return EncodeProduct(
+        Shared(),
+        hf_model_name,
+        batch_size=8,
+        use_triton=options.use_triton,
+        enrich=options.fuse_enrichment,
+        token_budget=options.encode_token_budget if options.encode_token_budget > 0 else None,
+        triton_host=options.triton_host,
+        max_in_flight=options.triton_max_in_flight,
+        client_timeout=options.triton_client_timeout,
+    )
+
+
+def delete_products(product_ids: beam.PCollection, options: IndexerOptions) -> beam.PCollection:
+    """Delete products from the destination and return the IDs of the deleted products."""
+    match options.dest:
+        case "es":
+            return (
+                product_ids
+                | "Batch products for DeleteFromElasticsearch" >> BatchElements()
+                | "Delete products"
+                >> beam.ParDo(DeleteFromElasticsearch(es_host=options.dest_host, index_name=options.index_name))
+            )
+        case "vespa":
+            return (
+                product_ids
+                | "Batch products for DeleteFromVespa" >> BatchElements()
+                | "Delete products" >> beam.ParDo(DeleteFromVespa(host=options.dest_host, schema=options.index_name))
+            )
+        case _:
+            raise ValueError(f"Products cannot be deleted from --dest={options.dest}")
+
+
 def create_pipeline(options: IndexerOptions) -> beam.Pipeline:
     locale = options.locale
     text_fields = [
@@ -58,32 +131,39 @@ def create_pipeline(options: IndexerOptions) -> beam.Pipeline:
     hf_model_name = HF.LOCALE_TO_MODEL_NAME[locale]
     product_images_filepath = f"{DATA_DIR}/product_images.parquet"
 
+    if options.incremental and (options.nrows > 0 or options.dest not in ("es", "vespa")):
+        # --nrows would delete unchanged products, and other destinations do not confirm which products were written.
+        raise ValueError("--incremental can only be used with --dest=es or --dest=vespa and without --nrows")
+
     pipeline = beam.Pipeline(options=options)
     products = (
         pipeline
         | get_input_source(options.data_dir, locale, options.nrows)
         | "Filter products" >> beam.Filter(is_indexable)
-        | "Analyze products" >> beam.ParDo(AnalyzeDocFn(text_fields, locale))
         | "Add image URL" >> beam.ParDo(AddImageUrlFn(product_images_filepath, locale))
     )
-    branches = {}
-    if options.extract_keywords:
-        branches["extracted_keywords"] = products | "Extract keywords" >> beam.ParDo(ExtractKeywordsFn())
-    if options.encode_text:
-        branches["product_vector"] = products | "Encode products" >> EncodeProduct(
-            Shared(),
-            hf_model_name,
-            batch_size=8,
-        )
-    if branches:
-        branches["product"] = products | beam.WithKeys(lambda product: product["product_id"])
-        products = branches | beam.CoGroupByKey() | beam.Map(join_branches)
-
+    diff = None
+    if options.incremental:
+        fingerprints_dir = options.fingerprints_dir or f"{options.data_dir}/fingerprints/{options.index_name or locale}"
+        # Enrichment settings are part of the fingerprints so that changing them re-processes every product.
+        model_name = f"{hf_model_name}:encode_text={options.encode_text}:extract_keywords={options.extract_keywords}"
+        # The image URL is added before diffing so that a changed image re-indexes the product.
+        fingerprint_fields = [*text_fields, "image_url"]
+        diff = products | "Diff fingerprints" >> DiffFingerprints(fingerprints_dir, fingerprint_fields, model_name)
+        products = diff["changed"]
+    products = products | "Analyze products" >> beam.ParDo(AnalyzeDocFn(text_fields, locale))
+    encode_product = build_encode_product(options, hf_model_name)
+    if options.fuse_enrichment:
+        products = enrich_products(products, options.extract_keywords, encode_product)
+    else:
+        products = join_enriched_branches(products, options.extract_keywords, encode_product)
+
+    written_product_ids = None
     match options.dest:
         case "stdout":
             products | beam.Map(logging.info)
         case "es":
-            (
+            written_product_ids = (
                 products
                 | "Batch products for WriteToElasticsearch" >> BatchElements()
                 | "Index products"
@@ -96,7 +176,7 @@ def create_pipeline(options: IndexerOptions) -> beam.Pipeline:
                 )
             )
         case "vespa":
-            (
+            written_product_ids = (
                 products
                 | "Batch products for WriteToVespa" >> BatchElements()
                 | "Index products"
@@ -120,6 +200,18 @@ def create_pipeline(options: IndexerOptions) -> beam.Pipeline:
                     create_disposition=beam.io.BigQueryDisposition.CREATE_IF_NEEDED,
                 )
             )
+
+    if diff is not None and written_product_ids is not None:
+        deleted_product_ids = delete_products(diff["deleted"], options)
+        (
+            {
+                "current": diff["current"],
+                "previous": diff["previous"],
+                "written": written_product_ids,
+                "deleted": deleted_product_ids,
+            }
+            | "Write fingerprints" >> WriteFingerprints(fingerprints_dir)
+        )
     return pipeline
 
 
@@ -1,11 +1,17 @@
 import logging
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
 
 import apache_beam as beam
 
 from amazon_product_search.es.es_client import EsClient
 
 
+def get_failed_ids(errors: int | List[Dict[str, Any]], ignore_status: int | None = None) -> Set[str]:
+    """Return the IDs of failed bulk items returned by `EsClient.index_docs(..., stats_only=False)`."""
+    assert isinstance(errors, list)
+    return {item["_id"] for error in errors for item in error.values() if item.get("status") != ignore_status}
+
+
 class WriteToElasticsearch(beam.DoFn):
     def __init__(
         self,
@@ -20,9 +26,42 @@ class WriteToElasticsearch(beam.DoFn):
     def setup(self) -> None:
         self.es_client = EsClient(self.es_host)
 
-    def process(self, docs: List[Dict[str, Any]]) -> None:
+    def process(self, docs: List[Dict[str, Any]]) -> Iterator[str]:
+        """Index docs in bulk and yield the product IDs of the docs that were indexed."""
         logging.info(f"Index {len(docs)} docs in a batch")
-        self.es_client.index_docs(self.index_name, docs, id_fn=lambda doc: doc["product_id"])
+        _, errors = self.es_client.index_docs(
+            self.index_name, docs, id_fn=lambda doc: doc["product_id"], stats_only=False
+        )
+        failed_ids = get_failed_ids(errors)
+        if failed_ids:
+            logging.error(f"Failed to index {len(failed_ids)} docs: {errors}")
+        for doc in docs:
+            if doc["product_id"] not in failed_ids:
+                yield doc["product_id"]
+
+    def teardown(self) -> None:
+        if self.es_client:
+            self.es_client.close()
+
+
+class DeleteFromElasticsearch(beam.DoFn):
+    def __init__(self, es_host: str, index_name: str) -> None:
+        self.es_host = es_host
+        self.index_name = index_name
+
+    def setup(self) -> None:
+        self.es_client = EsClient(self.es_host)
+
+    def process(self, doc_ids: List[str]) -> Iterator[str]:
+        """Delete docs in bulk and yield the IDs of the docs that were deleted or did not exist."""
+        logging.info(f"Delete {len(doc_ids)} docs in a batch")
+        _, errors = self.es_client.delete_docs(self.index_name, doc_ids, stats_only=False)
+        failed_ids = get_failed_ids(errors, ignore_status=404)
+        if failed_ids:
+            logging.error(f"Failed to delete {len(failed_ids)} docs: {errors}")
+        for doc_id in doc_ids:
+            if doc_id not in failed_ids:
+                yield doc_id
 
     def teardown(self) -> None:
         if self.es_client:
@@ -0,0 +1,119 @@
+from typing import Any, BinaryIO, Dict, Iterator, List, NamedTuple, Optional
+
+import apache_beam as beam
+import pyarrow.parquet as pq
+from apache_beam.io.filesystem import CompressionTypes
+from apache_beam.io.filesystems import FileSystems
+from apache_beam.io.restriction_trackers import OffsetRange, OffsetRestrictionTracker
+from apache_beam.transforms.core import RestrictionProvider
+
+
+class ParquetSource(NamedTuple):
+    filepath: str
+    nrows: int = -1
+
+
+def open_file(filepath: str) -> BinaryIO:
+    """Open a file on any filesystem supported by Beam (e.g., local or GCS)."""
+    return FileSystems.open(filepath, compression_type=CompressionTypes.UNCOMPRESSED)
+
+
+def read_metadata(filepath: str) -> pq.FileMetaData:
+    """Read only the footer of a parquet file."""
+    with open_file(filepath) as f:
+        return pq.read_metadata(f)
+
+
+def count_row_groups(metadata: pq.FileMetaData, nrows: int = -1) -> int:
+    """Return the number of leading row groups that contain the first `nrows` rows (all row groups if nrows <= 0)."""
+    if nrows <= 0:
+        return metadata.num_row_groups
+    num_rows = 0
+    for i in range(metadata.num_row_groups):
+        num_rows += metadata.row_group(i).num_rows
+        if num_rows >= nrows:
+            return i + 1
+    return metadata.num_row_groups
+
+
+class RowGroupRestrictionProvider(RestrictionProvider):
+    """Restrict a `ParquetSource` to a range of row groups, initially split into one row group per restriction."""
+
+    def initial_restriction(self, source: ParquetSource) -> OffsetRange:
+        metadata = read_metadata(source.filepath)
+        return OffsetRange(0, count_row_groups(metadata, source.nrows))
+
+    def create_tracker(self, restriction: OffsetRange) -> OffsetRestrictionTracker:
+        return OffsetRestrictionTracker(restriction)
+
+    def split(self, source: ParquetSource, restriction: OffsetRange) -> Iterator[OffsetRange]:
+        for i in range(restriction.start, restriction.stop):
+            yield OffsetRange(i, i + 1)
+
+    def restriction_size(self, source: ParquetSource, restriction: OffsetRange) -> int:
+        return restriction.size()
+
+
+_ROW_GROUP_RESTRICTION_PARAM = beam.DoFn.RestrictionParam(RowGroupRestrictionProvider())
+
+
+class ReadRowGroupsFn(beam.DoFn):
+    def __init__(self, columns: Optional[List[str]] = None, null_value: Any = "") -> None:
+        self.columns = columns
+        self.null_value = null_value
+
+    def process(
+        self,
+        source: ParquetSource,
+        tracker: OffsetRestrictionTracker = _ROW_GROUP_RESTRICTION_PARAM,  # type: ignore[assignment]
+    ) -> Iterator[Dict[str, Any]]:
+        with open_file(source.filepath) as f:
+            parquet_file = pq.ParquetFile(f)
+            metadata = parquet_file.metadata
+            restriction = tracker.current_restriction()
+            # The number of rows before the current row group, to stop exactly at `nrows`.
+            offset = sum(metadata.row_group(i).num_rows for i in range(restriction.start))
+            i = restriction.start
+            while tracker.try_claim(i):
+                table = parquet_file.read_row_group(i, columns=self.columns)
+                if source.nrows > 0:
+                    table = table.slice(0, max(source.nrows - offset, 0))
+                offset += metadata.row_group(i).num_rows
+                for row in table.to_pylist():
+                    yield {key: self.null_value if value is None else value for key, value in row.items()}
+                i += 1
+
+
+class ReadParquetRowGroups(beam.PTransform):
+    """Read a parquet file as dicts, letting workers read row groups in parallel.
+
+    Only the file path goes into the pipeline graph. Each row group becomes a restriction of a splittable DoFn,
+    so runners can distribute row groups across workers, and each worker reads only its own row groups.
+    `columns` are projected and `nrows` is pushed down when reading, so unused columns and row groups are never read.
+
+    Args:
+        filepath (str): The parquet file path, local or on a filesystem supported by Beam (e.g., gs://).
+        columns (Optional[List[str]], optional): Columns to read. Defaults to None (all columns).
+        nrows (int, optional): The number of rows to read from the beginning. Defaults to -1 (all rows).
+        null_value (Any, optional): The value to replace nulls with. Defaults to "".
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        columns: Optional[List[str]] = None,
+        nrows: int = -1,
+        null_value: Any = "",
+    ) -> None:
+        super().__init__()
+        self.filepath = filepath
+        self.columns = columns
+        self.nrows = nrows
+        self.null_value = null_value
+
+    def expand(self, pbegin: beam.pvalue.PBegin) -> beam.PCollection:
+        return (
+            pbegin
+            | "Create parquet source" >> beam.Create([ParquetSource(self.filepath, self.nrows)])
+            | "Read row groups" >> beam.ParDo(ReadRowGroupsFn(self.columns, self.null_value))
+        )
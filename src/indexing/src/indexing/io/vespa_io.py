@@ -1,5 +1,5 @@
 import logging
-from typing import Any, Callable, Dict, List
+from typing import Any, Callable, Dict, Iterator, List
 
 import apache_beam as beam
 from vespa.io import VespaResponse
@@ -9,10 +9,21 @@ from amazon_product_search.vespa.vespa_client import VespaClient
 
 def callback_fn(response: VespaResponse, id: str) -> None:
     if response.status_code != 200:
-        logging.error(f"Failed to index doc: {id}")
+        logging.error(f"Failed to index or delete doc: {id}")
         logging.error(response.json)
 
 
+def make_recording_callback_fn(succeeded_ids: List[str]) -> Callable[[VespaResponse, str], None]:
+    """Return a callback that logs failures as `callback_fn` and appends the IDs of successful operations."""
+
+    def recording_callback_fn(response: VespaResponse, id: str) -> None:
+        callback_fn(response, id)
+        if response.status_code == 200:
+            succeeded_ids.append(id)
+
+    return recording_callback_fn
+
+
 class WriteToVespa(beam.DoFn):
     def __init__(self, host: str, schema: str, id_fn: Callable[[Dict[str, Any]], str]) -> None:
         self.host = host
@@ -22,6 +33,27 @@ class WriteToVespa(beam.DoFn):
     def setup(self) -> None:
         self.client = VespaClient(self.host)
 
-    def process(self, docs: List[Dict[str, Any]]) -> None:
+    def process(self, docs: List[Dict[str, Any]]) -> Iterator[str]:
+        """Feed docs and yield the product IDs of the docs that were fed."""
         logging.info(f"Index {len(docs)} docs in a batch")
-        self.client.feed(self.schema, docs, self.id_fn, callback_fn)
+        fed_ids: List[str] = []
+        self.client.feed(self.schema, docs, self.id_fn, make_recording_callback_fn(fed_ids))
+        id_to_product_id = {self.id_fn(doc): doc["product_id"] for doc in docs}
+        for doc_id in fed_ids:
+            yield id_to_product_id[doc_id]
+
+
+class DeleteFromVespa(beam.DoFn):
+    def __init__(self, host: str, schema: str) -> None:
+        self.host = host
+        self.schema = schema
+
+    def setup(self) -> None:
+        self.client = VespaClient(self.host)
+
+    def process(self, doc_ids: List[str]) -> Iterator[str]:
+        """Delete docs and yield the IDs of the docs that were deleted."""
+        logging.info(f"Delete {len(doc_ids)} docs in a batch")
+        deleted_ids: List[str] = []
+        self.client.delete(self.schema, doc_ids, make_recording_callback_fn(deleted_ids))
+        yield from deleted_ids
@@ -12,6 +12,19 @@ class IndexerOptions(PipelineOptions):
         parser.add_argument("--source", type=str, default="file")
         parser.add_argument("--extract_keywords", action="store_true")
         parser.add_argument("--encode_text", action="store_true")
+        # Enrich products in place instead of joining branches by CoGroupByKey, which shuffles every product.
+        parser.add_argument("--fuse_enrichment", action="store_true")
+        # Batch products to encode by the number of tokens instead of the number of products if positive.
+        parser.add_argument("--encode_token_budget", type=int, default=0)
+        # Encode products on a Triton inference server, keeping up to `triton_max_in_flight` requests in flight.
+        parser.add_argument("--use_triton", action="store_true")
+        parser.add_argument("--triton_host", type=str, default="localhost:8001")
+        parser.add_argument("--triton_max_in_flight", type=int, default=4)
+        parser.add_argument("--triton_client_timeout", type=float, default=30)
+        # Only index products whose fingerprints changed since the last incremental run, and delete removed ones.
+        # Only --dest=es and --dest=vespa are supported. Remove the fingerprints when the index is recreated.
+        parser.add_argument("--incremental", action="store_true")
+        parser.add_argument("--fingerprints_dir", type=str, default=None)
         parser.add_argument("--dest", type=str, default="stdout")
         parser.add_argument("--dest_host", type=str)
         parser.add_argument("--index_name", type=str)
@@ -1,24 +1,108 @@
 import logging
-from functools import partial
-from typing import Any, Dict, Iterator, List, Tuple
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from functools import lru_cache, partial
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
 
 import apache_beam as beam
 import numpy as np
+from apache_beam.transforms.window import GlobalWindows
 from apache_beam.utils.shared import Shared
-from tenacity import retry, stop_after_attempt, wait_fixed
+from apache_beam.utils.windowed_value import WindowedValue
+from tenacity import retry, stop_after_attempt, wait_random_exponential
+from transformers import AutoTokenizer
 from tritonclient.grpc import (
     InferenceServerClient,
     InferInput,
+    InferRequestedOutput,
 )
 
 from dense_retrieval.encoders import SBERTEncoder
 from dense_retrieval.encoders.modules.pooler import PoolingMode
 
+# (product_id, product_vector) pairs, or products with "product_vector" added if `enrich` is True.
+EncodeProductOutput = Tuple[str, List[float]] | Dict[str, Any]
+
 
 def _product_to_text(product: Dict[str, Any], fields: list[str]) -> str:
     return " ".join(product[field] for field in fields)
 
 
+def _to_outputs(
+    products: List[Dict[str, Any]], product_vectors: np.ndarray, enrich: bool
+) -> Iterator[EncodeProductOutput]:
+    for product, product_vector in zip(products, product_vectors, strict=True):
+        if enrich:
+            # Beam does not allow modifying input elements, so the product is copied.
+            yield {**product, "product_vector": product_vector.tolist()}
+        else:
+            yield product["product_id"], product_vector.tolist()
+
+
+@lru_cache
+def _load_tokenizer(hf_model_name: str) -> Any:
+    return AutoTokenizer.from_pretrained(hf_model_name)
+
+
+def count_tokens(hf_model_name: str, product_fields: list[str], product: Dict[str, Any]) -> int:
+    """Return the number of tokens the encoder sees for the product, including special tokens."""
+    tokenizer = _load_tokenizer(hf_model_name)
+    return len(tokenizer(_product_to_text(product, product_fields), truncation=True)["input_ids"])
+
+
+class BatchByTokenBudgetFn(beam.DoFn):
+    """Batch products of similar lengths so that each padded batch has at most `token_budget` tokens.
+
+    Within a bundle, products are put into buckets by `length_fn(product) // bucket_width`.
+    When adding a product would make the padded size of its bucket (the longest length times the number of products)
+    exceed `token_budget`, or the bucket reaches `max_batch_size`, the bucket is emitted as a batch sorted by length.
+    Short products are therefore batched many at a time, and a long one does not make the others padded to its length.
+    Like `BatchElements`, it only supports the global window.
+
+    Args:
+        length_fn (Callable[[Dict[str, Any]], int]): A function returning the number of tokens of a product.
+        token_budget (int, optional): The maximum padded size of a batch in tokens. Defaults to 8192.
+        bucket_width (int, optional): The range of lengths in a bucket. Defaults to 16.
+        max_batch_size (int, optional): The maximum number of products in a batch. Defaults to 256.
+    """
+
+    def __init__(
+        self,
+        length_fn: Callable[[Dict[str, Any]], int],
+        token_budget: int = 8192,
+        bucket_width: int = 16,
+        max_batch_size: int = 256,
+    ) -> None:
+        super().__init__()
+        self._length_fn = length_fn
+        self._token_budget = token_budget
+        self._bucket_width = bucket_width
+        self._max_batch_size = max_batch_size
+
+    def start_bundle(self) -> None:
+        self._buckets: defaultdict[int, List[Tuple[int, Dict[str, Any]]]] = defaultdict(list)
+
+    @staticmethod
+    def _to_batch(bucket: List[Tuple[int, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        return [product for _, product in sorted(bucket, key=lambda length_and_product: length_and_product[0])]
+
+    def process(self, product: Dict[str, Any]) -> Iterator[List[Dict[str, Any]]]:
+        length = self._length_fn(product)
+        bucket = self._buckets[length // self._bucket_width]
+        if bucket:
+            max_length = max(length, max(bucket_length for bucket_length, _ in bucket))
+            if max_length * (len(bucket) + 1) > self._token_budget or len(bucket) >= self._max_batch_size:
+                yield self._to_batch(bucket)
+                bucket.clear()
+        bucket.append((length, product))
+
+    def finish_bundle(self) -> Iterator[WindowedValue]:
+        for bucket in self._buckets.values():
+            if bucket:
+                yield GlobalWindows.windowed_value_at_end_of_window(self._to_batch(bucket))
+        self._buckets.clear()
+
+
 def initialize_encoder(hf_model_name: str, pooling_mode: PoolingMode) -> SBERTEncoder:
     return SBERTEncoder(hf_model_name, pooling_mode)
 
@@ -30,35 +114,56 @@ class EncodeProductFn(beam.DoFn):
         hf_model_name: str,
         product_fields: list[str],
         pooling_mode: PoolingMode = "mean",
+        enrich: bool = False,
+        encode_whole_batch: bool = False,
     ) -> None:
         super().__init__()
         self._shared_handle = shared_handle
         self._initialize_fn = partial(initialize_encoder, hf_model_name, pooling_mode)
         self._product_fields = product_fields
+        self._enrich = enrich
+        self._encode_whole_batch = encode_whole_batch
 
     def setup(self) -> None:
         self._encoder: SBERTEncoder = self._shared_handle.acquire(self._initialize_fn)
 
-    def process(self, products: List[Dict[str, Any]]) -> Iterator[Tuple[str, List[float]]]:
+    def process(self, products: List[Dict[str, Any]]) -> Iterator[EncodeProductOutput]:
         logging.info(f"Encode {len(products)} products in a batch")
         texts = [_product_to_text(product, self._product_fields) for product in products]
-        product_vectors = self._encoder.encode(texts)
-        for product, product_vector in zip(products, product_vectors, strict=True):
-            yield product["product_id"], product_vector.tolist()
+        if self._encode_whole_batch:
+            # Batches sized by a token budget are encoded in a single forward pass.
+            product_vectors = self._encoder.encode(texts, batch_size=len(texts))
+        else:
+            product_vectors = self._encoder.encode(texts)
+        yield from _to_outputs(products, product_vectors, self._enrich)
 
 
 class EncodeProductTritonFn(beam.DoFn):
+    """Encode batches of products on a Triton inference server, keeping up to `max_in_flight` requests in flight.
+
+    Requests are sent by `async_infer`, so the worker keeps batching and sending while earlier requests are
+    being processed. Once `max_in_flight` requests are pending, the oldest one is awaited, so outputs are emitted in
+    the order of the batches. Output tensors are received as raw bytes over gRPC (no JSON serialization).
+    A failed request is retried synchronously with exponential backoff and jitter.
+    """
+
     def __init__(
         self,
         hf_model_name: str,
         product_fields: list[str],
         host: str = "localhost:8001",
         onnx_model_name: str = "text_embedding",
+        enrich: bool = False,
+        max_in_flight: int = 4,
+        client_timeout: float = 30,
     ) -> None:
         self._hf_model_name = hf_model_name
         self._product_fields = product_fields
         self._host = host
         self._onnx_model_name = onnx_model_name
+        self._enrich = enrich
+        self._max_in_flight = max_in_flight
+        self._client_timeout = client_timeout
 
     def setup(self) -> None:
         self._client = InferenceServerClient(
@@ -67,26 +172,71 @@ class EncodeProductTritonFn(beam.DoFn):
             verbose=False,
         )
 
-    @retry(stop=stop_after_attempt(5), wait=wait_fixed(5))
+    def start_bundle(self) -> None:
+        self._in_flight: Deque[Tuple[List[Dict[str, Any]], List[str], Future]] = deque()
+
+    @staticmethod
+    def _make_inputs(texts: List[str]) -> List[InferInput]:
+        return [
+            InferInput(
+                name="text",
+                shape=[len(texts)],
+                datatype="BYTES",
+            ).set_data_from_numpy(np.asarray(texts, dtype=object))
+        ]
+
+    @retry(stop=stop_after_attempt(5), wait=wait_random_exponential(multiplier=0.5, max=30))
     def encode(self, texts: List[str]) -> np.ndarray:
         product_vectors = self._client.infer(
             model_name=self._onnx_model_name,
-            inputs=[
-                InferInput(
-                    name="text",
-                    shape=[len(texts)],
-                    datatype="BYTES",
-                ).set_data_from_numpy(np.asarray(texts, dtype=object))
-            ],
-            client_timeout=30,
+            inputs=self._make_inputs(texts),
+            outputs=[InferRequestedOutput("output")],
+            client_timeout=self._client_timeout,
         ).as_numpy("output")
         return product_vectors
 
-    def process(self, products: List[Dict[str, Any]]) -> Iterator[Tuple[str, List[float]]]:
+    def encode_async(self, texts: List[str]) -> Future:
+        """Send a request without waiting for the response.
+
+        Returns:
+            Future: A future resolved to the product vectors, or to the error if the request fails.
+        """
+        future: Future = Future()
+
+        def callback(result: Any, error: Optional[Exception]) -> None:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result.as_numpy("output"))
+
+        self._client.async_infer(
+            model_name=self._onnx_model_name,
+            inputs=self._make_inputs(texts),
+            callback=callback,
+            outputs=[InferRequestedOutput("output")],
+            client_timeout=self._client_timeout,
+        )
+        return future
+
+    def _complete_oldest(self) -> Iterator[EncodeProductOutput]:
+        products, texts, future = self._in_flight.popleft()
+        try:
+            product_vectors = future.result()
+        except Exception as e:
+            logging.warning(f"Failed to encode {len(texts)} products asynchronously, retrying: {e}")
+            product_vectors = self.encode(texts)
+        yield from _to_outputs(products, product_vectors, self._enrich)
+
+    def process(self, products: List[Dict[str, Any]]) -> Iterator[EncodeProductOutput]:
         texts = [_product_to_text(product, self._product_fields) for product in products]
-        product_vectors = self.encode(texts)
-        for product, product_vector in zip(products, product_vectors, strict=True):
-            yield product["product_id"], product_vector.tolist()
+        self._in_flight.append((products, texts, self.encode_async(texts)))
+        while len(self._in_flight) >= self._max_in_flight:
+            yield from self._complete_oldest()
+
+    def finish_bundle(self) -> Iterator[WindowedValue]:
+        while self._in_flight:
+            for output in self._complete_oldest():
+                yield GlobalWindows.windowed_value_at_end_of_window(output)
 
 
 class EncodeProduct(beam.PTransform):
@@ -97,6 +247,11 @@ class EncodeProduct(beam.PTransform):
         batch_size: int,
         product_fields: list[str] | None = None,
         use_triton: bool = False,
+        enrich: bool = False,
+        token_budget: Optional[int] = None,
+        triton_host: str = "localhost:8001",
+        max_in_flight: int = 4,
+        client_timeout: float = 30,
     ) -> None:
         super().__init__()
         self._shared_handle = shared_handle
@@ -106,14 +261,29 @@ class EncodeProduct(beam.PTransform):
             product_fields = ["product_title"]
         self._product_fields = product_fields
         self._use_triton = use_triton
+        self._enrich = enrich
+        self._token_budget = token_budget
+        self._triton_host = triton_host
+        self._max_in_flight = max_in_flight
+        self._client_timeout = client_timeout
 
-    def expand(self, pcoll: beam.PCollection[Dict[str, Any]]) -> beam.PCollection[Tuple[str, List[float]]]:
-        pcoll |= "Batch items for EncodeProductFn" >> beam.BatchElements(min_batch_size=self._batch_size)
+    def expand(self, pcoll: beam.PCollection[Dict[str, Any]]) -> beam.PCollection[EncodeProductOutput]:
+        if self._token_budget:
+            length_fn = partial(count_tokens, self._hf_model_name, self._product_fields)
+            pcoll |= "Batch items for EncodeProductFn by token budget" >> beam.ParDo(
+                BatchByTokenBudgetFn(length_fn, token_budget=self._token_budget)
+            )
+        else:
+            pcoll |= "Batch items for EncodeProductFn" >> beam.BatchElements(min_batch_size=self._batch_size)
         if self._use_triton:
             return pcoll | beam.ParDo(
                 EncodeProductTritonFn(
                     hf_model_name=self._hf_model_name,
                     product_fields=self._product_fields,
+                    host=self._triton_host,
+                    enrich=self._enrich,
+                    max_in_flight=self._max_in_flight,
+                    client_timeout=self._client_timeout,
                 )
             )
         else:
@@ -122,5 +292,7 @@ class EncodeProduct(beam.PTransform):
                     shared_handle=self._shared_handle,
                     hf_model_name=self._hf_model_name,
                     product_fields=self._product_fields,
+                    enrich=self._enrich,
+                    encode_whole_batch=bool(self._token_budget),
                 )
             )
@@ -13,14 +13,23 @@ class ExtractKeywordsFn(beam.DoFn):
     def convert_results_to_text(results: list[tuple[str, float]]) -> str:
         return " ".join([keyword for keyword, score in results])
 
-    def process(self, product: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, str]]]:
+    def extract(self, product: Dict[str, Any]) -> Dict[str, str]:
         result: Dict[str, str] = {}
 
         text = product["product_description"] + " " + product["product_bullet_point"]
         text = text.strip()
         if not text:
-            yield product["product_id"], result
-            return
+            return result
 
         result["product_description_keybert"] = self.convert_results_to_text(self._extractor.apply_keybert(text))
-        yield product["product_id"], result
+        return result
+
+    def process(self, product: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, str]]]:
+        yield product["product_id"], self.extract(product)
+
+
+class AddKeywordsFn(ExtractKeywordsFn):
+    """Add extracted keywords to the product itself instead of emitting them keyed by product ID."""
+
+    def process(self, product: Dict[str, Any]) -> Iterator[Dict[str, Any]]:  # type: ignore[override]
+        yield product | self.extract(product)
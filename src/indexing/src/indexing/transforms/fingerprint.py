@@ -0,0 +1,157 @@
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import uuid4
+
+import apache_beam as beam
+import pyarrow as pa
+from apache_beam.io.filesystems import FileSystems
+from apache_beam.pvalue import AsDict
+
+from amazon_product_search.timestamp import get_unix_timestamp
+from indexing.io.parquet_io import ReadParquetRowGroups
+
+FINGERPRINT_SCHEMA = pa.schema([("product_id", pa.string()), ("fingerprint", pa.string())])
+
+
+def compute_fingerprint(product: Dict[str, Any], fields: List[str], model_name: str) -> str:
+    """Return a hash of the given fields of the product and the model name.
+
+    The model name is included so that changing the model re-encodes every product.
+    """
+    payload = json.dumps([model_name, *[product.get(field) for field in fields]], ensure_ascii=False)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def find_latest_fingerprints(fingerprints_dir: str) -> Optional[str]:
+    """Return the path of the latest fingerprint file written by `DiffFingerprints`, or None if there is none."""
+    match_result = FileSystems.match([f"{fingerprints_dir}/fingerprints-*.parquet"])[0]
+    filepaths = [metadata.path for metadata in match_result.metadata_list]
+    if not filepaths:
+        return None
+    # File names start with a unix timestamp, which has the same number of digits until 2286.
+    return max(filepaths, key=lambda filepath: filepath.rsplit("/", 1)[-1])
+
+
+def to_fingerprint(product: Dict[str, Any], fields: List[str], model_name: str) -> Tuple[str, str]:
+    return product["product_id"], compute_fingerprint(product, fields, model_name)
+
+
+def is_changed(product: Dict[str, Any], fields: List[str], model_name: str, previous: Dict[str, str]) -> bool:
+    return previous.get(product["product_id"]) != compute_fingerprint(product, fields, model_name)
+
+
+def to_deleted_id(kv: Tuple[str, Dict[str, Iterable[str]]]) -> Iterable[str]:
+    product_id, group = kv
+    if not list(group["current"]):
+        yield product_id
+
+
+def to_committed_fingerprint(kv: Tuple[str, Dict[str, Iterable[Any]]]) -> Iterable[Dict[str, str]]:
+    """Decide the fingerprint of a product to record for the next run.
+
+    The current fingerprint is recorded only if the product was written or did not change. Otherwise, the previous
+    fingerprint (if any) is kept so that the next run retries the product. Likewise, a removed product is forgotten
+    only if it was deleted.
+    """
+    product_id, group = kv
+    current, previous = list(group["current"]), list(group["previous"])
+    if current:
+        if list(group["written"]) or current == previous:
+            yield {"product_id": product_id, "fingerprint": current[0]}
+            return
+    elif list(group["deleted"]):
+        return
+    if previous:
+        yield {"product_id": product_id, "fingerprint": previous[0]}
+
+
+class DiffFingerprints(beam.PTransform):
+    """Compare products with the fingerprints of the previous run to find which to index and which to delete.
+
+    A fingerprint is a hash of `fields` and `model_name` per product (see `compute_fingerprint`).
+    The latest fingerprint file in `fingerprints_dir` is read as a side input. Only product IDs and fingerprints
+    are shuffled. Nothing is written here; pass the results to `WriteFingerprints` once products are written.
+
+    It returns a dict of PCollections:
+    - "changed": Products that are new or whose fingerprint changed.
+    - "deleted": IDs of products that were in the previous run but are not anymore.
+    - "current": (product ID, fingerprint) of all the given products.
+    - "previous": (product ID, fingerprint) of the previous run.
+
+    Args:
+        fingerprints_dir (str): The directory to read fingerprint files from, local or on GCS.
+        fields (List[str]): Fields to compute fingerprints from.
+        model_name (str): The name of the model used to encode products.
+    """
+
+    def __init__(self, fingerprints_dir: str, fields: List[str], model_name: str) -> None:
+        super().__init__()
+        self.fingerprints_dir = fingerprints_dir
+        self.fields = fields
+        self.model_name = model_name
+
+    def expand(self, products: beam.PCollection) -> Dict[str, beam.PCollection]:
+        previous_filepath = find_latest_fingerprints(self.fingerprints_dir)
+        if previous_filepath:
+            previous = (
+                products.pipeline
+                | "Read previous fingerprints" >> ReadParquetRowGroups(previous_filepath)
+                | "Key previous fingerprints" >> beam.Map(lambda row: (row["product_id"], row["fingerprint"]))
+            )
+        else:
+            previous = products.pipeline | "No previous fingerprints" >> beam.Create([])
+
+        current = products | "Compute fingerprints" >> beam.Map(to_fingerprint, self.fields, self.model_name)
+        changed = products | "Filter unchanged products" >> beam.Filter(
+            is_changed, self.fields, self.model_name, AsDict(previous)
+        )
+        deleted = (
+            {"current": current, "previous": previous}
+            | "Group fingerprints" >> beam.CoGroupByKey()
+            | "Find deleted products" >> beam.FlatMap(to_deleted_id)
+        )
+        return {"changed": changed, "deleted": deleted, "current": current, "previous": previous}
+
+
+class WriteFingerprints(beam.PTransform):
+    """Write the fingerprints for the next run to a new file in `fingerprints_dir`.
+
+    Only products that were written (or did not change) get their current fingerprints recorded, and only products
+    that were deleted are dropped, so that failed writes and deletes are retried by the next run
+    (see `to_committed_fingerprint`). Writes and deletes must therefore be confirmed by the destination,
+    e.g., by the product IDs emitted from `WriteToElasticsearch`.
+
+    It takes a dict of PCollections:
+    - "current" and "previous": The same as those returned by `DiffFingerprints`.
+    - "written": IDs of products that were written.
+    - "deleted": IDs of products that were deleted.
+
+    Args:
+        fingerprints_dir (str): The directory to write fingerprint files to, local or on GCS.
+    """
+
+    def __init__(self, fingerprints_dir: str) -> None:
+        super().__init__()
+        self.fingerprints_dir = fingerprints_dir
+
+    def expand(self, pcolls: Dict[str, beam.PCollection]) -> beam.PCollection:
+        filepath_prefix = f"{self.fingerprints_dir}/fingerprints-{get_unix_timestamp()}-{uuid4().hex[:8]}"
+        return (
+            {
+                "current": pcolls["current"],
+                "previous": pcolls["previous"],
+                "written": pcolls["written"] | "Key written products" >> beam.Map(lambda product_id: (product_id, 1)),
+                "deleted": pcolls["deleted"] | "Key deleted products" >> beam.Map(lambda product_id: (product_id, 1)),
+            }
+            | "Group fingerprints to commit" >> beam.CoGroupByKey()
+            | "Decide fingerprints to commit" >> beam.FlatMap(to_committed_fingerprint)
+            | "Write fingerprints"
+            >> beam.io.WriteToParquet(
+                filepath_prefix,
+                schema=FINGERPRINT_SCHEMA,
+                file_name_suffix=".parquet",
+                num_shards=1,
+                shard_name_template="",
+            )
+        )
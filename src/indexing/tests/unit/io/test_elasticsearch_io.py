@@ -3,12 +3,13 @@ from unittest.mock import patch
 
 import apache_beam as beam
 from apache_beam.testing.test_pipeline import TestPipeline
+from apache_beam.testing.util import assert_that, equal_to
 
 from indexing.io.elasticsearch_io import WriteToElasticsearch
 
 
 @patch("amazon_product_search.es.es_client.Elasticsearch")
-@patch("amazon_product_search.es.es_client.EsClient.index_docs", return_value=(0, 0))
+@patch("amazon_product_search.es.es_client.EsClient.index_docs", return_value=(0, []))
 def test_bulk_called_n_times(mock_es, mock_es_client):
     products = [
         {
@@ -32,3 +33,20 @@ def test_bulk_called_n_times(mock_es, mock_es_client):
                 )
             )
         assert mock_es_client.call_count == math.ceil(len(products) / batch_size)
+
+
+@patch("amazon_product_search.es.es_client.Elasticsearch")
+@patch(
+    "amazon_product_search.es.es_client.EsClient.index_docs",
+    return_value=(1, [{"index": {"_id": "2", "status": 400}}]),
+)
+def test_write_yields_indexed_product_ids(mock_index_docs, mock_es):
+    products = [{"product_id": "1"}, {"product_id": "2"}]
+
+    with TestPipeline() as pipeline:
+        actual = (
+            pipeline
+            | beam.Create([products])
+            | beam.ParDo(WriteToElasticsearch(es_host="http://localhost:9200", index_name="products"))
+        )
+        assert_that(actual, equal_to(["1"]))
@@ -0,0 +1,47 @@
+import polars as pl
+import pytest
+from apache_beam.testing.test_pipeline import TestPipeline
+from apache_beam.testing.util import assert_that, equal_to
+
+from indexing.io.parquet_io import ReadParquetRowGroups, count_row_groups, read_metadata
+
+
+@pytest.fixture
+def filepath(tmp_path) -> str:
+    filepath = str(tmp_path / "products.parquet")
+    pl.DataFrame(
+        {
+            "product_id": [str(i) for i in range(7)],
+            "product_title": ["title", None, "title", "title", None, "title", "title"],
+            "product_brand": ["brand"] * 7,
+        }
+    ).write_parquet(filepath, row_group_size=2)
+    return filepath
+
+
+@pytest.mark.parametrize(
+    ("nrows", "expected"),
+    [
+        (-1, 4),
+        (1, 1),
+        (2, 1),
+        (3, 2),
+        (7, 4),
+        (100, 4),
+    ],
+)
+def test_count_row_groups(filepath, nrows, expected):
+    metadata = read_metadata(filepath)
+    assert count_row_groups(metadata, nrows) == expected
+
+
+@pytest.mark.parametrize("nrows", [-1, 1, 3, 4, 100])
+def test_read_parquet_row_groups(filepath, nrows):
+    expected = [
+        {"product_id": str(i), "product_title": "" if i in {1, 4} else "title"}
+        for i in range(7 if nrows <= 0 else min(nrows, 7))
+    ]
+
+    with TestPipeline() as pipeline:
+        products = pipeline | ReadParquetRowGroups(filepath, columns=["product_id", "product_title"], nrows=nrows)
+        assert_that(products, equal_to(expected))
@@ -1,6 +1,18 @@
+from unittest.mock import patch
+
+import apache_beam as beam
+import numpy as np
 import pytest
+from apache_beam.testing.test_pipeline import TestPipeline
+from apache_beam.testing.util import assert_that, equal_to
+from apache_beam.utils.shared import Shared
 
-from indexing.transforms.encode_product import _product_to_text
+from indexing.transforms.encode_product import (
+    BatchByTokenBudgetFn,
+    EncodeProduct,
+    EncodeProductTritonFn,
+    _product_to_text,
+)
 
 
 @pytest.mark.parametrize(
@@ -21,3 +33,166 @@ from indexing.transforms.encode_product import _product_to_text
 def test_product_to_text(product, fields, expected):
     actual = _product_to_text(product, fields)
     assert actual == expected
+
+
+class FakeEncoder:
+    def encode(self, texts: list[str], batch_size: int = 32) -> np.ndarray:
+        return np.array([[float(len(text))] for text in texts])
+
+
+def initialize_fake_encoder(hf_model_name: str, pooling_mode: str) -> FakeEncoder:
+    return FakeEncoder()
+
+
+@pytest.mark.parametrize(
+    ("enrich", "expected"),
+    [
+        (False, [("1", [1.0]), ("2", [3.0])]),
+        (
+            True,
+            [
+                {"product_id": "1", "product_title": "a", "product_vector": [1.0]},
+                {"product_id": "2", "product_title": "abc", "product_vector": [3.0]},
+            ],
+        ),
+    ],
+)
+@patch("indexing.transforms.encode_product.initialize_encoder", initialize_fake_encoder)
+def test_encode_product(enrich, expected):
+    products = [
+        {"product_id": "1", "product_title": "a"},
+        {"product_id": "2", "product_title": "abc"},
+    ]
+
+    with TestPipeline() as pipeline:
+        actual = pipeline | beam.Create(products) | EncodeProduct(Shared(), "model", batch_size=2, enrich=enrich)
+        assert_that(actual, equal_to(expected))
+
+
+def count_title_chars(product: dict) -> int:
+    return len(product["product_title"])
+
+
+@pytest.mark.parametrize(
+    ("lengths", "token_budget", "expected"),
+    [
+        # Lengths from 0 to 15 share a bucket, and so do lengths from 16 to 31.
+        ([25, 3, 20, 1], 100, [[1, 3], [20, 25]]),
+        # Padding 3 products to 3 tokens would exceed the budget, so the bucket is emitted before the third one.
+        ([3, 1, 3], 8, [[1, 3], [3]]),
+        ([20, 25], 40, [[20], [25]]),
+    ],
+)
+def test_batch_by_token_budget(lengths, token_budget, expected):
+    products = [{"product_id": str(i), "product_title": "x" * length} for i, length in enumerate(lengths)]
+
+    with TestPipeline() as pipeline:
+        batches = (
+            pipeline
+            | beam.Create(products)
+            | beam.ParDo(BatchByTokenBudgetFn(count_title_chars, token_budget=token_budget, bucket_width=16))
+            | beam.Map(lambda batch: [len(product["product_title"]) for product in batch])
+        )
+        assert_that(batches, equal_to(expected))
+
+
+def count_fake_tokens(hf_model_name: str, product_fields: list[str], product: dict) -> int:
+    return len(product["product_title"])
+
+
+@patch("indexing.transforms.encode_product.initialize_encoder", initialize_fake_encoder)
+@patch("indexing.transforms.encode_product.count_tokens", count_fake_tokens)
+def test_encode_product_with_token_budget():
+    products = [{"product_id": str(i), "product_title": "x" * i} for i in range(1, 40, 3)]
+
+    with TestPipeline() as pipeline:
+        actual = pipeline | beam.Create(products) | EncodeProduct(Shared(), "model", batch_size=2, token_budget=64)
+        assert_that(
+            actual, equal_to([(product["product_id"], [float(len(product["product_title"]))]) for product in products])
+        )
+
+
+class FakeInferResult:
+    def __init__(self, texts: list[str]) -> None:
+        self.texts = texts
+
+    def as_numpy(self, name: str) -> np.ndarray:
+        return np.array([[float(len(text))] for text in self.texts])
+
+
+class FakeInferenceServerClient:
+    """Return text lengths as vectors. Asynchronous requests complete in order when the next one is sent,
+    and those containing "fail" fail."""
+
+    def __init__(self) -> None:
+        self.pending: list = []
+        self.num_async_requests = 0
+        self.num_sync_requests = 0
+
+    def infer(self, model_name, inputs, outputs, client_timeout):
+        self.num_sync_requests += 1
+        return FakeInferResult(inputs)
+
+    def async_infer(self, model_name, inputs, callback, outputs, client_timeout):
+        self.num_async_requests += 1
+        self.pending.append((inputs, callback))
+        if len(self.pending) > 1:
+            self.complete_one()
+
+    def complete_one(self) -> None:
+        texts, callback = self.pending.pop(0)
+        if "fail" in texts:
+            callback(None, RuntimeError("fail"))
+        else:
+            callback(FakeInferResult(texts), None)
+
+
+def test_encode_product_triton_fn():
+    client = FakeInferenceServerClient()
+    fn = EncodeProductTritonFn("model", ["product_title"], max_in_flight=2)
+    fn._client = client
+    batches = [
+        [{"product_id": "1", "product_title": "a"}, {"product_id": "2", "product_title": "fail"}],
+        [{"product_id": "3", "product_title": "abc"}],
+        [{"product_id": "4", "product_title": "ab"}],
+    ]
+
+    with patch.object(EncodeProductTritonFn, "_make_inputs", staticmethod(lambda texts: texts)):
+        fn.start_bundle()
+        outputs = [output for batch in batches for output in fn.process(batch)]
+        # The last request is still in flight until the bundle finishes.
+        assert len(client.pending) == 1
+        client.complete_one()
+        outputs += [windowed_value.value for windowed_value in fn.finish_bundle()]
+
+    assert outputs == [("1", [1.0]), ("2", [4.0]), ("3", [3.0]), ("4", [2.0])]
+    assert client.num_async_requests == 3
+    # The failed request is retried synchronously.
+    assert client.num_sync_requests == 1
+
+
+def test_encode_product_with_triton():
+    with patch("indexing.transforms.encode_product.EncodeProductTritonFn", wraps=EncodeProductTritonFn) as mock_fn_cls:
+        pipeline = beam.Pipeline()
+        _ = (
+            pipeline
+            | beam.Create([{"product_id": "1", "product_title": "a"}])
+            | EncodeProduct(
+                Shared(),
+                "model",
+                batch_size=2,
+                use_triton=True,
+                triton_host="triton:8001",
+                max_in_flight=8,
+                client_timeout=5,
+            )
+        )
+
+    mock_fn_cls.assert_called_once_with(
+        hf_model_name="model",
+        product_fields=["product_title"],
+        host="triton:8001",
+        enrich=False,
+        max_in_flight=8,
+        client_timeout=5,
+    )
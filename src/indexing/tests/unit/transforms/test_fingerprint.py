@@ -0,0 +1,92 @@
+from unittest.mock import patch
+
+import apache_beam as beam
+from apache_beam.testing.test_pipeline import TestPipeline
+from apache_beam.testing.util import assert_that, equal_to
+
+from indexing.transforms.fingerprint import (
+    DiffFingerprints,
+    WriteFingerprints,
+    compute_fingerprint,
+    find_latest_fingerprints,
+)
+
+FIELDS = ["product_title", "product_description"]
+
+
+def test_compute_fingerprint():
+    product = {"product_id": "1", "product_title": "title", "product_description": "description", "other": "a"}
+
+    fingerprint = compute_fingerprint(product, FIELDS, "model")
+
+    assert fingerprint == compute_fingerprint(product | {"other": "b"}, FIELDS, "model")
+    assert fingerprint != compute_fingerprint(product | {"product_title": "new title"}, FIELDS, "model")
+    assert fingerprint != compute_fingerprint(product, FIELDS, "new_model")
+
+
+def run_diff(
+    products: list[dict],
+    fingerprints_dir: str,
+    expected_changed: list[str],
+    expected_deleted: list[str],
+    failed_ids: tuple[str, ...] = (),
+):
+    """Run an incremental update, where writes and deletes of `failed_ids` fail."""
+    with TestPipeline() as pipeline:
+        diff = pipeline | beam.Create(products) | DiffFingerprints(fingerprints_dir, FIELDS, "model")
+        changed = diff["changed"] | beam.Map(lambda product: product["product_id"])
+        assert_that(changed, equal_to(expected_changed), label="Check changed")
+        assert_that(diff["deleted"], equal_to(expected_deleted), label="Check deleted")
+        written = changed | "Write" >> beam.Filter(lambda product_id: product_id not in failed_ids)
+        deleted = diff["deleted"] | "Delete" >> beam.Filter(lambda product_id: product_id not in failed_ids)
+        (
+            {"current": diff["current"], "previous": diff["previous"], "written": written, "deleted": deleted}
+            | WriteFingerprints(fingerprints_dir)
+        )
+
+
+@patch("indexing.transforms.fingerprint.get_unix_timestamp", side_effect=range(1700000001, 1700000010))
+def test_diff_fingerprints(mock_get_unix_timestamp, tmp_path):
+    fingerprints_dir = str(tmp_path)
+    products = [
+        {"product_id": "1", "product_title": "a", "product_description": ""},
+        {"product_id": "2", "product_title": "b", "product_description": ""},
+        {"product_id": "3", "product_title": "c", "product_description": ""},
+    ]
+    assert find_latest_fingerprints(fingerprints_dir) is None
+
+    # Everything is new in the first run.
+    run_diff(products, fingerprints_dir, expected_changed=["1", "2", "3"], expected_deleted=[])
+    assert find_latest_fingerprints(fingerprints_dir).endswith(".parquet")
+
+    # Product 2 is modified, product 3 is removed, and product 4 is added.
+    products = [
+        products[0],
+        {"product_id": "2", "product_title": "b", "product_description": "new description"},
+        {"product_id": "4", "product_title": "d", "product_description": ""},
+    ]
+    run_diff(products, fingerprints_dir, expected_changed=["2", "4"], expected_deleted=["3"])
+
+    # Nothing changes.
+    run_diff(products, fingerprints_dir, expected_changed=[], expected_deleted=[])
+    assert "fingerprints-1700000003-" in find_latest_fingerprints(fingerprints_dir)
+
+
+@patch("indexing.transforms.fingerprint.get_unix_timestamp", side_effect=range(1700000001, 1700000010))
+def test_diff_fingerprints_retries_failed_writes_and_deletes(mock_get_unix_timestamp, tmp_path):
+    fingerprints_dir = str(tmp_path)
+    products = [
+        {"product_id": "1", "product_title": "a", "product_description": ""},
+        {"product_id": "2", "product_title": "b", "product_description": ""},
+        {"product_id": "3", "product_title": "c", "product_description": ""},
+    ]
+    # Product 1 is new and fails to be written.
+    run_diff(products, fingerprints_dir, expected_changed=["1", "2", "3"], expected_deleted=[], failed_ids=("1",))
+
+    # Product 2 is modified and fails to be written, and product 3 is removed and fails to be deleted.
+    products = [products[0], {"product_id": "2", "product_title": "new b", "product_description": ""}]
+    run_diff(products, fingerprints_dir, expected_changed=["1", "2"], expected_deleted=["3"], failed_ids=("2", "3"))
+
+    # The failed write and delete are retried and succeed.
+    run_diff(products, fingerprints_dir, expected_changed=["2"], expected_deleted=["3"])
+    run_diff(products, fingerprints_dir, expected_changed=[], expected_deleted=[])